@@ -31,7 +31,7 @@ interface ListingQuestion {
 }
 
 interface Bid {
-  id: number;
+  id: string;
   amount: string;
   bidder_id: string;
   created_at: string;
@@ -46,6 +46,7 @@ export function ListingDetailPage() {
   const [currentMedia, setCurrentMedia] = useState<{ url: string; type: "image" | "video" }>({ url: placeholderUrl, type: "image" });
   const [questions, setQuestions] = useState<ListingQuestion[]>([]);
   const [bids, setBids] = useState<Bid[]>([]);
+  const [bidCount, setBidCount] = useState(0);
   const [questionBody, setQuestionBody] = useState("");
   const [answerBodies, setAnswerBodies] = useState<Record<string, string>>({});
   const [submittingQuestion, setSubmittingQuestion] = useState(false);
@@ -63,7 +64,16 @@ export function ListingDetailPage() {
 
   const fetchBids = useCallback(() => {
     if (!id) return;
-    api.get(`/auction/auctions/${id}/bids/`).then((r) => setBids(Array.isArray(r.data) ? r.data : [])).catch(() => setBids([]));
+    api
+      .get(`/auction/auctions/${id}/bid-summary/`)
+      .then((r) => {
+        setBids(Array.isArray(r.data?.recent_bids) ? r.data.recent_bids : []);
+        setBidCount(Number(r.data?.bid_count) || 0);
+      })
+      .catch(() => {
+        setBids([]);
+        setBidCount(0);
+      });
   }, [id]);
 
   const handleBidSuccess = useCallback(() => {
@@ -253,7 +263,7 @@ export function ListingDetailPage() {
 
       {listing.listing_type === "AUCTION" && bids.length > 0 && (
         <section className="mt-12 border-t pt-8">
-          <h2 className="text-xl font-semibold mb-4">Bid history</h2>
+          <h2 className="text-xl font-semibold mb-4">Bid history ({bidCount})</h2>
           <ul className="space-y-2">
             {bids.map((b) => (
               <li key={b.id} className="flex items-center justify-between rounded-md border px-3 py-2 text-sm">
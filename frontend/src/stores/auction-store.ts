@@ -1,3 +1,4 @@
+import axios from "axios";
 import { create } from "zustand";
 import { api } from "@/services/api";
 
@@ -13,8 +14,16 @@ export const useAuctionStore = create<AuctionState>((set, get) => ({
 
   placeBid: async (listingId, amount) => {
     set({ loading: true, error: null });
+    // Same key on the retry, so a bid whose response was lost is replayed, not placed twice
+    const headers = { "Idempotency-Key": crypto.randomUUID() };
+    const submit = () => api.post(`/auction/auctions/${listingId}/bid/`, { amount }, { headers });
     try {
-      await api.post(`/auction/auctions/${listingId}/bid/`, { amount });
+      try {
+        await submit();
+      } catch (e) {
+        if (!axios.isAxiosError(e) || e.response) throw e;
+        await submit();
+      }
       set({ error: null });
     } catch (e) {
       set({ error: (e as Error).message });
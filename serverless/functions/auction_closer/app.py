@@ -3,6 +3,7 @@ import os
 import requests
 import boto3
 import logging
+from datetime import datetime
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -10,11 +11,13 @@ logger.setLevel(logging.INFO)
 auction_service_url = os.environ.get('AUCTION_SERVICE_URL', 'http://auction-service:8002')
 step_functions_arn = os.environ.get('AUCTION_CLOSE_WORKFLOW_ARN')
 sfn_client = boto3.client('stepfunctions')
+# Module level, so warm invocations reuse the keep-alive connection
+http = requests.Session()
 
 def lambda_handler(event, context):
     try:
         # Get auctions ending soon
-        response = requests.get(f"{auction_service_url}/api/v1/auction/auctions/ending/")
+        response = http.get(f"{auction_service_url}/api/v1/auction/auctions/ending/", timeout=(2, 10))
         if response.status_code != 200:
              logger.error(f"Failed to fetch ending auctions: {response.text}")
              return
@@ -22,17 +25,22 @@ def lambda_handler(event, context):
         auctions = response.json()
         
         for auction in auctions:
-            # Start workflow
-            execution_name = f"AuctionClose-{auction['listing_id']}-{auction['end_time']}"
+            # Start workflow. Same name as the auction-service scheduler uses, so an
+            # auction it already started is rejected as a duplicate here.
+            end_ts = int(datetime.fromisoformat(auction['end_time'].replace('Z', '+00:00')).timestamp())
+            execution_name = f"AuctionClose-{auction['listing_id']}-{end_ts}"
             
-            sfn_client.start_execution(
-                stateMachineArn=step_functions_arn,
-                name=execution_name,
-                input=json.dumps({
-                    'listing_id': auction['listing_id'],
-                    'end_time': auction['end_time']
-                })
-            )
+            try:
+                sfn_client.start_execution(
+                    stateMachineArn=step_functions_arn,
+                    name=execution_name,
+                    input=json.dumps({
+                        'listing_id': auction['listing_id'],
+                        'end_time': auction['end_time']
+                    })
+                )
+            except sfn_client.exceptions.ExecutionAlreadyExists:
+                continue
             logger.info(f"Started close workflow for {auction['listing_id']}")
             
         return {
@@ -2,6 +2,7 @@
 Build and sign a Dogecoin withdrawal tx: listunspent -> createrawtransaction -> sign with xpriv -> return signed hex.
 Expects event: amount, address. Uses HOT_WALLET_DERIVATION_INDEX and WALLET_MASTER_XPRIV (or secret ARN).
 """
+import functools
 import json
 import logging
 import os
@@ -41,6 +42,8 @@ def _rpc(method: str, params: list):
     return data.get("result")
 
 
+# Derivation is pure-Python EC math (~0.3s for both keys); warm invocations reuse the result
+@functools.lru_cache(maxsize=4)
 def _derive_address_and_wif(xpub: str, xpriv: str, path_index: int) -> tuple:
     from hdwallet import HDWallet
     from hdwallet.symbols import DOGE
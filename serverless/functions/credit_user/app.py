@@ -7,9 +7,37 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 WALLET_SERVICE_URL = os.environ.get("WALLET_SERVICE_URL", "http://wallet-service:8003")
+# Module level, so warm invocations reuse the keep-alive connection; retries are the state machine's
+http = requests.Session()
+# Deposits per internal/credit-deposits call (the wallet accepts up to 5000)
+BATCH_SIZE = int(os.environ.get("CREDIT_BATCH_SIZE", "1000"))
+
+
+def _credit_batch(deposits):
+    """Credit {address, amount, txid} deposits through the batch endpoint; returns counts per status."""
+    url = f"{WALLET_SERVICE_URL.rstrip('/')}/api/v1/wallet/internal/credit-deposits/"
+    counts = {}
+    for start in range(0, len(deposits), BATCH_SIZE):
+        chunk = deposits[start:start + BATCH_SIZE]
+        try:
+            resp = http.post(url, json={"deposits": chunk}, timeout=(2, 30))
+        except requests.RequestException as e:
+            logger.error(f"Credit deposits request failed: {e}")
+            raise
+        resp.raise_for_status()
+        for result in resp.json()["results"]:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if result["status"] in ("unknown_address", "invalid"):
+                logger.warning(f"Deposit not credited ({result['status']}): {result['txid']} to {result['address']}")
+    logger.info(f"Credited deposit batch of {len(deposits)}: {counts}")
+    return counts
 
 
 def lambda_handler(event, context):
+    # Batch form: {"deposits": [{address, amount, txid}, ...]}; one transaction per BATCH_SIZE deposits
+    if "deposits" in event:
+        return _credit_batch(event["deposits"] or [])
+
     address = event.get("address")
     amount = event.get("amount")
     txid = event.get("txid")
@@ -19,7 +47,7 @@ def lambda_handler(event, context):
     url = f"{WALLET_SERVICE_URL.rstrip('/')}/api/v1/wallet/internal/credit-deposit/"
     payload = {"address": address, "amount": amount, "txid": txid}
     try:
-        resp = requests.post(url, json=payload, timeout=30)
+        resp = http.post(url, json=payload, timeout=(2, 30))
     except requests.RequestException as e:
         logger.error(f"Credit deposit request failed: {e}")
         raise
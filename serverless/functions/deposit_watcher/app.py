@@ -1,7 +1,9 @@
+import hashlib
 import json
 import os
 import requests
 import boto3
+import redis
 import logging
 
 logger = logging.getLogger()
@@ -12,6 +14,19 @@ rpc_user = os.environ.get('DOGECOIN_RPC_USER')
 rpc_password = os.environ.get('DOGECOIN_RPC_PASSWORD')
 event_bus_name = os.environ.get('EVENT_BUS_NAME', 'dbay-events')
 events_client = boto3.client('events')
+ssm_client = boto3.client('ssm')
+redis_client = redis.from_url(os.environ.get('REDIS_URL', 'redis://redis-cluster:6379/0'), decode_responses=True)
+# Last scanned block hash; with no cursor the first run scans from DEPOSIT_WATCHER_START_BLOCK ("" = the whole wallet history)
+cursor_parameter = os.environ.get('DEPOSIT_CURSOR_PARAMETER', '/dbay/deposit-watcher/last-block')
+start_block = os.environ.get('DEPOSIT_WATCHER_START_BLOCK', '')
+RESCAN_CONFIRMATIONS = int(os.environ.get('DEPOSIT_RESCAN_CONFIRMATIONS', '6'))
+# Published (txid, address) pairs are remembered well past the rescan window
+SEEN_TTL_SECONDS = 7 * 24 * 3600
+PUT_EVENTS_BATCH = 10
+wallet_service_url = os.environ.get('WALLET_SERVICE_URL', 'http://wallet-service:8003')
+# Module level, so warm invocations keep the connection and the downloaded address filter
+http = requests.Session()
+_address_filter = {'etag': None, 'bits': 0, 'hashes': 0, 'data': b''}
 
 
 def _rpc_post(payload):
@@ -21,52 +36,155 @@ def _rpc_post(payload):
     return requests.post(rpc_url, json=payload, auth=auth, timeout=30)
 
 
+def _refresh_address_filter():
+    """
+    Fetch the wallet's Bloom filter of our deposit addresses if it changed since the last
+    invocation. Returns False when no filter is available; a failed refresh drops the
+    cached filter too, as it may be missing addresses added since.
+    """
+    url = f"{wallet_service_url.rstrip('/')}/api/v1/wallet/internal/address-filter/"
+    headers = {'If-None-Match': _address_filter['etag']} if _address_filter['etag'] else {}
+    try:
+        resp = http.get(url, headers=headers, timeout=(2, 30))
+        if resp.status_code != 304:
+            resp.raise_for_status()
+            _address_filter.update(
+                etag=resp.headers.get('ETag'),
+                bits=int(resp.headers['X-Bloom-Bits']),
+                hashes=int(resp.headers['X-Bloom-Hashes']),
+                data=resp.content,
+            )
+    except (requests.RequestException, KeyError, ValueError) as e:
+        logger.warning(f"Address filter refresh failed, not filtering: {e}")
+        _address_filter.update(etag=None, bits=0, hashes=0, data=b'')
+    return _address_filter['bits'] > 0
+
+
+def _might_be_ours(address):
+    # Same positions as wallet-service wallet/address_index.py: double hashing over SHA-256
+    bits, data = _address_filter['bits'], _address_filter['data']
+    digest = hashlib.sha256(address.encode()).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:16], 'big') | 1
+    for i in range(_address_filter['hashes']):
+        position = (h1 + i * h2) % bits
+        if not data[position >> 3] & (0x80 >> (position & 7)):
+            return False
+    return True
+
+
+def _rpc(method, params):
+    response = _rpc_post({"method": method, "params": params, "id": 1, "jsonrpc": "2.0"})
+    response.raise_for_status()
+    data = response.json()
+    if data.get('error'):
+        raise RuntimeError(data['error'])
+    return data.get('result')
+
+
+def _load_cursor():
+    try:
+        return ssm_client.get_parameter(Name=cursor_parameter)['Parameter']['Value']
+    except ssm_client.exceptions.ParameterNotFound:
+        return start_block
+
+
+def _save_cursor(blockhash):
+    ssm_client.put_parameter(Name=cursor_parameter, Value=blockhash, Type='String', Overwrite=True)
+
+
+def _seen_key(tx):
+    return f"deposit-watcher:seen:{tx.get('txid')}:{tx.get('address')}"
+
+
+def _changed(tx, seen):
+    """New pair, a different amount, or moved to another block by a reorg; mempool -> mined is not a change."""
+    if seen is None:
+        return True
+    amount, _, blockhash = seen.partition('|')
+    if amount != str(tx.get('amount')):
+        return True
+    return bool(blockhash and tx.get('blockhash') and blockhash != tx['blockhash'])
+
+
+def _new_or_changed(receives, removed):
+    """The receives not already published as they are now. Without Redis, all of them (consumers are idempotent)."""
+    try:
+        if removed:
+            # Reorged out: publish again if they come back
+            redis_client.delete(*{_seen_key(tx) for tx in removed})
+        seen = redis_client.mget([_seen_key(tx) for tx in receives]) if receives else []
+    except redis.RedisError as e:
+        logger.warning(f"Seen-deposit lookup failed, publishing all: {e}")
+        return list(receives)
+    return [tx for tx, previous in zip(receives, seen) if _changed(tx, previous)]
+
+
+def _mark_seen(txs):
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tx in txs:
+            pipe.set(_seen_key(tx), f"{tx.get('amount')}|{tx.get('blockhash') or ''}", ex=SEEN_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record published deposits: {e}")
+
+
+def _publish(txs):
+    """PutEvents in batches of PUT_EVENTS_BATCH; returns the txs whose events were accepted."""
+    published = []
+    for i in range(0, len(txs), PUT_EVENTS_BATCH):
+        batch = txs[i:i + PUT_EVENTS_BATCH]
+        entries = [{
+            'Source': 'dbay.deposit-watcher',
+            'DetailType': 'deposit.detected',
+            'Detail': json.dumps({
+                "txid": tx.get('txid'),
+                "address": tx.get('address'),
+                "amount": str(tx.get('amount')),
+                "confirmations": tx.get('confirmations'),
+            }),
+            'EventBusName': event_bus_name,
+        } for tx in batch]
+        results = events_client.put_events(Entries=entries)['Entries']
+        for tx, result in zip(batch, results):
+            if result.get('EventId'):
+                published.append(tx)
+            else:
+                logger.error(f"deposit.detected for {tx.get('txid')} rejected: {result.get('ErrorCode')} {result.get('ErrorMessage')}")
+    return published
+
+
 def lambda_handler(event, context):
     try:
-        payload = {
-            "method": "listtransactions",
-            "params": ["*", 10, 0],
-            "id": 1,
-            "jsonrpc": "2.0"
-        }
-        response = _rpc_post(payload)
-        response.raise_for_status()
-        result = response.json().get('result', [])
-        
-        new_txs = []
-        # Filter for 'receive' category
-        for tx in result:
-            if tx.get('category') == 'receive':
-                # Check if processed (idempotency handled by consumer/workflow)
-                # But to avoid spamming events, we might want to store last processed txid in SSM or DynamoDB.
-                # For simplicity, we just publish everything and let the consumer handle idempotency.
-                
-                detail = {
-                    "txid": tx.get('txid'),
-                    "address": tx.get('address'),
-                    "amount": str(tx.get('amount')),
-                    "confirmations": tx.get('confirmations')
-                }
-                
-                # Publish event
-                events_client.put_events(
-                    Entries=[
-                        {
-                            'Source': 'dbay.deposit-watcher',
-                            'DetailType': 'deposit.detected',
-                            'Detail': json.dumps(detail),
-                            'EventBusName': event_bus_name
-                        }
-                    ]
-                )
-                new_txs.append(detail)
-                
-        logger.info(f"Processed {len(new_txs)} transactions")
+        cursor = _load_cursor()
+        # target_confirmations: lastblock trails the tip, so the next run rescans the last blocks
+        # and sees reorgs there; the seen set keeps the rescan from publishing twice
+        result = _rpc('listsinceblock', [cursor, RESCAN_CONFIRMATIONS])
+        receives = [tx for tx in result.get('transactions', []) if tx.get('category') == 'receive']
+        removed = [tx for tx in result.get('removed', []) if tx.get('category') == 'receive']
+
+        # No filter (wallet unreachable on a cold start): publish everything, as the wallet rejects foreign addresses anyway
+        filtering = _refresh_address_filter()
+        ours = [tx for tx in receives if not filtering or _might_be_ours(tx.get('address') or '')]
+        foreign = len(receives) - len(ours)
+
+        new_txs = _new_or_changed(ours, removed)
+        published = _publish(new_txs)
+        _mark_seen(published)
+        # Rejected events are retried next run: the cursor stays put and they are not marked seen
+        if len(published) == len(new_txs) and result.get('lastblock'):
+            _save_cursor(result['lastblock'])
+
+        logger.info(
+            f"Scanned {len(receives)} receives since {cursor or 'genesis'}: published {len(published)}, "
+            f"{len(ours) - len(new_txs)} already published, {foreign} to foreign addresses"
+        )
         return {
             'statusCode': 200,
-            'body': json.dumps(f"Processed {len(new_txs)} transactions")
+            'body': json.dumps(f"Processed {len(published)} transactions")
         }
-        
+
     except Exception as e:
         logger.error(f"Error checking deposits: {e}")
         raise e
@@ -6,6 +6,8 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 WALLET_SERVICE_URL = os.environ.get("WALLET_SERVICE_URL", "http://wallet-service:8003")
+# Module level, so warm invocations reuse the keep-alive connection; retries are the state machine's
+http = requests.Session()
 
 
 def lambda_handler(event, context):
@@ -17,6 +19,6 @@ def lambda_handler(event, context):
 
     url = f"{WALLET_SERVICE_URL.rstrip('/')}/api/v1/wallet/internal/finalize-withdrawal/"
     payload = {"withdrawal_id": withdrawal_id, "txid": txid}
-    resp = requests.post(url, json=payload, timeout=30)
+    resp = http.post(url, json=payload, timeout=(2, 30))
     resp.raise_for_status()
     return {}
\ No newline at end of file
@@ -0,0 +1,355 @@
+"""
+Bid contention benchmark (`python manage.py bench_bids`).
+
+Runs concurrent bidders against AuctionService.place_bid in-process, using the
+configured Postgres and Redis. The wallet and listing services are replaced by a local
+HTTP stand-in (unlimited funds, optional added latency), so a run measures the auction
+service alone. Scenarios:
+
+    hot    every client bids on one listing ending in 4 minutes, so accepted bids keep
+           extending it
+    warm   clients spread their bids over --listings listings
+    snipe  one listing ending in --snipe-seconds; clients wait on a barrier and fire
+           together half a second before the end
+
+The result is one JSON document (accepted/rejected per second, latency and lock wait
+p50/p99, DB queries per bid, anti-snipe extensions, rejection reasons) so runs can be
+compared across changes. Benchmark listings use fresh ids and are deleted afterwards;
+point it at a development database, never a live one.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.db import connection
+from django.utils import timezone
+from shared.cache import cache
+from . import bid_summary, bidder_index, redis_state, sequencer, services
+from .models import AuctionState, Bid
+from .proxy import minimum_bid
+
+SCENARIOS = ('hot', 'warm', 'snipe')
+STARTING_PRICE = 10
+HOT_ENDS_IN = timedelta(minutes=4)
+WARM_ENDS_IN = timedelta(hours=1)
+EXTENSION = timedelta(minutes=5)
+# A leading client waits for someone to outbid it instead of bidding against itself
+LEADER_PAUSE_SECONDS = 0.01
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Wallet internal endpoints always succeed; listing GETs serve the benchmark listings."""
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.server.latency)
+        if self.path.rstrip('/').endswith('reference-holds'):
+            self._reply(200, {})
+        else:
+            self._reply(200, {'status': 'ok'})
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        listing = self.server.listings.get(self.path.rstrip('/').rsplit('/', 1)[-1])
+        if listing is None:
+            self._reply(404, {'error': 'Not found'})
+        else:
+            self._reply(200, listing)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServices:
+    """Wallet + listing stand-in on an ephemeral local port; the service clients point at it while running."""
+
+    def __init__(self, listings, latency_ms=0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        self.server.daemon_threads = True
+        self.server.listings = {listing['id']: listing for listing in listings}
+        self.server.latency = latency_ms / 1000
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self._saved = (services.wallet_client.base_url, services.listing_client.base_url)
+        services.wallet_client.base_url = services.listing_client.base_url = self.url
+        threading.Thread(target=self.server.serve_forever, name='bench-stand-in', daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        services.wallet_client.base_url, services.listing_client.base_url = self._saved
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _TimedLock:
+    def __init__(self, lock, samples):
+        self._lock = lock
+        self._samples = samples
+
+    def acquire(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._lock.acquire(*args, **kwargs)
+        finally:
+            self._samples.append(time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._lock, name)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.accepted_latencies = []
+        self.lock_waits = []
+        self.rejections = {}
+        self.queries = 0
+
+    def count_query(self, execute, sql, params, many, context):
+        with self._lock:
+            self.queries += 1
+        return execute(sql, params, many, context)
+
+    def record(self, seconds, error=None):
+        with self._lock:
+            self.latencies.append(seconds)
+            if error is None:
+                self.accepted_latencies.append(seconds)
+            else:
+                # "Bid must be at least 105" and "... 110" are the same rejection
+                reason = re.sub(r'\d+(\.\d+)?', 'N', error)[:80]
+                self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+
+def percentiles(samples):
+    """p50/p99/max in milliseconds (nearest rank); None without samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1)]
+
+    return {
+        'p50': round(rank(50) * 1000, 2),
+        'p99': round(rank(99) * 1000, 2),
+        'max': round(ordered[-1] * 1000, 2),
+    }
+
+
+def _listing_payload(listing_id, ends_in):
+    return {
+        'id': listing_id,
+        'listing_type': 'AUCTION',
+        'starting_price': str(STARTING_PRICE),
+        'end_time': (timezone.now() + ends_in).isoformat(),
+    }
+
+
+def _next_amount(listing_id, bidder_id):
+    """Clients bid off the live snapshot like the UI does; None while they are the leader."""
+    snapshot = redis_state.read_snapshot(listing_id)
+    if snapshot is None:
+        return STARTING_PRICE
+    if snapshot['high_bidder_id'] == bidder_id:
+        return None
+    return minimum_bid(snapshot['current_price'], snapshot['bid_count']) + random.choice((0, 0, 1, 5))
+
+
+def _client(bidder_id, listing_ids, start_at, stop_at, barrier, metrics):
+    try:
+        with connection.execute_wrapper(metrics.count_query):
+            barrier.wait()
+            time.sleep(max(0.0, start_at - time.monotonic()))
+            while time.monotonic() < stop_at:
+                listing_id = random.choice(listing_ids)
+                amount = _next_amount(listing_id, bidder_id)
+                if amount is None:
+                    time.sleep(LEADER_PAUSE_SECONDS)
+                    continue
+                started = time.perf_counter()
+                try:
+                    services.auction_service.place_bid(listing_id, bidder_id, amount)
+                    error = None
+                except Exception as e:
+                    error = str(e)
+                metrics.record(time.perf_counter() - started, error)
+    finally:
+        connection.close()
+
+
+# Queue and stream key names of the live deployment; a run never drains these
+_SHARED_QUEUE_KEYS = (redis_state.PENDING_BIDS_KEY, redis_state.PROCESSING_PREFIX, redis_state.CLAIMS_KEY,
+                      sequencer.STREAM_PREFIX)
+
+
+def _queue_keys():
+    return (redis_state.PENDING_BIDS_KEY, redis_state.PROCESSING_PREFIX, redis_state.CLAIMS_KEY,
+            sequencer.STREAM_PREFIX)
+
+
+@contextmanager
+def isolated_queues(run_id):
+    """
+    Point the pending-bid queue, its claims and the sequencer streams at keys of this run
+    only, so the benchmark's persister and consumers never take entries from (or leave
+    entries for) the workers of a running deployment. Yields the key prefix.
+    """
+    prefix = f"bench:{run_id}:"
+    saved = _queue_keys()
+    redis_state.PENDING_BIDS_KEY, redis_state.PROCESSING_PREFIX, redis_state.CLAIMS_KEY, sequencer.STREAM_PREFIX = (
+        prefix + key for key in saved
+    )
+    try:
+        yield prefix
+    finally:
+        redis_state.PENDING_BIDS_KEY, redis_state.PROCESSING_PREFIX, redis_state.CLAIMS_KEY, sequencer.STREAM_PREFIX = saved
+        keys = list(cache.redis.scan_iter(match=f"{prefix}*"))
+        if keys:
+            cache.redis.delete(*keys)
+
+
+def _background(stop, metrics, mode):
+    """The out-of-request workers the mode relies on: the persister or the shard consumers."""
+    if mode in ('script', 'sequencer') and set(_queue_keys()) & set(_SHARED_QUEUE_KEYS):
+        raise RuntimeError(f"{mode} mode drains the bid queue; run it inside isolated_queues()")
+
+    def persister():
+        try:
+            with connection.execute_wrapper(metrics.count_query):
+                while not stop.is_set():
+                    if not services.auction_service.persist_pending_bids():
+                        time.sleep(0.05)
+                while services.auction_service.persist_pending_bids():
+                    pass
+        finally:
+            connection.close()
+
+    def consumer(shard):
+        try:
+            with connection.execute_wrapper(metrics.count_query):
+                worker = sequencer.BidSequencer(shard, consumer_name=f"bench-{shard}")
+                while not stop.is_set():
+                    worker.run_once(block_ms=200)
+        finally:
+            connection.close()
+
+    if mode == 'script':
+        targets = [(persister, ())]
+    elif mode == 'sequencer':
+        targets = [(consumer, (shard,)) for shard in range(sequencer.SEQUENCER_SHARDS)]
+    else:
+        targets = []
+    threads = [threading.Thread(target=target, args=args, daemon=True) for target, args in targets]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _cleanup(listing_ids, bidder_ids):
+    Bid.objects.filter(listing_id__in=listing_ids).delete()
+    AuctionState.objects.filter(listing_id__in=listing_ids).delete()
+    keys = [redis_state.state_key(listing_id) for listing_id in listing_ids]
+    for listing_id in listing_ids:
+        keys.extend(bid_summary._keys(listing_id))
+    keys.extend(bidder_index.bidder_key(bidder_id) for bidder_id in bidder_ids)
+    cache.redis.delete(*keys)
+    cache.redis.zrem(redis_state.SCHEDULE_KEY, *listing_ids)
+
+
+def run(scenario='hot', clients=50, duration=10.0, mode=None, listings=100, snipe_seconds=3.0,
+        wallet_latency_ms=0, keep=False):
+    """Run one bid storm and return its result as a dict."""
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {scenario!r}; expected one of {', '.join(SCENARIOS)}")
+    mode = mode or services.BID_MODE
+
+    if scenario == 'warm':
+        ends_in, count = WARM_ENDS_IN, listings
+    elif scenario == 'snipe':
+        ends_in, count = timedelta(seconds=snipe_seconds), 1
+    else:
+        ends_in, count = HOT_ENDS_IN, 1
+    payloads = [_listing_payload(str(uuid.uuid4()), ends_in) for _ in range(count)]
+    listing_ids = [payload['id'] for payload in payloads]
+    bidder_ids = [str(uuid.uuid4()) for _ in range(clients)]
+    initial_end = {}
+    for payload in payloads:
+        state = services.auction_service.sync_listing_state(payload)
+        initial_end[payload['id']] = state.end_time
+
+    metrics = Metrics()
+    saved_mode = services.BID_MODE
+    services.BID_MODE = mode
+    service = services.auction_service
+    bid_lock = service._bid_lock
+    # Only the bid path's lock is timed; the shared Redis client is left alone
+    service._bid_lock = lambda listing_id: _TimedLock(bid_lock(listing_id), metrics.lock_waits)
+    stop = threading.Event()
+    try:
+        with StandInServices(payloads, wallet_latency_ms), isolated_queues(uuid.uuid4().hex[:12]):
+            workers = _background(stop, metrics, mode)
+            barrier = threading.Barrier(clients)
+            start_at = time.monotonic()
+            if scenario == 'snipe':
+                start_at += (initial_end[listing_ids[0]] - timezone.now()).total_seconds() - 0.5
+            stop_at = start_at + duration
+            threads = [
+                threading.Thread(target=_client, args=(bidder_id, listing_ids, start_at, stop_at, barrier, metrics))
+                for bidder_id in bidder_ids
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - start_at
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+        extensions = 0
+        for state in AuctionState.objects.filter(listing_id__in=listing_ids):
+            extensions += max(0, round((state.end_time - initial_end[str(state.listing_id)]) / EXTENSION))
+    finally:
+        stop.set()
+        del service._bid_lock
+        services.BID_MODE = saved_mode
+        if not keep:
+            _cleanup(listing_ids, bidder_ids)
+
+    attempts = len(metrics.latencies)
+    accepted = len(metrics.accepted_latencies)
+    return {
+        'scenario': scenario,
+        'mode': mode,
+        'clients': clients,
+        'listings': count,
+        'duration_s': round(elapsed, 3),
+        'wallet_latency_ms': wallet_latency_ms,
+        'accepted': accepted,
+        'rejected': attempts - accepted,
+        'accepted_per_s': round(accepted / elapsed, 2),
+        'rejected_per_s': round((attempts - accepted) / elapsed, 2),
+        'latency_ms': percentiles(metrics.latencies),
+        'accepted_latency_ms': percentiles(metrics.accepted_latencies),
+        'lock_wait_ms': percentiles(metrics.lock_waits),
+        'queries_per_bid': round(metrics.queries / attempts, 2) if attempts else None,
+        'extensions': extensions,
+        'rejections': dict(sorted(metrics.rejections.items(), key=lambda item: -item[1])),
+    }
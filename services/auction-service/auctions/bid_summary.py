@@ -0,0 +1,174 @@
+"""
+Cached bid summary per auction: bid count, unique bidders, price ladder and the last
+few bids, so listing pages never need the full bid history.
+
+Four keys per auction, updated incrementally (one script call) after every accepted
+bid - synchronously in lock mode, from persist_pending_bids in script mode:
+
+    auction:{id}:summary   hash  count, current_price, version
+    auction:{id}:bidders   set   bidder ids
+    auction:{id}:recent    list  newest-first JSON bids, capped at RECENT_SIZE
+    auction:{id}:ladder    zset  distinct bid amounts, capped at LADDER_SIZE highest
+
+Updates carry the AuctionState version and are skipped when the summary is already
+at or past it, so replays from the at-least-once persister are harmless. An update
+that does not continue the cached bid count means one was missed; the summary is then
+dropped, and a missing summary is rebuilt from Postgres on read.
+"""
+import json
+
+from django.db import transaction
+from shared.cache import cache
+from .models import AuctionState, Bid
+
+RECENT_SIZE = 10
+LADDER_SIZE = 20
+# Refreshed on every update; a summary that expires is simply rebuilt on the next read
+SUMMARY_TTL = 60 * 60 * 24 * 3
+
+# KEYS: summary, bidders, recent, ladder
+# ARGV: version, count_after, price, recent_size, ladder_size, ttl, then (bidder_id, amount, bid_json) triples
+RECORD_LUA = """
+local n = (#ARGV - 6) / 3
+local summary = redis.call('HMGET', KEYS[1], 'version', 'count')
+if summary[1] then
+    if tonumber(summary[1]) >= tonumber(ARGV[1]) then
+        return 0
+    end
+end
+if (tonumber(summary[2]) or 0) + n ~= tonumber(ARGV[2]) then
+    -- Missed an update (or a rebuild raced this bid): drop it and let the next read rebuild
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+    return 0
+end
+for i = 7, #ARGV, 3 do
+    redis.call('SADD', KEYS[2], ARGV[i])
+    redis.call('ZADD', KEYS[4], ARGV[i + 1], ARGV[i + 1])
+    redis.call('LPUSH', KEYS[3], ARGV[i + 2])
+end
+redis.call('LTRIM', KEYS[3], 0, tonumber(ARGV[4]) - 1)
+redis.call('ZREMRANGEBYRANK', KEYS[4], 0, -tonumber(ARGV[5]) - 1)
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'count', ARGV[2], 'current_price', ARGV[3])
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[6])
+end
+return 1
+"""
+
+# KEYS: summary, bidders, recent, ladder
+# ARGV: version, count, price, ttl, n_bidders, n_recent, then bidders, recent (newest first), ladder amounts
+REBUILD_LUA = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'count', ARGV[2], 'current_price', ARGV[3])
+local first_bidder = 7
+local first_recent = first_bidder + tonumber(ARGV[5])
+local first_ladder = first_recent + tonumber(ARGV[6])
+for i = first_bidder, first_recent - 1 do
+    redis.call('SADD', KEYS[2], ARGV[i])
+end
+for i = first_recent, first_ladder - 1 do
+    redis.call('RPUSH', KEYS[3], ARGV[i])
+end
+for i = first_ladder, #ARGV do
+    redis.call('ZADD', KEYS[4], ARGV[i], ARGV[i])
+end
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+return 1
+"""
+
+_scripts = {}
+
+
+def _script(source):
+    if source not in _scripts:
+        _scripts[source] = cache.redis.register_script(source)
+    return _scripts[source]
+
+
+def _keys(listing_id):
+    return [
+        f"auction:{listing_id}:summary",
+        f"auction:{listing_id}:bidders",
+        f"auction:{listing_id}:recent",
+        f"auction:{listing_id}:ladder",
+    ]
+
+
+def _amount(value):
+    return format(value.normalize(), 'f')
+
+
+def _bid_json(bid):
+    return json.dumps({
+        'id': str(bid.id),
+        'bidder_id': str(bid.bidder_id),
+        'amount': _amount(bid.amount),
+        'created_at': bid.created_at.isoformat(),
+    })
+
+
+def record_bids(listing_id, version, bid_count, current_price, bids):
+    """Apply the Bid rows created by one accepted bid (oldest first)."""
+    args = [version, bid_count, _amount(current_price), RECENT_SIZE, LADDER_SIZE, SUMMARY_TTL]
+    for bid in bids:
+        args.extend([str(bid.bidder_id), _amount(bid.amount), _bid_json(bid)])
+    return bool(_script(RECORD_LUA)(keys=_keys(listing_id), args=args))
+
+
+def rebuild(listing_id):
+    """Recompute the summary from Postgres. Returns False if there is no AuctionState."""
+    with transaction.atomic():
+        # Row lock orders the rebuild after any in-flight bid transaction on this auction
+        state = AuctionState.objects.select_for_update().filter(listing_id=listing_id).first()
+        if state is None:
+            return False
+        bids = Bid.objects.filter(listing_id=listing_id)
+        bidders = [str(b) for b in bids.values_list('bidder_id', flat=True).distinct()]
+        recent = [_bid_json(b) for b in bids.order_by('-created_at', '-amount')[:RECENT_SIZE]]
+        ladder = [
+            _amount(a) for a in
+            bids.order_by('-amount').values_list('amount', flat=True).distinct()[:LADDER_SIZE]
+        ]
+        count = state.bid_count
+        version = state.version
+        price = state.current_price
+
+    args = [version, count, _amount(price), SUMMARY_TTL, len(bidders), len(recent)]
+    args.extend(bidders)
+    args.extend(recent)
+    args.extend(ladder)
+    _script(REBUILD_LUA)(keys=_keys(listing_id), args=args)
+    return True
+
+
+def _read(listing_id):
+    summary_key, bidders_key, recent_key, ladder_key = _keys(listing_id)
+    pipe = cache.redis.pipeline(transaction=False)
+    pipe.hgetall(summary_key)
+    pipe.scard(bidders_key)
+    pipe.lrange(recent_key, 0, RECENT_SIZE - 1)
+    pipe.zrevrange(ladder_key, 0, LADDER_SIZE - 1)
+    return pipe.execute()
+
+
+def get_summary(listing_id):
+    """The summary as a dict, rebuilding it on a miss; None for an unknown auction."""
+    summary, unique_bidders, recent, ladder = _read(listing_id)
+    if not summary:
+        if not rebuild(listing_id):
+            return None
+        summary, unique_bidders, recent, ladder = _read(listing_id)
+    return {
+        'listing_id': str(listing_id),
+        'bid_count': int(summary.get('count', 0)),
+        'unique_bidders': unique_bidders,
+        'current_price': summary.get('current_price'),
+        'price_ladder': ladder,
+        'recent_bids': [json.loads(item) for item in recent],
+    }
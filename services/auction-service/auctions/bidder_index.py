@@ -0,0 +1,94 @@
+"""
+Per-bidder index of active auctions for the "my bids" view.
+
+`auction:bidder:{bidder_id}:active` is a sorted set of the listings a user has bid on,
+scored by their highest bid there (ZADD GT). It is updated with every accepted bid
+(lock mode right after the DB transaction, script mode from persist_pending_bids),
+rebuilt from the (bidder_id, listing_id, -amount) index when it lacks the BUILT_MARKER
+member, and trimmed lazily: auctions found closed while reading are removed. The marker
+lives in the set itself, so a set evicted and then recreated by a new bid is rebuilt
+instead of being read as complete.
+"""
+from django.db.models import Max
+from shared.cache import cache
+from .models import AuctionState, Bid
+from . import redis_state
+
+BUILT_MARKER = 'built'
+
+
+def bidder_key(bidder_id):
+    return f"auction:bidder:{bidder_id}:active"
+
+
+def record_bids(listing_id, bids):
+    """Add the auction to the index of every bidder in one accepted bid's rows."""
+    pipe = cache.redis.pipeline(transaction=False)
+    for bid in bids:
+        pipe.zadd(bidder_key(bid.bidder_id), {str(listing_id): float(bid.amount)}, gt=True)
+    pipe.execute()
+
+
+def rebuild(bidder_id):
+    rows = (
+        Bid.objects.filter(
+            bidder_id=bidder_id,
+            listing_id__in=AuctionState.objects.filter(status='OPEN').values('listing_id')
+        )
+        .values('listing_id')
+        .annotate(top=Max('amount'))
+    )
+    mapping = {str(row['listing_id']): float(row['top']) for row in rows}
+    # GT keeps any higher bid recorded while this ran
+    cache.redis.zadd(bidder_key(bidder_id), {**mapping, BUILT_MARKER: 0}, gt=True)
+    return mapping
+
+
+def active_auctions(bidder_id):
+    """{listing_id: bidder's highest bid} for the auctions the user is bidding on."""
+    auctions = dict(cache.redis.zrange(bidder_key(bidder_id), 0, -1, withscores=True))
+    if auctions.pop(BUILT_MARKER, None) is None:
+        return rebuild(bidder_id)
+    return auctions
+
+
+def my_bids(bidder_id):
+    """
+    The user's active auctions joined with the cached AuctionState, soonest-ending
+    first: two Redis round trips, plus one Postgres query only for missing snapshots.
+    """
+    bidder_id = str(bidder_id)
+    auctions = active_auctions(bidder_id)
+    if not auctions:
+        return []
+
+    snapshots = redis_state.read_snapshots(auctions)
+    missing = [listing_id for listing_id, snap in snapshots.items() if snap is None]
+    if missing:
+        for state in AuctionState.objects.filter(listing_id__in=missing):
+            if state.status == 'OPEN':
+                redis_state.write_snapshot(state)
+            snapshot = {field: str(value) for field, value in redis_state.snapshot_from_state(state).items()}
+            snapshots[str(state.listing_id)] = redis_state.parse_snapshot(snapshot)
+
+    results = []
+    ended = []
+    for listing_id, top_bid in auctions.items():
+        snap = snapshots.get(listing_id)
+        if snap is None or snap['status'] != 'OPEN':
+            ended.append(listing_id)
+            continue
+        results.append({
+            'listing_id': listing_id,
+            'my_max_bid': str(int(top_bid)),
+            'bid_status': 'winning' if snap['high_bidder_id'] == bidder_id else 'outbid',
+            'current_price': str(snap['current_price']),
+            'bid_count': snap['bid_count'],
+            'end_time': snap['end_time'].isoformat(),
+            'is_extended': snap['is_extended'],
+        })
+    if ended:
+        cache.redis.zrem(bidder_key(bidder_id), *ended)
+
+    results.sort(key=lambda r: r['end_time'])
+    return results
@@ -0,0 +1,69 @@
+"""
+Listing event consumer.
+
+listing.created/listing.updated events are routed by EventBridge to an SQS queue
+(AUCTION_EVENTS_QUEUE_URL). Each one pre-creates or refreshes the AuctionState and its
+Redis snapshot, so the first bid on a listing never waits on the listing service.
+"""
+import json
+import logging
+import os
+import time
+
+import boto3
+from .services import auction_service
+
+logger = logging.getLogger(__name__)
+
+LISTING_EVENT_TYPES = ('listing.created', 'listing.updated')
+
+
+def handle_event(detail_type, detail):
+    if detail_type in LISTING_EVENT_TYPES and detail.get('id'):
+        return auction_service.sync_listing_state(detail)
+    return None
+
+
+def poll_queue(queue_url=None, once=False):
+    """Long-poll the queue; returns how many events were handled when once=True."""
+    sqs = boto3.client('sqs',
+        endpoint_url=os.environ.get('AWS_ENDPOINT_URL'),
+        region_name=os.environ.get('AWS_REGION', 'us-east-1')
+    )
+    queue_url = queue_url or os.environ.get('AUCTION_EVENTS_QUEUE_URL')
+    logger.info(f"Polling SQS: {queue_url}")
+
+    handled = 0
+    while True:
+        try:
+            response = sqs.receive_message(
+                QueueUrl=queue_url,
+                MaxNumberOfMessages=10,
+                WaitTimeSeconds=1 if once else 20
+            )
+        except Exception as e:
+            logger.error(f"Error polling SQS: {e}")
+            if once:
+                return handled
+            time.sleep(5)
+            continue
+
+        messages = response.get('Messages', [])
+        processed = []
+        for msg in messages:
+            try:
+                # EventBridge -> SQS directly, so the body is the event envelope
+                body = json.loads(msg['Body'])
+                handle_event(body.get('detail-type'), body.get('detail', {}))
+            except Exception as e:
+                # Left on the queue (malformed bodies too); redelivered after the visibility
+                # timeout until the redrive policy moves it to the DLQ
+                logger.error(f"Error handling message {msg['MessageId']}: {e}")
+                continue
+            processed.append({'Id': msg['MessageId'], 'ReceiptHandle': msg['ReceiptHandle']})
+
+        if processed:
+            sqs.delete_message_batch(QueueUrl=queue_url, Entries=processed)
+            handled += len(processed)
+        if once and not messages:
+            return handled
@@ -0,0 +1,93 @@
+"""
+Idempotency-Key handling for bid submission.
+
+The first request with a key claims it in Redis (one script call) before the auction
+lock or the wallet are touched; a retry with the same key replays the stored response,
+or gets 409 while the original is still running. Keys are scoped per bidder. Failed
+bids release their key so a retry is attempted again.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from shared.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# A claim outlives the bid lock wait (5s) plus wallet calls; a crashed request frees it
+PENDING_TTL = 30
+RESULT_TTL = 60 * 60 * 24
+MAX_KEY_LENGTH = 255
+
+# KEYS: idempotency key. ARGV: pending record, ttl. Returns the existing record, or nil if claimed.
+CLAIM_LUA = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    return existing
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return false
+"""
+
+_claim_script = None
+
+
+class IdempotencyConflict(Exception):
+    """Another request holds the key, or it was used with a different bid."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def _key(bidder_id, idempotency_key):
+    return f"auction:bid:idem:{bidder_id}:{idempotency_key}"
+
+
+def fingerprint(*parts):
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def claim(bidder_id, idempotency_key, request_fingerprint):
+    """
+    Claim the key. Returns None if this request should run, or the stored
+    (status, body) to replay; raises IdempotencyConflict otherwise.
+    """
+    global _claim_script
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise IdempotencyConflict("Idempotency-Key is too long", 400)
+    if _claim_script is None:
+        _claim_script = cache.redis.register_script(CLAIM_LUA)
+    pending = json.dumps({'state': 'pending', 'fingerprint': request_fingerprint})
+    existing = _claim_script(keys=[_key(bidder_id, idempotency_key)], args=[pending, PENDING_TTL])
+    if existing is None:
+        return None
+
+    record = json.loads(existing)
+    if record['fingerprint'] != request_fingerprint:
+        raise IdempotencyConflict("Idempotency-Key was already used for a different bid", 422)
+    if record['state'] == 'pending':
+        raise IdempotencyConflict("A bid with this Idempotency-Key is still being processed", 409)
+    return record['status'], record['body']
+
+
+def complete(bidder_id, idempotency_key, request_fingerprint, status, body):
+    # The bid already went through; a failure here must not turn its response into an error
+    try:
+        cache.redis.set(_key(bidder_id, idempotency_key), json.dumps({
+            'state': 'done',
+            'fingerprint': request_fingerprint,
+            'status': status,
+            'body': body,
+        }, cls=DjangoJSONEncoder), ex=RESULT_TTL)
+    except Exception as e:
+        logger.error(f"Failed to store idempotent response for {idempotency_key}: {e}")
+
+
+def release(bidder_id, idempotency_key):
+    try:
+        cache.redis.delete(_key(bidder_id, idempotency_key))
+    except Exception as e:
+        # The claim expires after PENDING_TTL anyway
+        logger.error(f"Failed to release idempotency key {idempotency_key}: {e}")
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from auctions import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark bid contention with local wallet/listing stand-ins and print JSON results. "
+        "Writes (and then deletes) benchmark auctions: use a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", choices=benchmark.SCENARIOS, default="hot")
+        parser.add_argument("--mode", choices=("lock", "script", "sequencer"),
+                            help="Bid mode to measure (default: AUCTION_BID_MODE)")
+        parser.add_argument("--clients", type=int, default=50, help="Concurrent bidders")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of bidding")
+        parser.add_argument("--listings", type=int, default=100, help="Listings in the warm scenario")
+        parser.add_argument("--snipe-seconds", type=float, default=3.0, help="Time to end in the snipe scenario")
+        parser.add_argument("--wallet-latency-ms", type=float, default=0, help="Added latency of the stand-ins")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark auctions for inspection")
+        parser.add_argument("--output", help="Also write the JSON result to this file")
+
+    def handle(self, *args, **options):
+        result = benchmark.run(
+            scenario=options["scenario"],
+            clients=options["clients"],
+            duration=options["duration"],
+            mode=options["mode"],
+            listings=options["listings"],
+            snipe_seconds=options["snipe_seconds"],
+            wallet_latency_ms=options["wallet_latency_ms"],
+            keep=options["keep"],
+        )
+        output = json.dumps(result, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
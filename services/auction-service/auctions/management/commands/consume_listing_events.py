@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from auctions.event_consumer import poll_queue
+
+
+class Command(BaseCommand):
+    help = "Pre-create and refresh AuctionState rows and Redis snapshots from listing.created/listing.updated events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue-url", default=None, help="Defaults to AUCTION_EVENTS_QUEUE_URL")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+
+    def handle(self, *args, **options):
+        handled = poll_queue(options["queue_url"], once=options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Handled {handled} listing event(s)."))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+
+from auctions.services import auction_service
+
+
+class Command(BaseCommand):
+    help = "Persist bids accepted by the Redis bid script (AUCTION_BID_MODE=script) into Postgres."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            processed = auction_service.persist_pending_bids(batch_size)
+            total += processed
+            if processed:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Persisted {total} accepted bid(s)."))
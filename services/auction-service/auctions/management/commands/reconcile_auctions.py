@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from auctions import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute auction state from the Bid table and compare it with AuctionState, Redis and wallet holds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Parallel scans over listing id ranges")
+        parser.add_argument("--batch-size", type=int, default=200, help="Listings checked per state/wallet round trip")
+        parser.add_argument("--repair", action="store_true", help="Fix mismatches instead of only reporting them")
+        parser.add_argument("--listing", action="append", dest="listings", help="Only this listing (repeatable)")
+
+    def handle(self, *args, **options):
+        if not 1 <= options["batch_size"] <= 1000:
+            self.stderr.write(self.style.ERROR("--batch-size must be between 1 and 1000"))
+            return
+        report = reconcile.reconcile(
+            workers=max(1, options["workers"]),
+            batch_size=options["batch_size"],
+            repair=options["repair"],
+            listing_ids=options["listings"],
+        )
+        self.stdout.write(json.dumps(report.as_dict(), indent=2))
+        issues = sum(report.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {report.checked} auction(s): {issues} issue(s), {report.repaired} repaired."
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from auctions import scheduler
+
+
+class Command(BaseCommand):
+    help = "Start auction close workflows as auctions reach their end time (Redis end-time schedule)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--backfill", action="store_true", help="Load OPEN auctions from Postgres into the schedule first")
+        parser.add_argument("--once", action="store_true", help="Process currently due auctions and exit")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            count = scheduler.backfill()
+            self.stdout.write(self.style.SUCCESS(f"Scheduled {count} open auction(s)."))
+
+        closer = scheduler.AuctionCloseScheduler()
+        if options["once"]:
+            started = closer.run_once(options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Started {started} close workflow(s)."))
+            return
+
+        closer.run(options["batch_size"], options["poll_interval"])
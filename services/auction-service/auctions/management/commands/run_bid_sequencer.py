@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from auctions import sequencer
+
+
+class Command(BaseCommand):
+    help = "Apply queued bids for one shard in order (AUCTION_BID_MODE=sequencer). Run exactly one per shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shard", type=int, required=True, help="0..SEQUENCER_SHARDS-1")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--once", action="store_true", help="Process one batch and exit")
+
+    def handle(self, *args, **options):
+        shard = options["shard"]
+        if not 0 <= shard < sequencer.SEQUENCER_SHARDS:
+            self.stderr.write(self.style.ERROR(f"--shard must be between 0 and {sequencer.SEQUENCER_SHARDS - 1}"))
+            return
+
+        consumer = sequencer.BidSequencer(shard)
+        if options["once"]:
+            processed = consumer.run_once(options["batch_size"], block_ms=None)
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} bid(s) on shard {shard}."))
+            return
+
+        consumer.run(options["batch_size"])
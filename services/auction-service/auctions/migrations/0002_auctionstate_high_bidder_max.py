@@ -0,0 +1,18 @@
+# Generated by Django for auctions app
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auctionstate",
+            name="high_bidder_max",
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=20, null=True),
+        ),
+    ]
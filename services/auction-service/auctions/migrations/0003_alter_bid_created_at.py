@@ -0,0 +1,19 @@
+# Generated by Django for auctions app
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0002_auctionstate_high_bidder_max"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bid",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
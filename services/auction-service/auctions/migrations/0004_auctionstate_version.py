@@ -0,0 +1,18 @@
+# Generated by Django for auctions app
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0003_alter_bid_created_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auctionstate",
+            name="version",
+            field=models.IntegerField(default=0),
+        ),
+    ]
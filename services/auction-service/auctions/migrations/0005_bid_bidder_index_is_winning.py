@@ -0,0 +1,29 @@
+# Generated by Django for auctions app
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0004_auctionstate_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bid",
+            index=models.Index(fields=["bidder_id", "listing_id", "-amount"], name="auctions_bid_bidder_lst_idx"),
+        ),
+        # is_winning used to stay set on outbid rows; keep it only on each auction's latest winning row
+        migrations.RunSQL(
+            sql="""
+                UPDATE auctions_bid SET is_winning = false
+                WHERE is_winning AND id NOT IN (
+                    SELECT DISTINCT ON (listing_id) id FROM auctions_bid
+                    WHERE is_winning
+                    ORDER BY listing_id, amount DESC, created_at DESC
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
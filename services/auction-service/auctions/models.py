@@ -1,5 +1,7 @@
 import uuid
 from django.db import models
+from django.utils import timezone
+from shared.outbox import OutboxEventBase
 
 class Bid(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -9,12 +11,14 @@ class Bid(models.Model):
     max_auto_bid = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True) # For proxy bidding
     is_winning = models.BooleanField(default=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False) # Acceptance time; set explicitly by async persistence
 
     class Meta:
         ordering = ['-amount', 'created_at']
         indexes = [
             models.Index(fields=['listing_id', '-amount']),
+            # "My bids": a bidder's auctions and top bid per auction
+            models.Index(fields=['bidder_id', 'listing_id', '-amount'], name='auctions_bid_bidder_lst_idx'),
         ]
 
     def __str__(self):
@@ -25,7 +29,12 @@ class AuctionState(models.Model):
     current_price = models.DecimalField(max_digits=20, decimal_places=8, default=0.00)
     bid_count = models.IntegerField(default=0)
     high_bidder_id = models.UUIDField(null=True, blank=True)
+    high_bidder_max = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True) # Leader's proxy ceiling (locked in wallet)
     end_time = models.DateTimeField()
     is_extended = models.BooleanField(default=False)
     status = models.CharField(max_length=20, default='OPEN')
+    version = models.IntegerField(default=0) # Bumped on every change; guards the Redis snapshot
     updated_at = models.DateTimeField(auto_now=True)
+
+class OutboxEvent(OutboxEventBase):
+    """Events waiting for relay_outbox (see shared/outbox.py)."""
@@ -0,0 +1,61 @@
+"""
+Keyset pagination for bid history.
+
+Bids are ordered by (-amount, created_at, id) and the opaque cursor is the last row's
+key, so each page is one range scan on the (listing_id, -amount) index no matter how
+deep the client pages, instead of an OFFSET over the whole history.
+"""
+import base64
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+BID_ORDERING = ('-amount', 'created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(bid):
+    raw = f"{bid.amount}|{bid.created_at.isoformat()}|{bid.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        amount, created_at, bid_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        amount = Decimal(amount)
+        if not amount.is_finite():
+            raise ValueError(amount)
+        return amount, datetime.fromisoformat(created_at), uuid.UUID(bid_id)
+    except (ValueError, InvalidOperation, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def page_size(value):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+
+
+def paginate_bids(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Returns (bids, next_cursor); next_cursor is None on the last page."""
+    queryset = queryset.order_by(*BID_ORDERING)
+    if cursor:
+        amount, created_at, bid_id = decode_cursor(cursor)
+        # amount__lte is the index range; the OR only breaks ties within one amount
+        queryset = queryset.filter(amount__lte=amount).filter(
+            Q(amount__lt=amount)
+            | Q(amount=amount, created_at__gt=created_at)
+            | Q(amount=amount, created_at=created_at, id__gt=bid_id)
+        )
+    bids = list(queryset[:limit + 1])
+    if len(bids) > limit:
+        return bids[:limit], encode_cursor(bids[limit - 1])
+    return bids, None
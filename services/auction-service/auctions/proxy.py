@@ -0,0 +1,120 @@
+"""
+Proxy (auto) bidding engine.
+
+Every bid carries a visible amount and an optional ceiling (max_auto_bid). The
+leader's ceiling is kept on AuctionState, so resolving a challenge only needs the
+top two ceilings: the whole counter-bid ladder collapses into one step and one
+set of Bid rows instead of one HTTP request per counter-bid.
+"""
+from decimal import Decimal
+
+# (upper bound of price band, minimum increment) - see docs/services/auction-service.md
+INCREMENT_BANDS = [
+    (Decimal('100'), Decimal('1')),
+    (Decimal('1000'), Decimal('5')),
+    (Decimal('10000'), Decimal('25')),
+]
+TOP_INCREMENT = Decimal('100')
+
+
+class BidRejected(Exception):
+    pass
+
+
+def min_increment(price):
+    for upper, increment in INCREMENT_BANDS:
+        if price < upper:
+            return increment
+    return TOP_INCREMENT
+
+
+def minimum_bid(current_price, bid_count):
+    # With no bids yet, current_price holds the starting price
+    if bid_count == 0:
+        return current_price
+    return current_price + min_increment(current_price)
+
+
+class ProxyOutcome:
+    """Result of resolving one incoming bid against the current leader."""
+
+    def __init__(self, price, leader_id, leader_max, bids, previous_leader_id=None):
+        self.price = price
+        self.leader_id = leader_id
+        self.leader_max = leader_max
+        # Ordered (bidder_id, amount, max_auto_bid, is_winning) tuples to persist
+        self.bids = bids
+        self.previous_leader_id = previous_leader_id
+
+    @property
+    def leader_changed(self):
+        return self.previous_leader_id is not None and str(self.previous_leader_id) != str(self.leader_id)
+
+
+def resolve_bid(current_price, bid_count, leader_id, leader_max, bidder_id, amount, max_auto_bid=None):
+    """
+    Resolve a bid against the current leader and return a ProxyOutcome.
+
+    leader_max is the leader's ceiling (None for legacy rows, where the locked
+    amount was simply the current price). Ties on the ceiling go to the earlier
+    bidder, i.e. the current leader.
+    """
+    ceiling = max(amount, max_auto_bid or amount)
+
+    if leader_id is None or bid_count == 0:
+        min_bid = minimum_bid(current_price, bid_count)
+        if amount < min_bid:
+            raise BidRejected(f"Bid must be at least {min_bid}")
+        return ProxyOutcome(
+            price=amount,
+            leader_id=bidder_id,
+            leader_max=ceiling,
+            bids=[(bidder_id, amount, max_auto_bid, True)],
+        )
+
+    if leader_max is None:
+        leader_max = current_price
+
+    if str(leader_id) == str(bidder_id):
+        # Leader raising their own ceiling; the visible price does not move
+        if ceiling <= leader_max:
+            raise BidRejected(f"You are already the high bidder with a maximum of {leader_max}")
+        return ProxyOutcome(
+            price=current_price,
+            leader_id=leader_id,
+            leader_max=ceiling,
+            bids=[(bidder_id, current_price, ceiling, True)],
+        )
+
+    min_bid = minimum_bid(current_price, bid_count)
+    if amount < min_bid:
+        raise BidRejected(f"Bid must be at least {min_bid}")
+
+    if ceiling > leader_max:
+        # Challenger takes the lead at one increment over the old ceiling (capped at their own)
+        price = max(amount, min(ceiling, leader_max + min_increment(leader_max)))
+        bids = []
+        if leader_max > current_price:
+            # The old leader's proxy bid all the way up to its ceiling before losing
+            bids.append((leader_id, leader_max, leader_max, False))
+        bids.append((bidder_id, price, max_auto_bid, True))
+        return ProxyOutcome(
+            price=price,
+            leader_id=bidder_id,
+            leader_max=ceiling,
+            bids=bids,
+            previous_leader_id=leader_id,
+        )
+
+    # Leader's proxy answers the challenge, capped at its ceiling
+    price = min(leader_max, ceiling + min_increment(ceiling))
+    return ProxyOutcome(
+        price=price,
+        leader_id=leader_id,
+        leader_max=leader_max,
+        bids=[
+            (bidder_id, ceiling, max_auto_bid, False),
+            (leader_id, price, leader_max, True),
+        ],
+        previous_leader_id=leader_id,
+    )
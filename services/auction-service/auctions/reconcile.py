@@ -0,0 +1,330 @@
+"""
+Consistency check and rebuild of auction state from the Bid table.
+
+Bid rows are the record; AuctionState, the Redis snapshot and the wallet holds are all
+derived from them and can drift (a crash between the wallet swap and the transaction,
+a lost snapshot write, a failed unlock). reconcile() streams bids in
+(listing_id, -amount, created_at) order - the (listing_id, -amount) index - keeping only
+running totals per listing, so memory stays flat however many bids there are. The
+listing id space is split into ranges scanned by parallel workers, and listings are
+checked in batches: one state query, one snapshot pipeline and one wallet call each.
+
+Recomputed per listing: bid_count, current_price (top amount), the high bidder (top
+row, preferring the flagged winner on a tie) and their ceiling, which is what the
+wallet should hold while the auction is OPEN. With repair=True mismatches are fixed
+under the listing's bid lock; listings that are busy, or changed since they were read,
+are skipped and reported.
+"""
+import itertools
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from shared.cache import cache
+from .models import AuctionState, Bid
+from .services import auction_service
+from . import bid_summary, redis_state, services, stream
+
+logger = logging.getLogger(__name__)
+
+# Issues kept verbatim in a report; beyond that only the per-kind counts grow
+MAX_SAMPLES = 100
+UUID_SPACE = 1 << 128
+
+
+class Report:
+    """Per-kind issue counts plus the first MAX_SAMPLES issues; merged across workers."""
+
+    def __init__(self):
+        self.checked = 0
+        self.repaired = 0
+        self.counts = {}
+        self.samples = []
+
+    def add(self, kind, listing_id, **details):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append({'kind': kind, 'listing_id': str(listing_id), **details})
+
+    def merge(self, other):
+        self.checked += other.checked
+        self.repaired += other.repaired
+        for kind, count in other.counts.items():
+            self.counts[kind] = self.counts.get(kind, 0) + count
+        self.samples.extend(other.samples[:MAX_SAMPLES - len(self.samples)])
+
+    def as_dict(self):
+        return {
+            'checked': self.checked,
+            'repaired': self.repaired,
+            'issues': dict(sorted(self.counts.items())),
+            'samples': self.samples,
+        }
+
+
+class Tally:
+    """What the Bid rows of one listing say its state should be."""
+
+    __slots__ = ('listing_id', 'bid_count', 'current_price', 'leader_id', 'leader_bid_id',
+                 'leader_max', 'top_winning', 'winning_count')
+
+    def __init__(self, listing_id):
+        self.listing_id = listing_id
+        self.bid_count = 0
+        self.current_price = None
+        self.leader_id = None
+        self.leader_bid_id = None
+        self.leader_max = None
+        self.top_winning = False
+        self.winning_count = 0
+
+    def fields(self):
+        return (self.bid_count, self.current_price, str(self.leader_id), self.leader_max)
+
+
+def _state_fields(bid_count, current_price, high_bidder_id, high_bidder_max):
+    return (bid_count, current_price, str(high_bidder_id) if high_bidder_id else None, high_bidder_max)
+
+
+def tally_bids(listing_id, rows):
+    """Fold one listing's (id, bidder_id, amount, max_auto_bid, is_winning) rows, highest amount first."""
+    tally = Tally(listing_id)
+    # Ceilings of the bidders tied at the top amount, until the leader is settled
+    top_ceilings = {}
+    for bid_id, bidder_id, amount, max_auto_bid, is_winning in rows:
+        tally.bid_count += 1
+        tally.winning_count += is_winning
+        ceiling = max(amount, max_auto_bid or amount)
+        if tally.current_price is None:
+            tally.current_price = amount
+        if top_ceilings is not None and amount == tally.current_price:
+            # Ties go to the earliest row unless a later one carries the winning flag
+            if tally.leader_bid_id is None or (is_winning and not tally.top_winning):
+                tally.leader_id, tally.leader_bid_id, tally.top_winning = bidder_id, bid_id, is_winning
+            top_ceilings[bidder_id] = max(top_ceilings.get(bidder_id, ceiling), ceiling)
+            continue
+        if top_ceilings is not None:
+            tally.leader_max = top_ceilings[tally.leader_id]
+            top_ceilings = None
+        if bidder_id == tally.leader_id:
+            tally.leader_max = max(tally.leader_max, ceiling)
+    if top_ceilings:
+        tally.leader_max = top_ceilings[tally.leader_id]
+    return tally
+
+
+def _tallies(listing_filter, chunk_size):
+    rows = (
+        Bid.objects.filter(**listing_filter)
+        .order_by('listing_id', '-amount', 'created_at')
+        .values_list('listing_id', 'id', 'bidder_id', 'amount', 'max_auto_bid', 'is_winning')
+        .iterator(chunk_size=chunk_size)
+    )
+    for listing_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        yield tally_bids(listing_id, (row[1:] for row in group))
+
+
+def _whole(amount):
+    # The wallet only holds whole DOGE
+    return Decimal(int(round(float(amount))))
+
+
+def _hold_deltas(tally, held):
+    """{user_id: amount to lock (positive) or unlock (negative)} to match the leader's ceiling."""
+    expected = {str(tally.leader_id): _whole(tally.leader_max)}
+    deltas = {}
+    for user_id in expected.keys() | held.keys():
+        delta = expected.get(user_id, Decimal('0')) - held.get(user_id, Decimal('0'))
+        if delta:
+            deltas[user_id] = delta
+    return deltas
+
+
+def _check_batch(tallies, report, repair):
+    listing_ids = [tally.listing_id for tally in tallies]
+    states = AuctionState.objects.in_bulk(listing_ids)
+    snapshots = redis_state.read_snapshots(listing_ids)
+    open_ids = [listing_id for listing_id, state in states.items() if state.status == 'OPEN']
+    holds = {}
+    if open_ids:
+        try:
+            holds = auction_service.reference_holds(open_ids)
+        except Exception as e:
+            logger.error(f"Could not fetch wallet holds for {len(open_ids)} auction(s): {e}")
+            report.add('wallet_unavailable', open_ids[0], auctions=len(open_ids))
+            holds = None
+
+    for tally in tallies:
+        report.checked += 1
+        listing_id = tally.listing_id
+        state = states.get(listing_id)
+        if state is None:
+            # Needs the listing payload; the next bid or listing event recreates it
+            report.add('missing_state', listing_id, bid_count=tally.bid_count)
+            continue
+
+        snapshot = snapshots.get(str(listing_id))
+        if snapshot is not None and snapshot['bid_count'] > tally.bid_count:
+            # Script mode: accepted in Redis, not persisted yet; checked again on the next run
+            report.add('snapshot_ahead', listing_id, snapshot_bid_count=snapshot['bid_count'],
+                       persisted_bid_count=tally.bid_count)
+            continue
+
+        expected = tally.fields()
+        fix_state = _state_fields(state.bid_count, state.current_price, state.high_bidder_id,
+                                  state.high_bidder_max) != expected
+        if fix_state:
+            report.add('state_mismatch', listing_id, expected=_describe(expected),
+                       actual=_describe(_state_fields(state.bid_count, state.current_price,
+                                                      state.high_bidder_id, state.high_bidder_max)))
+
+        fix_flags = tally.winning_count != 1 or not tally.top_winning
+        if fix_flags:
+            report.add('winning_flag', listing_id, winning_rows=tally.winning_count)
+
+        fix_snapshot = False
+        if snapshot is None:
+            # Closed snapshots expire by design
+            fix_snapshot = state.status == 'OPEN'
+            if fix_snapshot:
+                report.add('snapshot_missing', listing_id)
+        elif (_state_fields(snapshot['bid_count'], snapshot['current_price'], snapshot['high_bidder_id'],
+                            snapshot['high_bidder_max']) != expected
+              or snapshot['end_time'] != state.end_time or snapshot['status'] != state.status):
+            fix_snapshot = True
+            report.add('snapshot_mismatch', listing_id, snapshot_version=snapshot['version'],
+                       state_version=state.version)
+
+        deltas = {}
+        if state.status == 'OPEN' and holds is not None:
+            deltas = _hold_deltas(tally, holds.get(str(listing_id), {}))
+            for user_id, delta in deltas.items():
+                report.add('wallet_hold', listing_id, user_id=user_id, delta=str(delta))
+            if services.BID_MODE == 'script':
+                # Script-mode bids lock funds without the listing lock; report only
+                deltas = {}
+
+        if repair and (fix_state or fix_flags or fix_snapshot or deltas):
+            if _repair(tally, state.version, fix_state, fix_flags, fix_snapshot, deltas, report):
+                report.repaired += 1
+
+
+def _describe(fields):
+    bid_count, current_price, high_bidder_id, high_bidder_max = fields
+    return {
+        'bid_count': bid_count,
+        'current_price': str(current_price),
+        'high_bidder_id': high_bidder_id,
+        'high_bidder_max': str(high_bidder_max) if high_bidder_max is not None else None,
+    }
+
+
+def _repair(tally, seen_version, fix_state, fix_flags, fix_snapshot, deltas, report):
+    listing_id = tally.listing_id
+    lock = cache.redis.lock(f"lock:auction:{listing_id}", timeout=30)
+    if not lock.acquire(blocking=False):
+        report.add('busy', listing_id)
+        return False
+    try:
+        with transaction.atomic():
+            state = AuctionState.objects.select_for_update().get(listing_id=listing_id)
+            if state.version != seen_version:
+                # A bid landed after the scan; the tally is stale
+                report.add('busy', listing_id)
+                return False
+            if fix_flags:
+                Bid.objects.filter(listing_id=listing_id, is_winning=True).exclude(
+                    id=tally.leader_bid_id
+                ).update(is_winning=False)
+                Bid.objects.filter(id=tally.leader_bid_id).update(is_winning=True)
+            if fix_state or fix_snapshot:
+                state.bid_count = tally.bid_count
+                state.current_price = tally.current_price
+                state.high_bidder_id = tally.leader_id
+                state.high_bidder_max = tally.leader_max
+                # A new version, so the snapshot write is not refused as stale
+                state.version += 1
+                state.save()
+
+        if fix_state or fix_snapshot:
+            redis_state.write_snapshot(state)
+            stream.publish(stream.state_message(state))
+        if fix_state or fix_flags:
+            bid_summary.rebuild(listing_id)
+
+        for user_id, delta in deltas.items():
+            operation_id = f"reconcile-{uuid.uuid4()}"
+            try:
+                if delta > 0:
+                    auction_service.lock_funds(user_id, delta, listing_id, operation_id)
+                else:
+                    auction_service.unlock_funds(user_id, -delta, listing_id, operation_id)
+            except Exception as e:
+                logger.error(f"Failed to adjust hold of {user_id} on {listing_id} by {delta}: {e}")
+                report.add('wallet_repair_failed', listing_id, user_id=user_id, delta=str(delta))
+        return True
+    finally:
+        lock.release()
+
+
+def _check_orphans(listing_filter, report):
+    """States that claim bids the Bid table does not have. Reported only: the reset price is the listing's."""
+    orphans = (
+        AuctionState.objects.filter(**listing_filter)
+        .filter(Q(bid_count__gt=0) | Q(high_bidder_id__isnull=False))
+        .filter(~Exists(Bid.objects.filter(listing_id=OuterRef('listing_id'))))
+        .values_list('listing_id', 'bid_count')
+    )
+    for listing_id, bid_count in orphans.iterator():
+        report.checked += 1
+        report.add('orphan_state', listing_id, bid_count=bid_count)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _scan(listing_filter, batch_size, repair):
+    report = Report()
+    try:
+        for batch in _batches(_tallies(listing_filter, batch_size * 10), batch_size):
+            _check_batch(batch, report, repair)
+        _check_orphans(listing_filter, report)
+    finally:
+        # Worker threads each open their own connection
+        connection.close()
+    return report
+
+
+def listing_ranges(workers):
+    """Split the listing id space into `workers` contiguous filters."""
+    bounds = [uuid.UUID(int=i * UUID_SPACE // workers) for i in range(workers)]
+    ranges = []
+    for i, lower in enumerate(bounds):
+        listing_filter = {'listing_id__gte': lower}
+        if i + 1 < workers:
+            listing_filter['listing_id__lt'] = bounds[i + 1]
+        ranges.append(listing_filter)
+    return ranges
+
+
+def reconcile(workers=4, batch_size=200, repair=False, listing_ids=None):
+    """
+    Check (and with repair=True fix) every auction, or just listing_ids. Returns a Report.
+    Script mode: bids still queued for persist_bids are reported as snapshot_ahead, not drained here.
+    """
+    if listing_ids:
+        filters = [{'listing_id__in': list(listing_ids)}]
+    else:
+        filters = listing_ranges(workers)
+
+    report = Report()
+    with ThreadPoolExecutor(max_workers=len(filters), thread_name_prefix='reconcile') as pool:
+        for part in pool.map(lambda listing_filter: _scan(listing_filter, batch_size, repair), filters):
+            report.merge(part)
+    return report
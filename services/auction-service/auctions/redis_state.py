@@ -0,0 +1,419 @@
+"""
+Redis-side auction state.
+
+`auction:{listing_id}` is a hash mirroring AuctionState. In the default lock mode
+it is written after every accepted bid; in script mode (AUCTION_BID_MODE=script)
+it is the source of truth and ACCEPT_BID_LUA validates and applies bids against
+it atomically, queueing the result for asynchronous persistence to Postgres.
+
+Every write carries AuctionState.version and is applied compare-and-set, so a slow
+writer holding an older state (e.g. a DB read racing a close or an extension) can
+never overwrite a newer snapshot. The `state` endpoint reads through this hash.
+
+`auction:end_times` is a sorted set of OPEN auctions scored by end time. It is
+updated inside the same scripts that write the hash, so an anti-snipe extension
+and its new close time can never be observed separately (see auctions/scheduler.py).
+"""
+import json
+import redis
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from shared.cache import cache
+
+PENDING_BIDS_KEY = "auction:bids:pending"
+# Batches claimed by persist_pending_bids drainers: one list per worker, and worker -> claim time
+PROCESSING_PREFIX = "auction:bids:processing:"
+CLAIMS_KEY = "auction:bids:claims"
+CLAIM_LEASE_SECONDS = 60
+STATS_KEY = "auction:state:cache_stats"
+SCHEDULE_KEY = "auction:end_times"
+
+# Closed auctions are still read for a while (order page, history) but needn't stay forever
+CLOSED_SNAPSHOT_TTL = 60 * 60 * 24
+
+SNIPE_WINDOW_SECONDS = 300
+SNIPE_EXTENSION_SECONDS = 300
+
+
+def state_key(listing_id):
+    return f"auction:{listing_id}"
+
+
+def _ts(dt):
+    return f"{dt.timestamp():.6f}"
+
+
+def _from_ts(value):
+    return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+
+
+def snapshot_from_state(state):
+    return {
+        "current_price": str(int(state.current_price)),
+        "bid_count": state.bid_count,
+        "high_bidder_id": str(state.high_bidder_id) if state.high_bidder_id else "",
+        "high_bidder_max": str(int(state.high_bidder_max)) if state.high_bidder_max is not None else "",
+        "end_ts": _ts(state.end_time),
+        "extended": 1 if state.is_extended else 0,
+        "status": state.status,
+        "version": state.version,
+        "updated_ts": _ts(state.updated_at) if state.updated_at else _ts(datetime.now(dt_timezone.utc)),
+    }
+
+
+def parse_snapshot(raw):
+    """Convert a raw hash into typed values; returns None for an empty/missing hash."""
+    if not raw:
+        return None
+    return {
+        "current_price": Decimal(raw["current_price"]),
+        "bid_count": int(raw["bid_count"]),
+        "high_bidder_id": raw.get("high_bidder_id") or None,
+        "high_bidder_max": Decimal(raw["high_bidder_max"]) if raw.get("high_bidder_max") else None,
+        "end_time": _from_ts(raw["end_ts"]),
+        "is_extended": raw.get("extended") == "1",
+        "status": raw.get("status", "OPEN"),
+        "version": int(raw.get("version") or 0),
+        "updated_at": _from_ts(raw["updated_ts"]) if raw.get("updated_ts") else None,
+    }
+
+
+def state_from_snapshot(listing_id, snapshot):
+    """Unsaved AuctionState built from a snapshot, so it serializes exactly like a DB row."""
+    from .models import AuctionState
+    return AuctionState(
+        listing_id=listing_id,
+        current_price=snapshot["current_price"],
+        bid_count=snapshot["bid_count"],
+        high_bidder_id=snapshot["high_bidder_id"],
+        high_bidder_max=snapshot["high_bidder_max"],
+        end_time=snapshot["end_time"],
+        is_extended=snapshot["is_extended"],
+        status=snapshot["status"],
+        version=snapshot["version"],
+        updated_at=snapshot["updated_at"],
+    )
+
+
+# KEYS: state hash, schedule zset. ARGV: listing_id, version, end_ts, status, field1, value1, ...
+# Legacy JSON string snapshots and hashes without a version are always replaced.
+WRITE_LUA = """
+if redis.call('TYPE', KEYS[1]).ok == 'hash' then
+    local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '') or -1
+    if current >= tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 5))
+if ARGV[4] == 'OPEN' then
+    redis.call('ZADD', KEYS[2], 'GT', ARGV[3], ARGV[1])
+else
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+# KEYS: state hash, stats hash. Counts the hit/miss in the same round trip.
+READ_LUA = """
+if redis.call('TYPE', KEYS[1]).ok ~= 'hash' then
+    redis.call('HINCRBY', KEYS[2], 'misses', 1)
+    return {}
+end
+redis.call('HINCRBY', KEYS[2], 'hits', 1)
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS: state hash, schedule zset. ARGV: status, ttl, now_ts, listing_id
+SET_STATUS_LUA = """
+if ARGV[1] ~= 'OPEN' then
+    redis.call('ZREM', KEYS[2], ARGV[4])
+end
+if redis.call('TYPE', KEYS[1]).ok ~= 'hash' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'updated_ts', ARGV[3])
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+if tonumber(ARGV[2]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# Mirrors auctions/proxy.py. KEYS: state hash, pending queue, schedule zset.
+# ARGV: listing_id, bid_id, bidder_id, amount, max_auto_bid ('' if none), now_ts,
+#       snipe_window, snipe_extension
+ACCEPT_BID_LUA = """
+local function increment(price)
+    if price < 100 then return 1 end
+    if price < 1000 then return 5 end
+    if price < 10000 then return 25 end
+    return 100
+end
+
+if redis.call('TYPE', KEYS[1]).ok ~= 'hash' then
+    return {'MISSING'}
+end
+
+local h = redis.call('HMGET', KEYS[1], 'current_price', 'bid_count', 'high_bidder_id',
+    'high_bidder_max', 'end_ts', 'extended', 'status')
+local price = tonumber(h[1])
+local bid_count = tonumber(h[2])
+local leader = h[3] or ''
+local leader_max = tonumber(h[4] or '') or price
+local end_ts = tonumber(h[5])
+local extended = h[6] or '0'
+local status = h[7] or 'OPEN'
+
+local listing_id, bid_id, bidder = ARGV[1], ARGV[2], ARGV[3]
+local amount = tonumber(ARGV[4])
+local max_auto_bid = tonumber(ARGV[5] or '')
+local now = tonumber(ARGV[6])
+
+if status ~= 'OPEN' then return {'ERR', 'Auction closed'} end
+if end_ts < now then return {'ERR', 'Auction ended'} end
+
+local ceiling = amount
+if max_auto_bid and max_auto_bid > ceiling then ceiling = max_auto_bid end
+
+local min_bid = price
+if bid_count > 0 then min_bid = price + increment(price) end
+
+local bids = {}
+local new_price, new_leader, new_max = price, leader, leader_max
+
+if leader == '' or bid_count == 0 then
+    if amount < min_bid then return {'ERR', 'Bid must be at least ' .. min_bid} end
+    new_price, new_leader, new_max = amount, bidder, ceiling
+    table.insert(bids, {bidder, amount, max_auto_bid, true})
+elseif leader == bidder then
+    if ceiling <= leader_max then
+        return {'ERR', 'You are already the high bidder with a maximum of ' .. leader_max}
+    end
+    new_max = ceiling
+    table.insert(bids, {bidder, price, ceiling, true})
+else
+    if amount < min_bid then return {'ERR', 'Bid must be at least ' .. min_bid} end
+    if ceiling > leader_max then
+        new_price = math.min(ceiling, leader_max + increment(leader_max))
+        if amount > new_price then new_price = amount end
+        new_leader, new_max = bidder, ceiling
+        if leader_max > price then
+            table.insert(bids, {leader, leader_max, leader_max, false})
+        end
+        table.insert(bids, {bidder, new_price, max_auto_bid, true})
+    else
+        new_price = math.min(leader_max, ceiling + increment(ceiling))
+        table.insert(bids, {bidder, ceiling, max_auto_bid, false})
+        table.insert(bids, {leader, new_price, leader_max, true})
+    end
+end
+
+-- Anti-sniping
+if end_ts - now < tonumber(ARGV[7]) then
+    end_ts = end_ts + tonumber(ARGV[8])
+    extended = '1'
+end
+
+bid_count = bid_count + #bids
+redis.call('HSET', KEYS[1],
+    'current_price', new_price,
+    'bid_count', bid_count,
+    'high_bidder_id', new_leader,
+    'high_bidder_max', new_max,
+    'end_ts', string.format('%.6f', end_ts),
+    'extended', extended,
+    'updated_ts', ARGV[6])
+local version = redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('ZADD', KEYS[3], 'GT', string.format('%.6f', end_ts), listing_id)
+
+local rows = {}
+for i, b in ipairs(bids) do
+    rows[i] = {bidder_id = b[1], amount = b[2], max_auto_bid = b[3] or cjson.null, is_winning = b[4]}
+end
+redis.call('RPUSH', KEYS[2], cjson.encode({
+    listing_id = listing_id,
+    bid_id = bid_id,
+    bidder_id = bidder,
+    bids = rows,
+    current_price = new_price,
+    bid_count = bid_count,
+    high_bidder_id = new_leader,
+    high_bidder_max = new_max,
+    end_ts = end_ts,
+    extended = extended == '1',
+    previous_leader = leader,
+    previous_locked = leader_max,
+    version = version,
+    created_ts = now,
+}))
+
+local winning = '0'
+if new_leader == bidder then winning = '1' end
+return {'OK', tostring(new_price), new_leader, winning, leader, tostring(leader_max),
+    string.format('%.6f', end_ts), bid_count, version, extended}
+"""
+
+# KEYS: pending queue, this worker's processing list, claims zset. ARGV: batch size, worker, now.
+# An unacked batch left by the same worker is handed back before new entries are claimed.
+CLAIM_PENDING_LUA = """
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+if #items == 0 then
+    for i = 1, tonumber(ARGV[1]) do
+        local item = redis.call('LMOVE', KEYS[1], KEYS[2], 'LEFT', 'RIGHT')
+        if not item then break end
+        items[i] = item
+    end
+end
+if #items > 0 then
+    redis.call('ZADD', KEYS[3], ARGV[3], ARGV[2])
+end
+return items
+"""
+
+# KEYS: stale worker's processing list, pending queue, claims zset. ARGV: worker, cutoff.
+# Re-checks the claim time so a worker that claimed again meanwhile keeps its batch.
+REQUEUE_CLAIM_LUA = """
+local claimed = redis.call('ZSCORE', KEYS[3], ARGV[1])
+if not claimed or tonumber(claimed) > tonumber(ARGV[2]) then return 0 end
+local moved = 0
+while redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT') do
+    moved = moved + 1
+end
+redis.call('ZREM', KEYS[3], ARGV[1])
+return moved
+"""
+
+_scripts = {}
+
+
+def _script(source):
+    # Script objects use EVALSHA and reload transparently on NOSCRIPT
+    if source not in _scripts:
+        _scripts[source] = cache.redis.register_script(source)
+    return _scripts[source]
+
+
+def write_snapshot(state):
+    """Write the snapshot unless Redis already holds the same or a newer version. Returns True if written."""
+    snapshot = snapshot_from_state(state)
+    args = [str(state.listing_id), state.version, snapshot["end_ts"], state.status]
+    for field, value in snapshot.items():
+        args.extend([field, value])
+    return bool(_script(WRITE_LUA)(keys=[state_key(state.listing_id), SCHEDULE_KEY], args=args))
+
+
+def read_snapshot(listing_id, count=False):
+    """Typed snapshot or None. With count=True the read is recorded in the hit/miss stats."""
+    key = state_key(listing_id)
+    if count:
+        flat = _script(READ_LUA)(keys=[key, STATS_KEY])
+        raw = dict(zip(flat[::2], flat[1::2]))
+    else:
+        try:
+            raw = cache.redis.hgetall(key)
+        except redis.ResponseError:
+            # Legacy JSON string snapshot; treated as a miss and replaced on the next write
+            return None
+    return parse_snapshot(raw)
+
+
+def read_snapshots(listing_ids):
+    """read_snapshot for many auctions in one pipelined round trip; {listing_id: snapshot or None}."""
+    listing_ids = [str(listing_id) for listing_id in listing_ids]
+    pipe = cache.redis.pipeline(transaction=False)
+    for listing_id in listing_ids:
+        pipe.hgetall(state_key(listing_id))
+    raw = pipe.execute(raise_on_error=False)
+    return {
+        listing_id: parse_snapshot(item) if isinstance(item, dict) else None
+        for listing_id, item in zip(listing_ids, raw)
+    }
+
+
+def set_status(listing_id, status, ttl=0):
+    """Bump the snapshot's version with a new status (close); no-op if there is no snapshot."""
+    return bool(_script(SET_STATUS_LUA)(
+        keys=[state_key(listing_id), SCHEDULE_KEY],
+        args=[status, ttl, _ts(datetime.now(dt_timezone.utc)), str(listing_id)],
+    ))
+
+
+def set_status_many(listing_ids, status, ttl=0):
+    """set_status for many auctions in one pipelined round trip."""
+    if not listing_ids:
+        return
+    script = _script(SET_STATUS_LUA)
+    now_ts = _ts(datetime.now(dt_timezone.utc))
+    pipe = cache.redis.pipeline(transaction=False)
+    for listing_id in listing_ids:
+        script(keys=[state_key(listing_id), SCHEDULE_KEY], args=[status, ttl, now_ts, str(listing_id)], client=pipe)
+    pipe.execute()
+
+
+def schedule_at(listing_id, end_time):
+    """Set the scheduled close outright; snapshot writes and accepted bids only ever move it later."""
+    cache.redis.zadd(SCHEDULE_KEY, {str(listing_id): end_time.timestamp()})
+
+
+def cache_stats():
+    raw = cache.redis.hgetall(STATS_KEY)
+    hits = int(raw.get("hits", 0))
+    misses = int(raw.get("misses", 0))
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def accept_bid(listing_id, bid_id, bidder_id, amount, max_auto_bid, now):
+    return _script(ACCEPT_BID_LUA)(
+        keys=[state_key(listing_id), PENDING_BIDS_KEY, SCHEDULE_KEY],
+        args=[
+            str(listing_id), str(bid_id), str(bidder_id), str(int(amount)),
+            str(int(max_auto_bid)) if max_auto_bid else "",
+            _ts(now), SNIPE_WINDOW_SECONDS, SNIPE_EXTENSION_SECONDS,
+        ],
+    )
+
+
+def _processing_key(worker):
+    return f"{PROCESSING_PREFIX}{worker}"
+
+
+def claim_pending(worker, batch_size):
+    """
+    Atomically move up to batch_size queued bids to worker's processing list and return
+    them. Concurrent drainers never get the same entry; call ack_pending(worker) once the
+    batch is persisted. A worker's previous unacked batch is returned again first.
+    """
+    items = _script(CLAIM_PENDING_LUA)(
+        keys=[PENDING_BIDS_KEY, _processing_key(worker), CLAIMS_KEY],
+        args=[batch_size, worker, _ts(datetime.now(dt_timezone.utc))],
+    )
+    return [json.loads(item) for item in items]
+
+
+def ack_pending(worker):
+    pipe = cache.redis.pipeline(transaction=True)
+    pipe.delete(_processing_key(worker))
+    pipe.zrem(CLAIMS_KEY, worker)
+    pipe.execute()
+
+
+def requeue_stale_claims(lease_seconds=CLAIM_LEASE_SECONDS):
+    """
+    Put batches claimed more than lease_seconds ago (their drainer died) back at the head
+    of the queue, in order. Returns the number of entries requeued.
+    """
+    cutoff = datetime.now(dt_timezone.utc).timestamp() - lease_seconds
+    requeued = 0
+    for worker in cache.redis.zrangebyscore(CLAIMS_KEY, "-inf", cutoff):
+        requeued += _script(REQUEUE_CLAIM_LUA)(
+            keys=[_processing_key(worker), PENDING_BIDS_KEY, CLAIMS_KEY],
+            args=[worker, f"{cutoff:.6f}"],
+        )
+    return requeued
+
@@ -0,0 +1,197 @@
+"""
+Auction end-time scheduler.
+
+OPEN auctions live in the `auction:end_times` sorted set scored by end time
+(maintained atomically with the state snapshot in auctions/redis_state.py, so
+anti-snipe extensions re-score the entry in the same script). A single loop pops
+due auctions in batches, closes them with one bulk UPDATE and starts their close
+workflow within a second or two of end_time, replacing the per-minute Postgres poll
+behind `ending`. Popped auctions the close leaves OPEN go back on the schedule.
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import boto3
+from shared.cache import cache
+from .models import AuctionState
+from .redis_state import SCHEDULE_KEY
+
+logger = logging.getLogger(__name__)
+
+# Pop is atomic so several scheduler replicas never start the same close twice
+POP_DUE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+end
+return due
+"""
+
+RETRY_DELAY_SECONDS = 30
+# Due auctions left OPEN by a close (bids still being persisted, row locked by another closer)
+UNCLOSED_RETRY_SECONDS = 5
+# Auctions already closed whose workflow could not be started; retried every cycle
+PENDING_STARTS_KEY = "auction:close:pending_starts"
+
+_pop_script = None
+
+
+def _from_score(score):
+    return datetime.fromtimestamp(float(score), tz=dt_timezone.utc)
+
+
+def _pairs(flat):
+    return [(member, _from_score(score)) for member, score in zip(flat[::2], flat[1::2])]
+
+
+def reschedule(listing_id, delay=RETRY_DELAY_SECONDS):
+    """Put back an auction whose close could not be started."""
+    cache.redis.zadd(SCHEDULE_KEY, {str(listing_id): time.time() + delay})
+
+
+def requeue_unclosed(listing_ids, delay=UNCLOSED_RETRY_SECONDS):
+    """
+    Put back popped auctions that close_auctions left OPEN: at their Postgres end time if it
+    moved later, else `delay` from now. Auctions no longer OPEN are dropped. GT keeps a
+    later end time written meanwhile by an extension.
+    """
+    try:
+        rows = list(AuctionState.objects.filter(listing_id__in=listing_ids, status='OPEN')
+                    .values_list('listing_id', 'end_time'))
+    except Exception as e:
+        logger.error(f"Could not read {len(listing_ids)} unclosed auction(s), retrying them all: {e}")
+        for listing_id in listing_ids:
+            reschedule(listing_id, delay)
+        return
+    now = time.time()
+    mapping = {}
+    for listing_id, end_time in rows:
+        end_ts = end_time.timestamp()
+        mapping[str(listing_id)] = end_ts if end_ts > now else now + delay
+    if mapping:
+        cache.redis.zadd(SCHEDULE_KEY, mapping, gt=True)
+
+
+def pop_due(batch_size=100, now=None):
+    """Atomically remove and return up to batch_size (listing_id, end_time) pairs that are due."""
+    global _pop_script
+    if _pop_script is None:
+        _pop_script = cache.redis.register_script(POP_DUE_LUA)
+    now = now or time.time()
+    return _pairs(_pop_script(keys=[SCHEDULE_KEY], args=[f"{now:.6f}", batch_size]))
+
+
+def peek_due(horizon_seconds=60, limit=1000):
+    """Auctions ending within horizon_seconds (already-due included), without removing them."""
+    flat = cache.redis.zrangebyscore(
+        SCHEDULE_KEY, '-inf', time.time() + horizon_seconds, start=0, num=limit, withscores=True
+    )
+    return [(member, _from_score(score)) for member, score in flat]
+
+
+def backfill(chunk_size=1000):
+    """One-off load of OPEN auctions from Postgres (first deploy, or after a Redis flush)."""
+    total = 0
+    pipe = cache.redis.pipeline(transaction=False)
+    rows = AuctionState.objects.filter(status='OPEN').values_list('listing_id', 'end_time')
+    for listing_id, end_time in rows.iterator(chunk_size=chunk_size):
+        pipe.zadd(SCHEDULE_KEY, {str(listing_id): end_time.timestamp()}, gt=True)
+        total += 1
+        if total % chunk_size == 0:
+            pipe.execute()
+    pipe.execute()
+    return total
+
+
+def execution_name(listing_id, end_time):
+    # Step Functions names allow [A-Za-z0-9-_] only; identical names dedupe duplicate starts
+    return f"AuctionClose-{listing_id}-{int(end_time.timestamp())}"
+
+
+class AuctionCloseScheduler:
+    def __init__(self):
+        self.workflow_arn = os.environ.get('AUCTION_CLOSE_WORKFLOW_ARN')
+        self.sfn = boto3.client('stepfunctions',
+            endpoint_url=os.environ.get('AWS_ENDPOINT_URL'),
+            region_name=os.environ.get('AWS_REGION', 'us-east-1')
+        )
+
+    def start_close(self, listing_id, end_time, result=None):
+        payload = {
+            'listing_id': listing_id,
+            'end_time': end_time.isoformat()
+        }
+        if result:
+            payload['winner_id'] = result['winner_id']
+            payload['winning_bid'] = str(result['winning_bid'])
+        try:
+            self.sfn.start_execution(
+                stateMachineArn=self.workflow_arn,
+                name=execution_name(listing_id, end_time),
+                input=json.dumps(payload)
+            )
+        except self.sfn.exceptions.ExecutionAlreadyExists:
+            pass
+
+    def run_once(self, batch_size=100):
+        """
+        Close every due auction in bulk and start a workflow per closed auction (order
+        creation, escrow); returns how many were started.
+        """
+        from .services import auction_service
+
+        started = self.retry_pending_starts()
+        while True:
+            due = pop_due(batch_size)
+            if due:
+                end_times = dict(due)
+                try:
+                    closed = auction_service.close_auctions(list(end_times), limit=len(due))
+                except Exception as e:
+                    logger.error(f"Failed to close {len(due)} due auction(s): {e}")
+                    for listing_id in end_times:
+                        reschedule(listing_id)
+                    return started
+                for result in closed:
+                    listing_id = result['listing_id']
+                    try:
+                        self.start_close(listing_id, end_times[listing_id], result)
+                        started += 1
+                    except Exception as e:
+                        # Already CLOSED and off the schedule, so keep the result for a later retry
+                        logger.error(f"Failed to start close workflow for {listing_id}: {e}")
+                        cache.redis.hset(PENDING_STARTS_KEY, listing_id, json.dumps({
+                            'end_ts': end_times[listing_id].timestamp(),
+                            'winner_id': result['winner_id'],
+                            'winning_bid': str(result['winning_bid'])
+                        }))
+                # Popped but still OPEN (deferred, skipped as locked, or end time moved later)
+                closed_ids = {result['listing_id'] for result in closed}
+                unclosed = [listing_id for listing_id in end_times if listing_id not in closed_ids]
+                if unclosed:
+                    requeue_unclosed(unclosed)
+            if len(due) < batch_size:
+                return started
+
+    def retry_pending_starts(self):
+        started = 0
+        for listing_id, raw in cache.redis.hgetall(PENDING_STARTS_KEY).items():
+            pending = json.loads(raw)
+            try:
+                self.start_close(listing_id, _from_score(pending['end_ts']), pending)
+            except Exception as e:
+                logger.error(f"Retry of close workflow for {listing_id} failed: {e}")
+                continue
+            cache.redis.hdel(PENDING_STARTS_KEY, listing_id)
+            started += 1
+        return started
+
+    def run(self, batch_size=100, poll_interval=1.0):
+        while True:
+            started = self.run_once(batch_size)
+            if started:
+                logger.info(f"Started {started} auction close workflow(s)")
+            time.sleep(poll_interval)
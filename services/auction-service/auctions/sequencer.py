@@ -0,0 +1,177 @@
+"""
+Bid sequencer (AUCTION_BID_MODE=sequencer).
+
+Instead of every web worker spinning on the per-listing Redis lock, a bid is appended
+to its shard's stream (`auction:bids:shard:{n}`, listings hashed over
+SEQUENCER_SHARDS) and the request blocks on its own result key with BLPOP. One
+consumer per shard (`python manage.py run_bid_sequencer --shard n`) applies the bids
+in arrival order through the lock-mode path, where the lock is now uncontended, and
+pushes each result back. Bids on one listing are therefore strictly ordered, and a
+hot auction costs a queue rather than a pile of blocked threads retrying the lock.
+
+Each entry carries a deadline. The consumer drops entries whose deadline has passed,
+and the request waits a little longer than that, so a bid whose caller gave up is
+never applied behind its back.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from datetime import datetime
+from decimal import Decimal
+
+from shared.cache import cache
+from shared.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+SEQUENCER_SHARDS = int(os.environ.get('SEQUENCER_SHARDS', '8'))
+CONSUMER_GROUP = "bid-sequencer"
+# Time a bid may wait in the queue before the consumer drops it
+QUEUE_TIMEOUT_SECONDS = 5
+# Extra wait for the bid being applied (wallet swap + DB transaction) after its deadline
+APPLY_GRACE_SECONDS = 10
+RESULT_TTL = 60
+STREAM_MAXLEN = 100000
+
+def shard_for(listing_id):
+    return zlib.crc32(str(listing_id).encode()) % SEQUENCER_SHARDS
+
+
+# Read at call time, so the bid benchmark can run on its own streams (benchmark.isolated_queues)
+STREAM_PREFIX = "auction:bids:shard:"
+
+
+def stream_key(shard):
+    return f"{STREAM_PREFIX}{shard}"
+
+
+def result_key(request_id):
+    return f"auction:bids:result:{request_id}"
+
+
+def _bid_to_dict(bid):
+    return {
+        'id': str(bid.id),
+        'listing_id': str(bid.listing_id),
+        'bidder_id': str(bid.bidder_id),
+        'amount': str(bid.amount),
+        'max_auto_bid': str(bid.max_auto_bid) if bid.max_auto_bid is not None else None,
+        'is_winning': bid.is_winning,
+        'created_at': bid.created_at.isoformat(),
+    }
+
+
+def _bid_from_dict(data):
+    from .models import Bid
+    return Bid(
+        id=uuid.UUID(data['id']),
+        listing_id=data['listing_id'],
+        bidder_id=data['bidder_id'],
+        amount=Decimal(data['amount']),
+        max_auto_bid=Decimal(data['max_auto_bid']) if data['max_auto_bid'] else None,
+        is_winning=data['is_winning'],
+        created_at=datetime.fromisoformat(data['created_at']),
+    )
+
+
+def submit(listing_id, bidder_id, amount, max_auto_bid=None):
+    """Queue the bid on its shard and wait for the consumer's result; returns an unsaved Bid."""
+    request_id = uuid.uuid4().hex
+    deadline = time.time() + QUEUE_TIMEOUT_SECONDS
+    cache.redis.xadd(stream_key(shard_for(listing_id)), {
+        'request_id': request_id,
+        'listing_id': str(listing_id),
+        'bidder_id': str(bidder_id),
+        'amount': str(amount),
+        'max_auto_bid': str(max_auto_bid) if max_auto_bid else '',
+        'deadline': f"{deadline:.6f}",
+    }, maxlen=STREAM_MAXLEN, approximate=True)
+
+    reply = cache.redis.blpop(result_key(request_id), timeout=QUEUE_TIMEOUT_SECONDS + APPLY_GRACE_SECONDS)
+    if reply is None:
+        raise Exception("Bid could not be processed in time")
+    result = json.loads(reply[1])
+    if not result['ok']:
+        raise Exception(result['error'])
+    return _bid_from_dict(result['bid'])
+
+
+class BidSequencer:
+    """Single consumer for one shard; run exactly one per shard."""
+
+    def __init__(self, shard, consumer_name=None):
+        self.shard = shard
+        self.stream = stream_key(shard)
+        # Stable per shard, so a restarted consumer picks up its own unacked entries
+        self.consumer_name = consumer_name or f"shard-{shard}"
+        self._recovering = True
+        try:
+            cache.redis.xgroup_create(self.stream, CONSUMER_GROUP, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _apply(self, fields, redelivered=False):
+        from .models import Bid
+        from .services import auction_service
+
+        # The bid id (and so the wallet operation id) is derived from the request, so an
+        # entry redelivered after a crash is recognised instead of applied twice
+        bid_id = uuid.uuid5(uuid.NAMESPACE_URL, f"{self.stream}/{fields['request_id']}")
+        if redelivered:
+            bid = Bid.objects.filter(id=bid_id).first()
+            if bid is not None:
+                return {'ok': True, 'bid': _bid_to_dict(bid)}
+        if float(fields['deadline']) < time.time():
+            return {'ok': False, 'error': "Bid expired in queue"}
+        try:
+            bid = auction_service.place_bid_locked(
+                fields['listing_id'], fields['bidder_id'], Decimal(fields['amount']),
+                Decimal(fields['max_auto_bid']) if fields['max_auto_bid'] else None,
+                bid_id=bid_id
+            )
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+        return {'ok': True, 'bid': _bid_to_dict(bid)}
+
+    def _handle(self, entries, redelivered=False):
+        # Events of the whole batch go out together, after every bidder has its answer
+        with event_bus.batch():
+            for entry_id, fields in entries:
+                result = self._apply(fields, redelivered)
+                pipe = cache.redis.pipeline(transaction=False)
+                pipe.rpush(result_key(fields['request_id']), json.dumps(result))
+                pipe.expire(result_key(fields['request_id']), RESULT_TTL)
+                pipe.xack(self.stream, CONSUMER_GROUP, entry_id)
+                pipe.xdel(self.stream, entry_id)
+                pipe.execute()
+        return len(entries)
+
+    def run_once(self, batch_size=100, block_ms=1000):
+        """Apply the next batch; returns how many bids were processed. block_ms=None never blocks."""
+        if self._recovering:
+            # Entries read but not acked before a restart come first, in order
+            pending = cache.redis.xreadgroup(
+                CONSUMER_GROUP, self.consumer_name, {self.stream: '0'}, count=batch_size
+            )
+            if pending and pending[0][1]:
+                return self._handle(pending[0][1], redelivered=True)
+            self._recovering = False
+        fresh = cache.redis.xreadgroup(
+            CONSUMER_GROUP, self.consumer_name, {self.stream: '>'}, count=batch_size, block=block_ms
+        )
+        if not fresh:
+            return 0
+        return self._handle(fresh[0][1])
+
+    def run(self, batch_size=100):
+        while True:
+            try:
+                self.run_once(batch_size)
+            except Exception as e:
+                logger.error(f"Bid sequencer shard {self.shard} failed: {e}")
+                self._recovering = True
+                time.sleep(1)
@@ -4,9 +4,10 @@ from .models import Bid, AuctionState
 class BidSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bid
-        fields = '__all__'
+        # Proxy ceilings are private to the bidder
+        exclude = ('max_auto_bid',)
 
 class AuctionStateSerializer(serializers.ModelSerializer):
     class Meta:
         model = AuctionState
-        fields = '__all__'
+        exclude = ('high_bidder_max',)
@@ -1,178 +1,605 @@
 import logging
 import os
-import requests
+import uuid
 import json
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
 from shared.cache import cache
 from shared.event_bus import event_bus
+from shared.http import service_client
 from .models import Bid, AuctionState
+from .proxy import resolve_bid, minimum_bid
+from . import bid_summary, bidder_index, redis_state, sequencer, stream
 
 logger = logging.getLogger(__name__)
 
 LISTING_SERVICE_URL = os.environ.get('LISTING_SERVICE_URL', 'http://listing-service:8001')
 WALLET_SERVICE_URL = os.environ.get('WALLET_SERVICE_URL', 'http://wallet-service:8000')
+# 'lock' (Redis lock + synchronous Postgres writes), 'script' (Redis script + async persistence)
+# or 'sequencer' (per-shard Redis stream, one consumer applies bids in order; see sequencer.py)
+BID_MODE = os.environ.get('AUCTION_BID_MODE', 'lock')
+# Seconds; only used for listings that missed their listing event
+LISTING_FETCH_TIMEOUT = float(os.environ.get('LISTING_FETCH_TIMEOUT', '2'))
+AUCTION_LISTING_TYPES = ('AUCTION',)
+
+_persist_worker = {}
+
+
+def persist_worker_id():
+    """Names this process's claimed batch of pending bids (redis_state.claim_pending); per pid, so forks differ."""
+    pid = os.getpid()
+    if pid not in _persist_worker:
+        _persist_worker[pid] = f"{os.uname().nodename}:{pid}:{uuid.uuid4().hex[:8]}"
+    return _persist_worker[pid]
+
+
+wallet_client = service_client('wallet-service', WALLET_SERVICE_URL)
+listing_client = service_client('listing-service', LISTING_SERVICE_URL)
 
 class AuctionService:
+    def __init__(self):
+        # Listing ids this process has already seen an AuctionState for
+        self._known_states = set()
+
     def place_bid(self, listing_id, bidder_id, amount, max_auto_bid=None):
         # DOGE must be whole numbers
         amount = Decimal(int(round(float(amount))))
         if max_auto_bid:
-            max_auto_bid = Decimal(max_auto_bid)
+            max_auto_bid = Decimal(int(round(float(max_auto_bid))))
+
+        if BID_MODE == 'script':
+            return self.place_bid_atomic(listing_id, bidder_id, amount, max_auto_bid)
+        if BID_MODE == 'sequencer':
+            return sequencer.submit(listing_id, bidder_id, amount, max_auto_bid)
+        return self.place_bid_locked(listing_id, bidder_id, amount, max_auto_bid)
 
-        # 1. Distributed Lock
-        lock_key = f"lock:auction:{listing_id}"
-        lock = cache.redis.lock(lock_key, timeout=10)
+    def place_bid_locked(self, listing_id, bidder_id, amount, max_auto_bid=None, bid_id=None):
+        """Lock mode (also run by the sequencer's single consumer per shard, with its own bid_id)."""
+        # 1. States are pre-created from listing events; a miss falls back to the listing
+        # service here, before the lock, so a slow fetch never holds up other bidders
+        if str(listing_id) not in self._known_states:
+            if not self.get_or_create_state(listing_id):
+                raise Exception("Auction not found")
+            self._known_states.add(str(listing_id))
+
+        # 2. Distributed Lock
+        lock = self._bid_lock(listing_id)
         
         if not lock.acquire(blocking=True, blocking_timeout=5):
             raise Exception("Could not acquire lock")
             
         try:
-            # 2. Get or Create AuctionState
-            state = self.get_or_create_state(listing_id)
-            
-            if not state:
-                 raise Exception("Auction not found")
-                 
-            # 3. Validation
+            state = AuctionState.objects.get(listing_id=listing_id)
+
+            # 3. Validation + proxy resolution against the leader's ceiling
             now = timezone.now()
             if state.end_time < now:
                 raise Exception("Auction ended")
-                
-            min_increment = Decimal('1.0') # Fixed for now, should be dynamic based on price
-            min_bid = state.current_price + min_increment
-            
-            # If no bids yet, min_bid might be starting_price?
-            # get_or_create_state sets current_price to starting_price.
-            # If bid_count == 0, min_bid = starting_price.
-            if state.bid_count == 0:
-                min_bid = state.current_price
-            
-            if amount < min_bid:
-                raise Exception(f"Bid must be at least {min_bid}")
-                
-            # 4. Lock Funds (Wallet Service)
-            self.lock_funds(bidder_id, amount, listing_id)
-            
-            # 5. Process Bid
+
             previous_high_bidder = state.high_bidder_id
-            previous_price = state.current_price
-            
-            # Create Bid
-            bid = Bid.objects.create(
-                listing_id=listing_id,
-                bidder_id=bidder_id,
-                amount=amount,
-                max_auto_bid=max_auto_bid,
-                is_winning=True # For now
+            previous_locked = state.high_bidder_max if state.high_bidder_max is not None else state.current_price
+
+            outcome = resolve_bid(
+                state.current_price, state.bid_count, state.high_bidder_id, state.high_bidder_max,
+                bidder_id, amount, max_auto_bid
             )
+
+            # 4. Swap Funds (Wallet Service). The leader's whole ceiling is held so its proxy
+            # can answer later challenges; taking the lead locks the new ceiling and releases
+            # the previous holder's in one wallet transaction.
+            bid_id = bid_id or uuid.uuid4()
+            takes_lead = str(outcome.leader_id) == str(bidder_id)
+            if takes_lead:
+                self.swap_funds(bidder_id, outcome.leader_max, previous_high_bidder, previous_locked, listing_id, bid_id)
+
+            # 5. Apply the whole ladder in one transaction
+            try:
+                with transaction.atomic():
+                    # Exactly one row of the new ladder is the winning one
+                    Bid.objects.filter(listing_id=listing_id, is_winning=True).update(is_winning=False)
+                    bids = Bid.objects.bulk_create([
+                        Bid(
+                            id=bid_id if str(row_bidder) == str(bidder_id) else uuid.uuid4(),
+                            listing_id=listing_id,
+                            bidder_id=row_bidder,
+                            amount=row_amount,
+                            max_auto_bid=row_max,
+                            is_winning=row_winning,
+                        )
+                        for row_bidder, row_amount, row_max, row_winning in outcome.bids
+                    ])
+
+                    state.current_price = outcome.price
+                    state.high_bidder_id = outcome.leader_id
+                    state.high_bidder_max = outcome.leader_max
+                    state.bid_count += len(bids)
+
+                    # Anti-sniping
+                    if state.end_time - now < timedelta(minutes=5):
+                        state.end_time += timedelta(minutes=5)
+                        state.is_extended = True
+
+                    state.version += 1
+                    state.save()
+            except Exception:
+                if takes_lead:
+                    # Put the holds back the way they were
+                    try:
+                        if previous_high_bidder:
+                            self.swap_funds(previous_high_bidder, previous_locked, bidder_id, outcome.leader_max,
+                                            listing_id, f"{bid_id}-revert")
+                        else:
+                            self.unlock_funds(bidder_id, outcome.leader_max, listing_id, bid_id)
+                    except Exception as e:
+                        logger.error(f"Failed to revert fund lock for bid {bid_id}: {e}")
+                raise
+
+            bid = next(b for b in bids if b.id == bid_id)
+
+            # 6. Outbid notifications (the previous holder's funds were released by the swap)
+            if outcome.leader_changed:
+                event_bus.publish('dbay.auction-service', 'bid.outbid', {
+                    'listing_id': str(listing_id),
+                    'bidder_id': str(previous_high_bidder),
+                    'amount': str(state.current_price)
+                })
+            elif not bid.is_winning:
+                # Challenger was immediately outbid by the leader's proxy
+                event_bus.publish('dbay.auction-service', 'bid.outbid', {
+                    'listing_id': str(listing_id),
+                    'bidder_id': str(bidder_id),
+                    'amount': str(state.current_price)
+                })
             
-            # Update State
-            state.current_price = amount # Simple logic, no proxy bidding complexity yet
-            state.high_bidder_id = bidder_id
-            state.bid_count += 1
-            
-            # Anti-sniping
-            if state.end_time - now < timedelta(minutes=5):
-                state.end_time += timedelta(minutes=5)
-                state.is_extended = True
-                
-            state.save()
-            
-            # 6. Unlock Funds for previous bidder
-            if previous_high_bidder and previous_high_bidder != bidder_id:
-                # We need to know previous bid amount?
-                # Ideally we query the previous winning bid.
-                # Or we just unlock what we locked?
-                # We locked the previous high bid amount.
-                # But we don't know it here easily without querying Bid history.
-                # Let's query previous winning bid.
-                # Wait, we just marked new bid as winning.
-                # Previous winning bid is now losing.
-                # We need to find the bid that WAS winning.
-                # But we don't have it easily.
-                # Let's assume we unlock `previous_price`? No, price might be lower than bid (proxy).
-                # Simple model: `current_price` IS the locked amount.
-                # So unlock `previous_price`.
-                
+            # 7. Update Redis & Events. The bid is committed: a Redis failure from here on must
+            # not fail the request, or an idempotent retry would place it a second time
+            try:
+                redis_state.write_snapshot(state)
+            except Exception as e:
+                # The next bid or the reconcile job rewrites it; the state endpoint falls back to Postgres
+                logger.error(f"Failed to write snapshot for {listing_id} after bid {bid_id}: {e}")
+                # The write also re-scores the schedule; without it an extension would be popped
+                # at the old end time (the scheduler re-queues it if this fails too)
                 try:
-                    self.unlock_funds(previous_high_bidder, previous_price, listing_id)
-                    
-                    event_bus.publish('dbay.auction-service', 'bid.outbid', {
-                        'listing_id': str(listing_id),
-                        'bidder_id': str(previous_high_bidder),
-                        'amount': str(previous_price)
-                    })
+                    redis_state.schedule_at(listing_id, state.end_time)
                 except Exception as e:
-                    logger.error(f"Failed to unlock funds for {previous_high_bidder}: {e}")
-            
-            # 7. Update Redis & Events
-            cache.set_json(f"auction:{listing_id}", {
-                "current_price": str(state.current_price),
-                "bid_count": state.bid_count,
-                "high_bidder_id": str(state.high_bidder_id),
-                "end_time": state.end_time.isoformat(),
-                "extended": state.is_extended
-            })
+                    logger.error(f"Failed to reschedule {listing_id} at {state.end_time}: {e}")
+            stream.publish(stream.state_message(state))
+            self._record_bid_caches(listing_id, state.version, state.bid_count, state.current_price, bids)
             
             event_bus.publish('dbay.auction-service', 'bid.placed', {
                 'listing_id': str(listing_id),
-                'bidder_id': str(bidder_id),
-                'amount': str(amount),
+                'bidder_id': str(state.high_bidder_id),
+                'amount': str(state.current_price),
                 'timestamp': bid.created_at.isoformat()
             })
             
             return bid
             
         finally:
-            lock.release()
+            try:
+                lock.release()
+            except Exception as e:
+                # Expired or Redis unreachable; it times out on its own
+                logger.warning(f"Failed to release bid lock for {listing_id}: {e}")
+
+    def place_bid_atomic(self, listing_id, bidder_id, amount, max_auto_bid=None):
+        """
+        Script mode: validate and apply the bid in one Redis script without holding a lock.
+        Bid/AuctionState rows, previous-leader unlocks and events are handled by persist_pending_bids.
+        """
+        ceiling = max(amount, max_auto_bid or amount)
+
+        snapshot = redis_state.read_snapshot(listing_id)
+        if snapshot is None:
+            state = self.get_or_create_state(listing_id)
+            if not state:
+                raise Exception("Auction not found")
+            redis_state.write_snapshot(state)
+            snapshot = redis_state.read_snapshot(listing_id)
+
+        # Cheap pre-check so obviously invalid bids never reach the wallet; the script re-validates
+        if snapshot['status'] != 'OPEN' or snapshot['end_time'] < timezone.now():
+            raise Exception("Auction ended")
+        if snapshot['high_bidder_id'] != str(bidder_id):
+            min_bid = minimum_bid(snapshot['current_price'], snapshot['bid_count'])
+            if amount < min_bid:
+                raise Exception(f"Bid must be at least {min_bid}")
+
+        # Hold the full ceiling up front so an accepted bid is always funded
+        bid_id = uuid.uuid4()
+        self.lock_funds(bidder_id, ceiling, listing_id, bid_id)
+
+        now = timezone.now()
+        try:
+            result = redis_state.accept_bid(listing_id, bid_id, bidder_id, amount, max_auto_bid, now)
+            if result[0] == 'MISSING':
+                # Snapshot evicted since the pre-check
+                redis_state.write_snapshot(self.get_or_create_state(listing_id))
+                result = redis_state.accept_bid(listing_id, bid_id, bidder_id, amount, max_auto_bid, now)
+        except Exception:
+            self.unlock_funds(bidder_id, ceiling, listing_id, bid_id)
+            raise
+
+        if result[0] != 'OK':
+            self.unlock_funds(bidder_id, ceiling, listing_id, bid_id)
+            raise Exception(result[1] if len(result) > 1 else "Auction not found")
+
+        _, price, leader, winning, _, _, end_ts, bid_count, version, extended = result
+        is_winning = winning == '1'
+        stream.publish({
+            'listing_id': str(listing_id),
+            'current_price': price,
+            'bid_count': bid_count,
+            'high_bidder_id': leader,
+            'end_time': datetime.fromtimestamp(float(end_ts), tz=dt_timezone.utc).isoformat(),
+            'is_extended': extended == '1',
+            'status': 'OPEN',
+            'version': version,
+        })
+        if not is_winning:
+            # Immediately outbid by the leader's proxy
+            self.unlock_funds(bidder_id, ceiling, listing_id, bid_id)
+
+        return Bid(
+            id=bid_id,
+            listing_id=listing_id,
+            bidder_id=bidder_id,
+            amount=Decimal(price) if is_winning else ceiling,
+            max_auto_bid=max_auto_bid,
+            is_winning=is_winning,
+            created_at=now,
+        )
+
+    def _bid_lock(self, listing_id):
+        return cache.redis.lock(f"lock:auction:{listing_id}", timeout=10)
+
+    def persist_pending_bids(self, batch_size=500):
+        """
+        Drain bids accepted by the Redis script into Postgres. Each call claims its batch
+        atomically (redis_state.claim_pending), so any number of drainers can run; batches
+        of drainers that died are requeued after CLAIM_LEASE_SECONDS. At-least-once: rows
+        have deterministic ids and AuctionState only moves forward on bid_count, so a
+        replayed batch is harmless. Returns the number of queue entries processed.
+        """
+        redis_state.requeue_stale_claims()
+        entries = redis_state.claim_pending(persist_worker_id(), batch_size)
+        if not entries:
+            return 0
+
+        rows = []
+        entry_rows = []
+        latest = {}
+        for entry in entries:
+            bid_id = uuid.UUID(entry['bid_id'])
+            created_at = datetime.fromtimestamp(entry['created_ts'], tz=dt_timezone.utc)
+            start = len(rows)
+            for i, row in enumerate(entry['bids']):
+                own = row['bidder_id'] == entry['bidder_id']
+                rows.append(Bid(
+                    id=bid_id if own else uuid.uuid5(bid_id, str(i)),
+                    listing_id=entry['listing_id'],
+                    bidder_id=row['bidder_id'],
+                    amount=Decimal(str(row['amount'])),
+                    max_auto_bid=Decimal(str(row['max_auto_bid'])) if row['max_auto_bid'] is not None else None,
+                    is_winning=row['is_winning'],
+                    created_at=created_at,
+                ))
+            entry_rows.append(rows[start:])
+            latest[entry['listing_id']] = entry
+
+        # Only the last winning row per auction in this batch stays winning
+        winners = {}
+        for row in rows:
+            if row.is_winning:
+                if str(row.listing_id) in winners:
+                    winners[str(row.listing_id)].is_winning = False
+                winners[str(row.listing_id)] = row
+
+        with transaction.atomic():
+            Bid.objects.bulk_create(rows, ignore_conflicts=True)
+            for listing_id, entry in latest.items():
+                advanced = AuctionState.objects.filter(listing_id=listing_id, bid_count__lt=entry['bid_count']).update(
+                    current_price=Decimal(str(entry['current_price'])),
+                    bid_count=entry['bid_count'],
+                    high_bidder_id=entry['high_bidder_id'],
+                    high_bidder_max=Decimal(str(entry['high_bidder_max'])),
+                    end_time=datetime.fromtimestamp(entry['end_ts'], tz=dt_timezone.utc),
+                    is_extended=entry['extended'],
+                    version=entry['version'],
+                    updated_at=timezone.now(),
+                )
+                if advanced:
+                    Bid.objects.filter(listing_id=listing_id, is_winning=True).exclude(
+                        id=winners[listing_id].id
+                    ).update(is_winning=False)
+                elif listing_id in winners and AuctionState.objects.filter(
+                    listing_id=listing_id, bid_count__gt=entry['bid_count']
+                ).exists():
+                    # A requeued batch older than what is persisted: its leader has since been outbid
+                    Bid.objects.filter(id=winners[listing_id].id).update(is_winning=False)
+
+        with event_bus.batch():
+            self._after_persist(entries, entry_rows)
+
+        redis_state.ack_pending(persist_worker_id())
+        return len(entries)
+
+    def _after_persist(self, entries, entry_rows):
+        """Caches, previous-leader unlocks and events for a persisted batch."""
+        for entry, bids in zip(entries, entry_rows):
+            listing_id = entry['listing_id']
+            self._record_bid_caches(listing_id, entry['version'], entry['bid_count'],
+                                    Decimal(str(entry['current_price'])), bids)
+            previous_leader = entry['previous_leader']
+            bidder_won = entry['high_bidder_id'] == entry['bidder_id']
+            if previous_leader and bidder_won:
+                # Release the previous hold; for a ceiling raise that is the bidder's own old hold
+                try:
+                    self.unlock_funds(previous_leader, Decimal(str(entry['previous_locked'])), listing_id, entry['bid_id'])
+                except Exception as e:
+                    logger.error(f"Failed to unlock funds for {previous_leader}: {e}")
+            if previous_leader and previous_leader != entry['high_bidder_id']:
+                event_bus.publish('dbay.auction-service', 'bid.outbid', {
+                    'listing_id': listing_id,
+                    'bidder_id': previous_leader,
+                    'amount': str(entry['current_price'])
+                })
+            elif not bidder_won:
+                event_bus.publish('dbay.auction-service', 'bid.outbid', {
+                    'listing_id': listing_id,
+                    'bidder_id': entry['bidder_id'],
+                    'amount': str(entry['current_price'])
+                })
+            event_bus.publish('dbay.auction-service', 'bid.placed', {
+                'listing_id': listing_id,
+                'bidder_id': entry['high_bidder_id'],
+                'amount': str(entry['current_price']),
+                'timestamp': datetime.fromtimestamp(entry['created_ts'], tz=dt_timezone.utc).isoformat()
+            })
+
+    def _record_bid_caches(self, listing_id, version, bid_count, current_price, bids):
+        # Cache only; a missed summary update is detected by the next one and rebuilt
+        try:
+            bid_summary.record_bids(listing_id, version, bid_count, current_price, bids)
+        except Exception as e:
+            logger.error(f"Failed to update bid summary for {listing_id}: {e}")
+        try:
+            bidder_index.record_bids(listing_id, bids)
+        except Exception as e:
+            logger.error(f"Failed to update bidder index for {listing_id}: {e}")
+
+    def get_state(self, listing_id):
+        """
+        Read-through: serve the Redis snapshot and fall back to Postgres (and the listing
+        service) only on a miss, re-seeding the snapshot. Returns an AuctionState (possibly
+        unsaved) or None.
+        """
+        snapshot = redis_state.read_snapshot(listing_id, count=True)
+        if snapshot is not None:
+            return redis_state.state_from_snapshot(listing_id, snapshot)
+
+        state = self.get_or_create_state(listing_id)
+        if state:
+            redis_state.write_snapshot(state)
+        return state
+
+    def close_auction(self, listing_id):
+        """
+        Close an ended auction. Returns (state, closed_now); raises AuctionState.DoesNotExist
+        or ValueError if it has not ended yet.
+        """
+        snapshot = redis_state.read_snapshot(listing_id)
+        with transaction.atomic():
+            state = AuctionState.objects.select_for_update().get(listing_id=listing_id)
+            if state.status == 'CLOSED':
+                return state, False
+            if snapshot is not None and snapshot['bid_count'] > state.bid_count:
+                # Script mode: Redis is ahead of the async persister and is authoritative
+                state.current_price = snapshot['current_price']
+                state.bid_count = snapshot['bid_count']
+                state.high_bidder_id = snapshot['high_bidder_id']
+                state.high_bidder_max = snapshot['high_bidder_max']
+                state.end_time = snapshot['end_time']
+                state.is_extended = snapshot['is_extended']
+            if state.end_time > timezone.now():
+                raise ValueError("Auction not ended yet")
+            state.status = 'CLOSED'
+            state.version += 1
+            state.save()
+
+        if not redis_state.set_status(listing_id, 'CLOSED', redis_state.CLOSED_SNAPSHOT_TTL):
+            redis_state.write_snapshot(state)
+        stream.publish(stream.state_message(state))
+        return state, True
+
+    def close_auctions(self, listing_ids=None, limit=500):
+        """
+        Close up to `limit` ended OPEN auctions (optionally restricted to listing_ids) with one
+        conditional UPDATE ... RETURNING. Rows locked by a concurrent closer are skipped, so
+        parallel closers never double-close. Returns winner info for every auction closed.
+        """
+        now = timezone.now()
+        if BID_MODE == 'script':
+            listing_ids = self._persisted_ended_auctions(listing_ids, limit, now)
+            if not listing_ids:
+                return []
+
+        table = AuctionState._meta.db_table
+        id_filter = "AND listing_id = ANY(%s::uuid[])" if listing_ids else ""
+        params = [now]
+        if listing_ids:
+            params.append([str(listing_id) for listing_id in listing_ids])
+        params.extend([limit, now])
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {table}
+                SET status = 'CLOSED', version = version + 1, updated_at = NOW()
+                WHERE listing_id IN (
+                    SELECT listing_id FROM {table}
+                    WHERE status = 'OPEN' AND end_time <= %s {id_filter}
+                    ORDER BY end_time
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                AND status = 'OPEN' AND end_time <= %s
+                RETURNING listing_id, high_bidder_id, current_price
+            """, params)
+            rows = cursor.fetchall()
+
+        closed = [
+            {'listing_id': str(listing_id), 'winner_id': str(winner_id) if winner_id else None, 'winning_bid': price}
+            for listing_id, winner_id, price in rows
+        ]
+        redis_state.set_status_many([c['listing_id'] for c in closed], 'CLOSED', redis_state.CLOSED_SNAPSHOT_TTL)
+        stream.publish_many([
+            {'listing_id': c['listing_id'], 'status': 'CLOSED', 'high_bidder_id': c['winner_id'],
+             'current_price': str(int(c['winning_bid']))}
+            for c in closed
+        ])
+        return closed
+
+    def _persisted_ended_auctions(self, listing_ids, limit, now):
+        """
+        Script mode: ended OPEN auctions whose accepted bids have all reached Postgres. Bids
+        still queued for persist_bids would change the winner, so auctions Redis is ahead on
+        are left for a later run; bidding has ended, so the persister catches up quickly.
+        """
+        candidates = AuctionState.objects.filter(status='OPEN', end_time__lte=now)
+        if listing_ids:
+            candidates = candidates.filter(listing_id__in=listing_ids)
+        candidates = list(candidates.order_by('end_time').values_list('listing_id', 'bid_count')[:limit])
+        snapshots = redis_state.read_snapshots([listing_id for listing_id, _ in candidates])
+        ready = []
+        for listing_id, bid_count in candidates:
+            snapshot = snapshots[str(listing_id)]
+            if snapshot is None or snapshot['bid_count'] <= bid_count:
+                ready.append(listing_id)
+        if len(ready) < len(candidates):
+            logger.info(f"Deferring close of {len(candidates) - len(ready)} auction(s) with bids not yet persisted")
+        return ready
 
     def get_or_create_state(self, listing_id):
+        """
+        States are normally materialized ahead of time from listing events (see
+        sync_listing_state); this lazy fetch only covers listings whose events were missed.
+        """
         try:
             return AuctionState.objects.get(listing_id=listing_id)
         except AuctionState.DoesNotExist:
-            # Fetch from Listing Service
-            try:
-                response = requests.get(f"{LISTING_SERVICE_URL}/api/v1/listings/listings/{listing_id}/")
-                if response.status_code == 200:
-                    data = response.json()
-                    if data['listing_type'] != 'AUCTION':
-                         return None
-                    raw_end = data.get('end_time')
-                    if raw_end:
-                        end_time = datetime.fromisoformat(str(raw_end).replace('Z', '+00:00'))
-                    else:
-                        end_time = timezone.now() + timedelta(days=7)
-                    state = AuctionState.objects.create(
-                        listing_id=listing_id,
-                        current_price=Decimal(int(round(float(data['starting_price'] or 0)))),
-                        end_time=end_time,
-                        bid_count=0
-                    )
-                    return state
-            except Exception as e:
-                logger.error(f"Error fetching listing {listing_id}: {e}")
-                return None
-        return None
+            pass
+        try:
+            response = listing_client.get(
+                f"/api/v1/listings/listings/{listing_id}/",
+                timeout=(LISTING_FETCH_TIMEOUT, LISTING_FETCH_TIMEOUT),
+                budget=LISTING_FETCH_TIMEOUT * 2
+            )
+        except Exception as e:
+            logger.error(f"Error fetching listing {listing_id}: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        try:
+            return self.sync_listing_state(response.json())
+        except Exception as e:
+            logger.error(f"Error creating auction state for {listing_id}: {e}")
+            return None
+
+    def sync_listing_state(self, listing):
+        """
+        Create or refresh the AuctionState (and Redis snapshot) for a listing payload, as
+        published in listing.created/listing.updated or returned by the listing API.
+        Returns the state, or None for listings that are not auctions.
+
+        Price and end time follow the listing only until the first bid; after that the
+        auction owns them (increments, anti-snipe extensions).
+        """
+        if listing.get('listing_type') not in AUCTION_LISTING_TYPES:
+            return None
+        listing_id = listing['id']
+        starting_price = Decimal(int(round(float(listing.get('starting_price') or 0))))
+        raw_end = listing.get('end_time')
+        if raw_end:
+            end_time = datetime.fromisoformat(str(raw_end).replace('Z', '+00:00'))
+        else:
+            end_time = timezone.now() + timedelta(days=7)
+
+        with transaction.atomic():
+            state, created = AuctionState.objects.select_for_update().get_or_create(
+                listing_id=listing_id,
+                defaults={'current_price': starting_price, 'end_time': end_time, 'bid_count': 0}
+            )
+            if created:
+                # Seeds the snapshot and puts the auction on the end-time schedule
+                redis_state.write_snapshot(state)
+                return state
+            if state.status != 'OPEN' or state.bid_count > 0:
+                return state
+            if state.current_price == starting_price and state.end_time == end_time:
+                return state
+            # Script mode: bids may be accepted in Redis but not yet persisted
+            snapshot = redis_state.read_snapshot(listing_id)
+            if snapshot is not None and snapshot['bid_count'] > 0:
+                return state
+            end_moved_earlier = end_time < state.end_time
+            state.current_price = starting_price
+            state.end_time = end_time
+            state.version += 1
+            state.save(update_fields=['current_price', 'end_time', 'version', 'updated_at'])
 
-    def lock_funds(self, user_id, amount, listing_id):
-        response = requests.post(f"{WALLET_SERVICE_URL}/api/v1/wallet/wallet/internal/lock/", json={
+        if redis_state.write_snapshot(state) and end_moved_earlier:
+            # The snapshot write only ever moves the schedule later (ZADD GT)
+            redis_state.schedule_at(listing_id, end_time)
+        return state
+
+    def lock_funds(self, user_id, amount, listing_id, operation_id=None):
+        response = wallet_client.post("/api/v1/wallet/wallet/internal/lock/", idempotent=bool(operation_id), json={
             "user_id": str(user_id),
             "amount": str(amount),
             "reference_type": "auction",
-            "reference_id": str(listing_id)
+            "reference_id": str(listing_id),
+            "operation_id": str(operation_id) if operation_id else None
         })
         if response.status_code != 200:
              raise Exception(f"Failed to lock funds: {response.text}")
 
-    def unlock_funds(self, user_id, amount, listing_id):
-        requests.post(f"{WALLET_SERVICE_URL}/api/v1/wallet/wallet/internal/unlock/", json={
+    def unlock_funds(self, user_id, amount, listing_id, operation_id=None):
+        wallet_client.post("/api/v1/wallet/wallet/internal/unlock/", idempotent=bool(operation_id), json={
+            "user_id": str(user_id),
+            "amount": str(amount),
+            "reference_type": "auction",
+            "reference_id": str(listing_id),
+            "operation_id": str(operation_id) if operation_id else None
+        })
+
+    def swap_funds(self, user_id, amount, previous_user_id, previous_amount, listing_id, operation_id):
+        """Lock the new leader's ceiling and release the previous holder's in one wallet call."""
+        response = wallet_client.post("/api/v1/wallet/wallet/internal/swap-lock/", idempotent=True, json={
             "user_id": str(user_id),
             "amount": str(amount),
+            "previous_user_id": str(previous_user_id) if previous_user_id else None,
+            "previous_amount": str(previous_amount) if previous_user_id else None,
             "reference_type": "auction",
-            "reference_id": str(listing_id)
+            "reference_id": str(listing_id),
+            "operation_id": str(operation_id)
         })
+        if response.status_code != 200:
+             raise Exception(f"Failed to lock funds: {response.text}")
+
+    def reference_holds(self, listing_ids):
+        """Net wallet hold per bidder for each auction, from the ledger: {listing_id: {user_id: Decimal}}."""
+        response = wallet_client.post("/api/v1/wallet/wallet/internal/reference-holds/", idempotent=True, json={
+            "reference_type": "auction",
+            "reference_ids": [str(listing_id) for listing_id in listing_ids]
+        })
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch wallet holds: {response.text}")
+        return {
+            listing_id: {user_id: Decimal(amount) for user_id, amount in users.items()}
+            for listing_id, users in response.json().items()
+        }
 
 auction_service = AuctionService()
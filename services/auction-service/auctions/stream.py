@@ -0,0 +1,185 @@
+"""
+Server-Sent Events feed of auction state.
+
+Every state change (accepted bid, extension, close) is published to
+`auction:updates:{listing_id}`. Each process holds ONE pattern subscription to those
+channels in a background thread and fans messages out to its open streams, so any
+number of viewers of a hot auction cost one Redis subscription per process instead of
+a Django request and DB hit per poll.
+
+Messages are JSON state (listing_id, current_price, bid_count, high_bidder_id,
+end_time, is_extended, status, version); close messages only carry listing_id,
+status, high_bidder_id and current_price. Each open stream holds a gthread worker thread
+for its whole life, so a process serves at most STREAM_MAX_PER_PROCESS of them (well below
+its thread count) and answers 503 beyond that; production routes the stream path to its
+own auction-stream deployment so viewers never starve bid and API requests.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from shared.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "auction:updates:"
+MAX_STREAM_LISTINGS = 50
+# Streams end after this and EventSource reconnects, so no worker thread is held forever
+STREAM_MAX_SECONDS = 300
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 2000
+# Messages are whole states, so a slow client just skips stale ones
+LISTENER_QUEUE_SIZE = 32
+# Keep this below the gunicorn --threads count so API requests always get a thread
+MAX_STREAMS_PER_PROCESS = int(os.environ.get('STREAM_MAX_PER_PROCESS', '32'))
+
+
+def channel(listing_id):
+    return f"{CHANNEL_PREFIX}{listing_id}"
+
+
+def state_message(state):
+    return {
+        'listing_id': str(state.listing_id),
+        'current_price': str(int(state.current_price)),
+        'bid_count': state.bid_count,
+        'high_bidder_id': str(state.high_bidder_id) if state.high_bidder_id else None,
+        'end_time': state.end_time.isoformat(),
+        'is_extended': state.is_extended,
+        'status': state.status,
+        'version': state.version,
+    }
+
+
+def publish(message):
+    try:
+        cache.redis.publish(channel(message['listing_id']), json.dumps(message))
+    except Exception as e:
+        # Viewers catch up from the next update or their initial state on reconnect
+        logger.error(f"Failed to publish auction update for {message['listing_id']}: {e}")
+
+
+def publish_many(messages):
+    if not messages:
+        return
+    try:
+        pipe = cache.redis.pipeline(transaction=False)
+        for message in messages:
+            pipe.publish(channel(message['listing_id']), json.dumps(message))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to publish {len(messages)} auction update(s): {e}")
+
+
+class UpdateHub:
+    """Process-wide fan-out of the auction update channels to local stream queues."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = {}
+        self._thread = None
+
+    def subscribe(self, listing_ids):
+        listener = queue.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        with self._lock:
+            for listing_id in listing_ids:
+                self._listeners.setdefault(listing_id, set()).add(listener)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='auction-update-hub', daemon=True)
+                self._thread.start()
+        return listener
+
+    def unsubscribe(self, listener, listing_ids):
+        with self._lock:
+            for listing_id in listing_ids:
+                listeners = self._listeners.get(listing_id)
+                if listeners is not None:
+                    listeners.discard(listener)
+                    if not listeners:
+                        del self._listeners[listing_id]
+
+    def _dispatch(self, message):
+        listing_id = message['channel'][len(CHANNEL_PREFIX):]
+        with self._lock:
+            listeners = list(self._listeners.get(listing_id, ()))
+        for listener in listeners:
+            try:
+                listener.put_nowait(message['data'])
+            except queue.Full:
+                pass
+
+    def _run(self):
+        while True:
+            try:
+                pubsub = cache.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                # Poll rather than listen(): a quiet channel would outlast REDIS_SOCKET_TIMEOUT
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message['type'] == 'pmessage':
+                        self._dispatch(message)
+            except Exception as e:
+                logger.error(f"Auction update subscription failed, resubscribing: {e}")
+                time.sleep(1)
+
+
+hub = UpdateHub()
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS_PER_PROCESS)
+
+
+def _event(data):
+    return f"event: state\ndata: {data}\n\n"
+
+
+def event_stream(listing_ids, load_initial):
+    """
+    SSE generator: current state of each listing, then every change until
+    STREAM_MAX_SECONDS. load_initial() runs after subscribing, so no change in between is lost.
+    """
+    listener = hub.subscribe(listing_ids)
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        for message in load_initial():
+            yield _event(json.dumps(message))
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                data = listener.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield _event(data)
+    finally:
+        hub.unsubscribe(listener, listing_ids)
+
+
+class _SlottedStream:
+    """Holds a stream slot until Django closes the response, even if it never started."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._stream)
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                _stream_slots.release()
+
+
+def open_stream(listing_ids, load_initial):
+    """event_stream() within this process's stream cap, or None if it is full."""
+    if not _stream_slots.acquire(blocking=False):
+        return None
+    return _SlottedStream(event_stream(listing_ids, load_initial))
@@ -0,0 +1,16 @@
+import uuid
+
+import pytest
+from shared.cache import cache
+from auctions import redis_state
+
+
+@pytest.fixture
+def listing_id():
+    """A fresh auction id; its Redis keys and schedule entry are removed afterwards."""
+    listing_id = uuid.uuid4()
+    yield listing_id
+    keys = list(cache.redis.scan_iter(match=f"*{listing_id}*"))
+    if keys:
+        cache.redis.delete(*keys)
+    cache.redis.zrem(redis_state.SCHEDULE_KEY, str(listing_id))
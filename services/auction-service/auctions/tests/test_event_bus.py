@@ -0,0 +1,42 @@
+from unittest import mock
+
+import pytest
+
+from shared.event_bus import EventBus
+
+
+@pytest.fixture
+def bus(settings):
+    settings.OUTBOX_MODEL = None
+    bus = EventBus()
+    bus.background = False
+    bus.client = mock.Mock()
+    return bus
+
+
+def test_publish_returns_true_once_sent(bus):
+    bus.client.put_events.return_value = {'FailedEntryCount': 0, 'Entries': [{'EventId': '1'}]}
+
+    assert bus.publish('dbay.test', 'thing.happened', {'id': 1}) is True
+
+
+def test_publish_returns_false_when_entry_rejected(bus):
+    bus.client.put_events.return_value = {
+        'FailedEntryCount': 1, 'Entries': [{'ErrorCode': 'InternalFailure', 'ErrorMessage': 'try again'}],
+    }
+
+    assert bus.publish('dbay.test', 'thing.happened', {'id': 1}) is False
+
+
+def test_publish_returns_false_when_send_raises(bus):
+    bus.client.put_events.side_effect = ConnectionError("EventBridge unreachable")
+
+    assert bus.publish('dbay.test', 'thing.happened', {'id': 1}) is False
+    assert bus.publish_many('dbay.test', 'thing.happened', [{'id': 1}, {'id': 2}]) is False
+
+
+def test_publish_returns_true_when_queued_in_batch(bus):
+    bus.client.put_events.side_effect = ConnectionError("EventBridge unreachable")
+
+    with bus.batch():
+        assert bus.publish('dbay.test', 'thing.happened', {'id': 1}) is True
@@ -0,0 +1,33 @@
+from datetime import timedelta
+from decimal import Decimal
+import uuid
+
+import pytest
+from django.utils import timezone
+
+from auctions import reconcile, services
+from auctions.models import AuctionState, Bid
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode', ['lock', 'script'])
+def test_check_batch_reports_hold_drift_on_open_auction(monkeypatch, listing_id, mode):
+    monkeypatch.setattr(services, 'BID_MODE', mode)
+    bidder_id = uuid.uuid4()
+    AuctionState.objects.create(
+        listing_id=listing_id, current_price=Decimal('10'), bid_count=1, high_bidder_id=bidder_id,
+        high_bidder_max=Decimal('15'), end_time=timezone.now() + timedelta(hours=1), version=1,
+    )
+    Bid.objects.create(listing_id=listing_id, bidder_id=bidder_id, amount=Decimal('10'),
+                       max_auto_bid=Decimal('15'), is_winning=True)
+    # The wallet holds 12 of the leader's 15 ceiling
+    monkeypatch.setattr(services.auction_service, 'reference_holds',
+                        lambda listing_ids: {str(listing_id): {str(bidder_id): Decimal('12')}})
+
+    report = reconcile.Report()
+    reconcile._check_batch(list(reconcile._tallies({'listing_id': listing_id}, 100)), report, repair=False)
+
+    assert report.checked == 1
+    assert report.counts == {'snapshot_missing': 1, 'wallet_hold': 1}
+    assert {'kind': 'wallet_hold', 'listing_id': str(listing_id), 'user_id': str(bidder_id),
+            'delta': '3'} in report.samples
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from decimal import Decimal
+import time
+import uuid
+
+import pytest
+from django.utils import timezone
+
+from shared.cache import cache
+from auctions import redis_state, scheduler, services
+from auctions.models import AuctionState
+
+
+@pytest.mark.django_db
+def test_run_once_keeps_deferred_script_auction_scheduled(monkeypatch, listing_id):
+    monkeypatch.setattr(services, 'BID_MODE', 'script')
+    state = AuctionState.objects.create(
+        listing_id=listing_id, current_price=Decimal('10'), bid_count=1, high_bidder_id=uuid.uuid4(),
+        end_time=timezone.now() - timedelta(seconds=1), version=1,
+    )
+    # Redis accepted a second bid that persist_bids has not written yet; this also schedules it
+    state.bid_count, state.version = 2, 2
+    redis_state.write_snapshot(state)
+    closer = scheduler.AuctionCloseScheduler()
+    monkeypatch.setattr(closer, 'start_close', lambda *args: pytest.fail("deferred auction was closed"))
+
+    before = time.time()
+    assert closer.run_once() == 0
+
+    assert AuctionState.objects.get(listing_id=listing_id).status == 'OPEN'
+    score = cache.redis.zscore(redis_state.SCHEDULE_KEY, str(listing_id))
+    assert score is not None and score > before
+    assert str(listing_id) in dict(scheduler.peek_due(horizon_seconds=scheduler.UNCLOSED_RETRY_SECONDS + 5))
+
+
+@pytest.mark.django_db
+def test_requeue_unclosed_uses_later_postgres_end_time(listing_id):
+    end_time = timezone.now() + timedelta(minutes=5)
+    AuctionState.objects.create(listing_id=listing_id, end_time=end_time)
+
+    scheduler.requeue_unclosed([str(listing_id)])
+
+    assert cache.redis.zscore(redis_state.SCHEDULE_KEY, str(listing_id)) == pytest.approx(end_time.timestamp(), abs=0.001)
+
+
+@pytest.mark.django_db
+def test_requeue_unclosed_drops_closed_auctions(listing_id):
+    AuctionState.objects.create(listing_id=listing_id, end_time=timezone.now(), status='CLOSED')
+
+    scheduler.requeue_unclosed([str(listing_id)])
+
+    assert cache.redis.zscore(redis_state.SCHEDULE_KEY, str(listing_id)) is None
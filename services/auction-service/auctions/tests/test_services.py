@@ -0,0 +1,29 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+import uuid
+
+import pytest
+from django.utils import timezone
+
+from shared.cache import cache
+from auctions import redis_state
+from auctions.models import AuctionState, Bid
+from auctions.services import auction_service
+
+
+@pytest.mark.django_db
+def test_failed_snapshot_write_still_moves_extended_close(monkeypatch, listing_id):
+    end_time = timezone.now() + timedelta(minutes=2)
+    AuctionState.objects.create(listing_id=listing_id, current_price=Decimal('10'), end_time=end_time)
+    redis_state.schedule_at(listing_id, end_time)
+    monkeypatch.setattr(auction_service, 'swap_funds', mock.Mock())
+    monkeypatch.setattr(redis_state, 'write_snapshot', mock.Mock(side_effect=ConnectionError("Redis down")))
+
+    with mock.patch('auctions.services.event_bus'):
+        bid = auction_service.place_bid_locked(listing_id, uuid.uuid4(), Decimal('10'))
+
+    state = AuctionState.objects.get(listing_id=listing_id)
+    assert Bid.objects.filter(id=bid.id).exists()
+    assert state.is_extended and state.end_time == end_time + timedelta(minutes=5)
+    assert cache.redis.zscore(redis_state.SCHEDULE_KEY, str(listing_id)) == pytest.approx(state.end_time.timestamp(), abs=0.001)
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AuctionViewSet
+from .views import AuctionViewSet, stream_updates
 
 router = DefaultRouter()
 router.register(r'auctions', AuctionViewSet, basename='auction')
 
 urlpatterns = [
+    path('auctions/stream/', stream_updates, name='auction-stream'),
     path('', include(router.urls)),
 ]
@@ -1,11 +1,18 @@
+import uuid
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from shared import http
+from shared.cache import cache
 from .models import Bid, AuctionState
 from .serializers import BidSerializer, AuctionStateSerializer
 from .services import auction_service
-from django.utils import timezone
-from datetime import timedelta
+from .pagination import InvalidCursor, page_size, paginate_bids
+from . import bid_summary, bidder_index, idempotency, redis_state, scheduler, stream
 
 class AuctionViewSet(viewsets.ViewSet):
     @action(detail=True, methods=['post'], url_path='bid')
@@ -13,54 +20,173 @@ class AuctionViewSet(viewsets.ViewSet):
         listing_id = pk
         bidder_id = request.headers.get('X-User-ID') or 'test-user-id'
         amount = request.data.get('amount')
-        
+        max_auto_bid = request.data.get('max_auto_bid')
+
+        # Client retries with the same Idempotency-Key replay the first response
+        # without touching the auction lock or the wallet
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            request_fingerprint = idempotency.fingerprint(listing_id, amount, max_auto_bid)
+            try:
+                replay = idempotency.claim(bidder_id, idempotency_key, request_fingerprint)
+            except idempotency.IdempotencyConflict as e:
+                return Response({'error': str(e)}, status=e.status)
+            if replay is not None:
+                replay_status, body = replay
+                return Response(body, status=replay_status, headers={'Idempotent-Replayed': 'true'})
+
         try:
-            bid = auction_service.place_bid(listing_id, bidder_id, amount)
-            return Response(BidSerializer(bid).data, status=status.HTTP_201_CREATED)
+            bid = auction_service.place_bid(listing_id, bidder_id, amount, max_auto_bid)
         except Exception as e:
+            if idempotency_key:
+                idempotency.release(bidder_id, idempotency_key)
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        data = BidSerializer(bid).data
+        if idempotency_key:
+            idempotency.complete(bidder_id, idempotency_key, request_fingerprint, status.HTTP_201_CREATED, data)
+        return Response(data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def state(self, request, pk=None):
-        state = auction_service.get_or_create_state(pk)
+        state = auction_service.get_state(pk)
         if not state:
             return Response({'error': 'Auction not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response(AuctionStateSerializer(state).data)
 
+    @action(detail=False, methods=['get'], url_path='state-cache-stats')
+    def state_cache_stats(self, request):
+        # Internal: hit ratio of the read-through state snapshot
+        return Response(redis_state.cache_stats())
+
+    @action(detail=False, methods=['get'], url_path='http-client-stats')
+    def http_client_stats(self, request):
+        # Internal: per-target latency, errors and breaker state of outgoing service calls
+        return Response(http.metrics())
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        # Internal: tiered cache hit ratio and Redis/Memcached pool saturation
+        return Response({'lookups': cache.stats(), 'pools': cache.pool_stats()})
+
     @action(detail=True, methods=['get'])
     def bids(self, request, pk=None):
-        bids = Bid.objects.filter(listing_id=pk).order_by('-amount')
-        return Response(BidSerializer(bids, many=True).data)
+        # Keyset pages: ?cursor=<next from the previous page>&limit=<1..200>
+        try:
+            bids, next_cursor = paginate_bids(
+                Bid.objects.filter(listing_id=pk),
+                cursor=request.query_params.get('cursor'),
+                limit=page_size(request.query_params.get('limit', 50))
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({
+            'next': next_url,
+            'results': BidSerializer(bids, many=True).data
+        })
+
+    @action(detail=True, methods=['get'], url_path='bid-summary')
+    def summary(self, request, pk=None):
+        # Count, unique bidders, price ladder and last bids from Redis, for listing pages
+        summary = bid_summary.get_summary(pk)
+        if summary is None:
+            return Response({'error': 'Auction not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(summary)
+
+    @action(detail=False, methods=['get'], url_path='my-bids')
+    def my_bids(self, request):
+        # Active auctions the caller has bid on, with winning/outbid status, in one call
+        bidder_id = request.headers.get('X-User-ID')
+        if not bidder_id:
+            return Response({'error': 'X-User-ID header required'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(bidder_index.my_bids(bidder_id))
 
     @action(detail=False, methods=['get'], url_path='ending')
     def ending(self, request):
-        now = timezone.now()
-        # Find auctions ending in the next minute or already ended but not closed
-        # Ideally check status='OPEN'
-        states = AuctionState.objects.filter(end_time__lte=now + timedelta(minutes=1), status='OPEN')
-        return Response(AuctionStateSerializer(states, many=True).data)
+        # Auctions ending in the next minute or already ended but not closed,
+        # served from the end-time schedule instead of scanning AuctionState
+        due = scheduler.peek_due(horizon_seconds=60)
+        return Response([
+            {'listing_id': listing_id, 'end_time': end_time.isoformat()}
+            for listing_id, end_time in due
+        ])
 
     @action(detail=True, methods=['post'], url_path='close')
     def close(self, request, pk=None):
         # Internal endpoint called by Step Function
-        # Verify it ended
-        state = AuctionState.objects.get(listing_id=pk)
-        if state.status == 'CLOSED':
-            return Response({'status': 'already_closed'})
-            
-        now = timezone.now()
-        if state.end_time > now:
-             return Response({'error': 'Auction not ended yet'}, status=status.HTTP_400_BAD_REQUEST)
-             
-        state.status = 'CLOSED'
-        state.save()
-        
-        # Return winner info
+        try:
+            state, closed_now = auction_service.close_auction(pk)
+        except AuctionState.DoesNotExist:
+            return Response({'error': 'Auction not found'}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Return winner info (also when a batch close got there first)
         winner_id = state.high_bidder_id
         winning_bid = state.current_price
         
-        return Response({
+        response = {
             'listing_id': pk,
             'winner_id': winner_id,
             'winning_bid': winning_bid
-        })
+        }
+        if not closed_now:
+            response['status'] = 'already_closed'
+        return Response(response)
+
+    @action(detail=False, methods=['post'], url_path='close-batch')
+    def close_batch(self, request):
+        # Internal: close many ended auctions with one conditional UPDATE ... RETURNING
+        listing_ids = request.data.get('listing_ids') or None
+        try:
+            limit = min(int(request.data.get('limit', 500)), 5000)
+        except (TypeError, ValueError):
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        closed = auction_service.close_auctions(listing_ids, limit)
+        return Response({'closed': closed, 'count': len(closed)})
+
+
+@require_GET
+def stream_updates(request):
+    """
+    SSE: GET /auctions/stream/?listing_ids=<id>,<id>... sends each listing's current
+    state, then every change. Plain Django view: DRF content negotiation would reject
+    EventSource's `Accept: text/event-stream`.
+    """
+    try:
+        listing_ids = [
+            str(uuid.UUID(i)) for i in request.GET.get('listing_ids', '').split(',') if i
+        ][:stream.MAX_STREAM_LISTINGS]
+    except ValueError:
+        return JsonResponse({'error': 'listing_ids must be UUIDs'}, status=400)
+    if not listing_ids:
+        return JsonResponse({'error': 'listing_ids required'}, status=400)
+
+    def load_initial():
+        snapshots = redis_state.read_snapshots(listing_ids)
+        for listing_id in listing_ids:
+            snapshot = snapshots.get(listing_id)
+            if snapshot is not None:
+                state = redis_state.state_from_snapshot(listing_id, snapshot)
+            else:
+                state = auction_service.get_state(listing_id)
+            if state:
+                yield stream.state_message(state)
+        # The stream itself never touches Postgres; don't hold a connection for its lifetime
+        connection.close()
+
+    events = stream.open_stream(listing_ids, load_initial)
+    if events is None:
+        # Every stream slot in this process is taken; EventSource retries after the delay
+        response = JsonResponse({'error': 'Too many open streams, retry later'}, status=503)
+        response['Retry-After'] = str(stream.RECONNECT_MS // 1000)
+        return response
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable proxy buffering (nginx) so events are flushed as they happen
+    response['X-Accel-Buffering'] = 'no'
+    return response
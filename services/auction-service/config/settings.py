@@ -28,6 +28,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'shared.middleware.EventBusMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -67,3 +68,7 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
+
+# Transactional outbox (shared/outbox.py): events are written with the change that
+# raised them and sent by `manage.py relay_outbox`, which must then be running
+OUTBOX_MODEL = 'auctions.OutboxEvent' if os.environ.get('EVENT_OUTBOX', 'false').lower() == 'true' else None
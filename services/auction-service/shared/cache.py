@@ -1,21 +1,279 @@
+import datetime
 import os
 import redis
-from pymemcache.client.base import Client as MemcachedClient
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from pymemcache.client.hash import HashClient
 import logging
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 logger = logging.getLogger(__name__)
 
+# Redis: one bounded pool per client per process. A caller waits up to REDIS_POOL_TIMEOUT
+# for a free connection; the read timeout must exceed the longest blocking command
+# (the bid sequencer's 15s BLPOP).
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', '100'))
+REDIS_POOL_TIMEOUT = float(os.environ.get('REDIS_POOL_TIMEOUT', '5'))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', '2'))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', '30'))
+# Memcached: MEMCACHED_URL lists one or more host:port nodes, comma separated; keys are
+# spread over them by rendezvous hashing, so adding a node only moves its share of keys.
+# The pool (per node) does not block when exhausted, so size it to the worker's threads.
+MEMCACHED_POOL_SIZE = int(os.environ.get('MEMCACHED_POOL_SIZE', '64'))
+MEMCACHED_CONNECT_TIMEOUT = float(os.environ.get('MEMCACHED_CONNECT_TIMEOUT', '0.5'))
+MEMCACHED_TIMEOUT = float(os.environ.get('MEMCACHED_TIMEOUT', '0.5'))
+# A node that keeps failing is skipped for this long before it is tried again
+MEMCACHED_DEAD_SECONDS = int(os.environ.get('MEMCACHED_DEAD_SECONDS', '30'))
+
+# In-process tier of get_or_compute: entry count bound and the default TTL. Other
+# workers only see a tag invalidation once their local copy expires, so keep it short.
+LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '10000'))
+LOCAL_TTL = float(os.environ.get('CACHE_LOCAL_TTL', '5'))
+# Single flight across processes: the first miss holds a fill lock while it computes;
+# other processes poll the shared tier for up to FILL_WAIT_SECONDS, then compute anyway
+FILL_LOCK_SECONDS = 10
+FILL_WAIT_SECONDS = 2.0
+FILL_POLL_SECONDS = 0.05
+
+TAG_KEY = 'cache:tag:{}'
+FILL_KEY = 'cache:fill:{}'
+
+# Value encoding of get_or_compute and the bulk operations (get_json/set_json stay JSON)
+SERIALIZER = os.environ.get('CACHE_SERIALIZER', 'json')
+
+
+def _encode_default(value):
+    """Types the encoders lack, rendered the way DRF renders them."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not cacheable")
+
+
+class JsonSerializer:
+    name = 'json'
+
+    def dumps(self, value):
+        return json.dumps(value, default=_encode_default, separators=(',', ':')).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """Same JSON as JsonSerializer, several times faster."""
+    name = 'orjson'
+
+    def dumps(self, value):
+        return orjson.dumps(value, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    """Compact binary encoding; values are not readable as JSON."""
+    name = 'msgpack'
+
+    def dumps(self, value):
+        return msgpack.packb(value, default=_encode_default, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+SERIALIZERS = {
+    'json': (JsonSerializer, json),
+    'orjson': (OrjsonSerializer, orjson),
+    'msgpack': (MsgpackSerializer, msgpack),
+}
+
+
+def get_serializer(name=SERIALIZER):
+    """The named serializer, or JSON when its library is not installed."""
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown cache serializer {name!r}; expected one of {', '.join(SERIALIZERS)}")
+    serializer_class, module = SERIALIZERS[name]
+    if module is None:
+        logger.warning(f"Cache serializer {name} is not installed; using json")
+        return JsonSerializer()
+    return serializer_class()
+
+
+class LocalCache:
+    """Bounded in-process LRU with per-entry expiry. Values are shared between callers: treat them as read-only."""
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tagged = {}  # tag -> keys
+        self.evictions = 0
+
+    def get(self, key):
+        """(True, value) on a live entry, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def delete_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+class RedisPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool that tracks connections in use, their peak, and callers that waited or gave up."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waits = 0
+        self.exhausted = 0
+
+    def get_connection(self, command_name, *keys, **options):
+        started = time.monotonic()
+        try:
+            connection = super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError:
+            if time.monotonic() - started >= self.timeout:
+                with self._stats_lock:
+                    self.exhausted += 1
+            raise
+        with self._stats_lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            # Anything but an immediate hand-out means the pool was empty
+            if time.monotonic() - started > 0.001:
+                self.waits += 1
+        return connection
+
+    def release(self, connection):
+        super().release(connection)
+        with self._stats_lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'max_connections': self.max_connections,
+                'created': len(self._connections),
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'waits': self.waits,
+                'exhausted': self.exhausted,
+            }
+
+
+def redis_client(url, **kwargs):
+    pool = RedisPool.from_url(
+        url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=30,
+        **kwargs,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def memcached_client(url):
+    servers = []
+    for node in url.split(','):
+        host, port = node.strip().rsplit(':', 1)
+        servers.append((host, int(port)))
+    return HashClient(
+        servers,
+        use_pooling=True,
+        max_pool_size=MEMCACHED_POOL_SIZE,
+        connect_timeout=MEMCACHED_CONNECT_TIMEOUT,
+        timeout=MEMCACHED_TIMEOUT,
+        retry_attempts=2,
+        retry_timeout=1,
+        dead_timeout=MEMCACHED_DEAD_SECONDS,
+    )
+
+
 class CacheService:
     def __init__(self):
         # Redis connection (for distributed locks, rate limits, auction state)
         self.redis_url = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
-        self.redis = redis.from_url(self.redis_url, decode_responses=True)
+        self.redis = redis_client(self.redis_url, decode_responses=True)
+        # Serialized values are bytes (msgpack is not UTF-8), so they use an undecoded client
+        self.redis_binary = redis_client(self.redis_url)
 
         # Memcached connection (for read-heavy caching)
-        memcached_url = os.environ.get('MEMCACHED_URL', 'memcached:11211')
-        host, port = memcached_url.split(':')
-        self.memcached = MemcachedClient((host, int(port)))
+        self.memcached = memcached_client(os.environ.get('MEMCACHED_URL', 'memcached:11211'))
+
+        self.serializer = get_serializer()
+
+        # Worker-memory tier in front of the two above (get_or_compute)
+        self.local = LocalCache()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        # Bumped by every invalidation, so a fill that raced one is not kept locally
+        self._generation = 0
+        self._counts_lock = threading.Lock()
+        self._counts = {'local_hits': 0, 'remote_hits': 0, 'misses': 0, 'fill_waits': 0, 'errors': 0}
 
     def get_redis_client(self):
         return self.redis
@@ -43,7 +301,7 @@ class CacheService:
                 data = self.memcached.get(key)
                 if data:
                     data = data.decode('utf-8')
-            
+
             if data:
                 return json.loads(data)
             return None
@@ -52,6 +310,8 @@ class CacheService:
             return None
 
     def delete(self, key, use_redis=True):
+        self.local.delete(key)
+        self._generation += 1
         try:
             if use_redis:
                 self.redis.delete(key)
@@ -60,4 +320,259 @@ class CacheService:
         except Exception as e:
             logger.error(f"Error deleting cache key {key}: {e}")
 
+    def get_many(self, keys, use_redis=False):
+        """
+        Values for keys in one round trip (Memcached multi-get or Redis MGET), as a dict
+        holding only the keys that were found. Reads what set_many/get_or_compute wrote.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            if use_redis:
+                found = {key: data for key, data in zip(keys, self.redis_binary.mget(keys)) if data is not None}
+            else:
+                found = self.memcached.get_many(keys)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error getting {len(keys)} cache keys: {e}")
+            return {}
+        values = {}
+        for key, data in found.items():
+            try:
+                values[key] = self.serializer.loads(data)
+            except Exception:
+                # Written by another serializer (e.g. during a CACHE_SERIALIZER change): a miss
+                pass
+        return values
+
+    def set_many(self, mapping, ttl=None, use_redis=False):
+        """Store every key -> value of mapping in one round trip (Memcached set_many or a Redis pipeline)."""
+        if not mapping:
+            return
+        try:
+            encoded = {key: self.serializer.dumps(value) for key, value in mapping.items()}
+            if use_redis:
+                pipe = self.redis_binary.pipeline(transaction=False)
+                for key, data in encoded.items():
+                    pipe.set(key, data, ex=ttl)
+                pipe.execute()
+            else:
+                failed = self.memcached.set_many(encoded, expire=ttl or 0)
+                if failed:
+                    logger.error(f"Error setting {len(failed)} of {len(encoded)} cache keys")
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error setting {len(mapping)} cache keys: {e}")
+
+    def delete_many(self, keys, use_redis=False):
+        keys = list(keys)
+        if not keys:
+            return
+        for key in keys:
+            self.local.delete(key)
+        self._generation += 1
+        try:
+            if use_redis:
+                self.redis.delete(*keys)
+            else:
+                self.memcached.delete_many(keys)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error deleting {len(keys)} cache keys: {e}")
+
+    def get_or_compute(self, key, compute, ttl=300, local_ttl=LOCAL_TTL, tags=(), use_redis=False):
+        """
+        Return the cached value for key, calling compute() on a miss. The value comes back
+        as the serializer decodes it (datetimes, UUIDs and Decimals as strings), hit or
+        miss. Reads go worker memory -> Memcached (or Redis with use_redis=True) -> compute;
+        only one caller per key computes at a time, in this process and across processes,
+        and the others get its result.
+
+        tags name what the value was built from; invalidate_tags() drops every entry
+        carrying one of them. local_ttl bounds how long other workers may keep serving
+        an invalidated value from memory (0 skips the local tier).
+        """
+        found, value = self.local.get(key)
+        if found:
+            self._count('local_hits')
+            return value
+
+        with self._flight(key):
+            # Another thread may have filled it while we waited for the flight
+            found, value = self.local.get(key)
+            if found:
+                self._count('local_hits')
+                return value
+            generation = self._generation
+            versions = self._tag_versions(tags)
+            found, value = self._remote_get(key, versions, use_redis)
+            if found:
+                self._count('remote_hits')
+            else:
+                found, value = self._fill(key, compute, ttl, versions, use_redis)
+            if local_ttl and generation == self._generation:
+                self.local.set(key, value, min(local_ttl, ttl), tags)
+            return value
+
+    def invalidate_tags(self, *tags):
+        """Drop every get_or_compute entry tagged with any of tags."""
+        if not tags:
+            return
+        self.local.delete_tags(tags)
+        self._generation += 1
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(TAG_KEY.format(tag))
+            pipe.execute()
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error invalidating cache tags {tags}: {e}")
+
+    def stats(self):
+        """Hit/miss counters of get_or_compute since the process started."""
+        with self._counts_lock:
+            counts = dict(self._counts)
+        lookups = counts['local_hits'] + counts['remote_hits'] + counts['misses']
+        counts['hit_ratio'] = round((counts['local_hits'] + counts['remote_hits']) / lookups, 4) if lookups else None
+        counts['local_entries'] = len(self.local)
+        counts['local_evictions'] = self.local.evictions
+        return counts
+
+    def pool_stats(self):
+        """Connection pool saturation of both Redis clients and every Memcached node."""
+        nodes = {}
+        for name, client in self.memcached.clients.items():
+            pool = client.client_pool
+            nodes[name] = {
+                'max_size': pool.max_size,
+                'in_use': len(pool.used),
+                'idle': len(pool.free),
+                'failing': client.server in self.memcached._failed_clients,
+                'dead': client.server in self.memcached._dead_clients,
+            }
+        return {
+            'redis': self.redis.connection_pool.stats(),
+            'redis_binary': self.redis_binary.connection_pool.stats(),
+            'memcached': nodes,
+        }
+
+    def _count(self, key):
+        with self._counts_lock:
+            self._counts[key] += 1
+
+    def _flight(self, key):
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(self._flights, self._flights_lock, key)
+            flight.waiters += 1
+        return flight
+
+    def _tag_versions(self, tags):
+        if not tags:
+            return {}
+        try:
+            values = self.redis.mget([TAG_KEY.format(tag) for tag in tags])
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error reading cache tags {tags}: {e}")
+            return None
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def _remote_get(self, key, versions, use_redis):
+        if versions is None:
+            return False, None
+        try:
+            data = self.redis_binary.get(key) if use_redis else self.memcached.get(key)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error getting cache key {key}: {e}")
+            return False, None
+        if not data:
+            return False, None
+        try:
+            entry = self.serializer.loads(data)
+        except Exception:
+            return False, None
+        # Written by set()/set_many()/set_json() rather than get_or_compute(): not an entry
+        if not isinstance(entry, dict) or 't' not in entry or 'v' not in entry:
+            return False, None
+        # Stored under older tag versions: invalidated since
+        if entry['t'] != versions:
+            return False, None
+        return True, entry['v']
+
+    def _remote_set(self, key, value, ttl, versions, use_redis):
+        """Store value and return it as a later read will see it (UUIDs, Decimals, ... as strings)."""
+        try:
+            data = self.serializer.dumps({'v': value, 't': versions or {}})
+            if versions is not None:
+                if use_redis:
+                    self.redis_binary.set(key, data, ex=ttl)
+                else:
+                    self.memcached.set(key, data, expire=ttl)
+            return self.serializer.loads(data)['v']
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error setting cache key {key}: {e}")
+            return value
+
+    def _fill(self, key, compute, ttl, versions, use_redis):
+        token = uuid.uuid4().hex
+        fill_key = FILL_KEY.format(key)
+        try:
+            holder = self.redis.set(fill_key, token, nx=True, ex=FILL_LOCK_SECONDS)
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Error taking cache fill lock for {key}: {e}")
+            holder = True
+        if not holder:
+            # Another process is computing it; wait for its result
+            self._count('fill_waits')
+            deadline = time.monotonic() + FILL_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(FILL_POLL_SECONDS)
+                found, value = self._remote_get(key, versions, use_redis)
+                if found:
+                    self._count('remote_hits')
+                    return True, value
+
+        self._count('misses')
+        try:
+            value = self._remote_set(key, compute(), ttl, versions, use_redis)
+        finally:
+            if holder:
+                try:
+                    # Only release the lock if it is still ours
+                    if self.redis.get(fill_key) == token:
+                        self.redis.delete(fill_key)
+                except Exception:
+                    pass
+        return True, value
+
+
+class _Flight:
+    """Per-key in-process lock; removed from the registry once its last waiter leaves."""
+
+    def __init__(self, registry, registry_lock, key):
+        self._registry = registry
+        self._registry_lock = registry_lock
+        self._key = key
+        self._lock = threading.Lock()
+        self.waiters = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        with self._registry_lock:
+            self.waiters -= 1
+            if self.waiters == 0:
+                self._registry.pop(self._key, None)
+
+
 cache = CacheService()
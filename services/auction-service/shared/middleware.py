@@ -1,6 +1,7 @@
 import uuid
 import logging
 import time
+from shared.event_bus import event_bus
 
 logger = logging.getLogger('dbay.request')
 
@@ -34,3 +35,13 @@ class LoggingMiddleware:
         logger.info(f"Response: {response.status_code} Duration: {duration:.4f}s ID: {getattr(request, 'request_id', 'unknown')}")
         
         return response
+
+class EventBusMiddleware:
+    """Sends the events published while handling a request together, once it is handled."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with event_bus.batch():
+            return self.get_response(request)
@@ -1,20 +1,54 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from shared.cache import cache
 from .models import Category, CategoryItem
 from .serializers import CategorySerializer, CategoryWithItemsSerializer, CategoryItemSerializer
 
+# Category reads are served by the tiered cache; every write below invalidates this tag
+CATEGORIES_TAG = "categories"
+CATEGORIES_TTL = 3600
+
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = []
 
+    def list(self, request, *args, **kwargs):
+        data = cache.get_or_compute(
+            "categories:list",
+            lambda: list(CategorySerializer(self.get_queryset(), many=True).data),
+            ttl=CATEGORIES_TTL,
+            tags=[CATEGORIES_TAG],
+        )
+        return Response(data)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        cache.invalidate_tags(CATEGORIES_TAG)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        cache.invalidate_tags(CATEGORIES_TAG)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        cache.invalidate_tags(CATEGORIES_TAG)
+
     @action(detail=False, url_path="with-items", methods=["get"])
     def with_items(self, request):
-        qs = Category.objects.prefetch_related("items").order_by("sort_order", "path")
-        serializer = CategoryWithItemsSerializer(qs, many=True)
-        return Response(serializer.data)
+        def compute():
+            qs = Category.objects.prefetch_related("items").order_by("sort_order", "path")
+            return list(CategoryWithItemsSerializer(qs, many=True).data)
+
+        data = cache.get_or_compute("categories:with-items", compute, ttl=CATEGORIES_TTL, tags=[CATEGORIES_TAG])
+        return Response(data)
+
+    @action(detail=False, url_path="cache-stats", methods=["get"])
+    def cache_stats(self, request):
+        # Internal: tiered cache hit ratio and Redis/Memcached pool saturation
+        return Response({"lookups": cache.stats(), "pools": cache.pool_stats()})
 
     @action(detail=True, url_path="items", methods=["get", "post"])
     def items_list(self, request, pk=None):
@@ -26,6 +60,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         ser = CategoryItemSerializer(data={**request.data, "category": category.id})
         ser.is_valid(raise_exception=True)
         ser.save(category=category)
+        cache.invalidate_tags(CATEGORIES_TAG)
         return Response(ser.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, url_path="items/(?P<item_pk>[^/.]+)", methods=["get", "put", "patch", "delete"])
@@ -38,10 +73,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return Response(CategoryItemSerializer(item).data)
         if request.method == "DELETE":
             item.delete()
+            cache.invalidate_tags(CATEGORIES_TAG)
             return Response(status=status.HTTP_204_NO_CONTENT)
         # PUT/PATCH
         partial = request.method == "PATCH"
         ser = CategoryItemSerializer(item, data=request.data, partial=partial)
         ser.is_valid(raise_exception=True)
         ser.save()
+        cache.invalidate_tags(CATEGORIES_TAG)
         return Response(ser.data)
@@ -32,6 +32,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'shared.middleware.RequestIDMiddleware',
     'shared.middleware.LoggingMiddleware',
+    'shared.middleware.EventBusMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -81,3 +82,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',  # Per-view overrides (e.g. IsAuthenticatedOrReadOnly)
     ],
 }
+
+# Transactional outbox (shared/outbox.py): events are written with the change that
+# raised them and sent by `manage.py relay_outbox`, which must then be running
+OUTBOX_MODEL = 'listings.OutboxEvent' if os.environ.get('EVENT_OUTBOX', 'false').lower() == 'true' else None
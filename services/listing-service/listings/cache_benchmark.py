@@ -0,0 +1,109 @@
+"""
+Cache serializer and bulk-read benchmark (`python manage.py bench_cache`).
+
+Encodes real payloads from the configured database with every installed cache
+serializer (shared/cache.py) and reports encoded size and encode/decode time per item:
+
+    listing_cards   ListingSerializer output (with images), as the grids render it
+    listing_rows    Listing.objects.values() rows: UUID, Decimal and datetime values
+    category_tree   the categories with-items response, as one value
+
+It then stores one grid of listing cards in Memcached and Redis under bench:cache:
+keys and compares a get per key with one get_many, so the round trips saved can be
+read off directly. The keys are deleted afterwards.
+"""
+import time
+
+from categories.models import Category
+from categories.serializers import CategoryWithItemsSerializer
+from shared.cache import SERIALIZERS, cache, get_serializer
+from .models import Listing
+from .serializers import ListingSerializer
+
+KEY_PREFIX = 'bench:cache:'
+
+
+def payloads(sample=200):
+    listings = list(Listing.objects.prefetch_related('images').order_by('-created_at')[:sample])
+    if not listings:
+        raise ValueError("No listings to sample; seed the database first (manage.py seed_data)")
+    tree = Category.objects.prefetch_related('items').order_by('sort_order', 'path')
+    return {
+        'listing_cards': [dict(card) for card in ListingSerializer(listings, many=True).data],
+        'listing_rows': list(Listing.objects.filter(id__in=[listing.id for listing in listings]).values()),
+        'category_tree': [list(CategoryWithItemsSerializer(tree, many=True).data)],
+    }
+
+
+def _per_item_us(fn, items, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    return round((time.perf_counter() - started) / (repeat * len(items)) * 1e6, 2)
+
+
+def serializer_results(samples, repeat=20):
+    results = {}
+    for name, (serializer_class, module) in SERIALIZERS.items():
+        if module is None:
+            results[name] = 'not installed'
+            continue
+        serializer = serializer_class()
+        results[name] = {}
+        for kind, items in samples.items():
+            encoded = [serializer.dumps(item) for item in items]
+            results[name][kind] = {
+                'bytes_avg': round(sum(len(data) for data in encoded) / len(encoded)),
+                'dumps_us': _per_item_us(serializer.dumps, items, repeat),
+                'loads_us': _per_item_us(serializer.loads, encoded, repeat),
+            }
+    return results
+
+
+def round_trip_results(cards, keys=50, repeat=20):
+    """Reading `keys` cached listing cards one get at a time vs one get_many, per backend."""
+    grid = {f"{KEY_PREFIX}{index}": cards[index % len(cards)] for index in range(keys)}
+    results = {}
+    for backend, use_redis in (('memcached', False), ('redis', True)):
+        try:
+            cache.set_many(grid, ttl=300, use_redis=use_redis)
+            if len(cache.get_many(grid, use_redis=use_redis)) != keys:
+                results[backend] = 'unavailable'
+                continue
+            client = cache.redis_binary if use_redis else cache.memcached
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for key in grid:
+                    cache.serializer.loads(client.get(key))
+            single_ms = (time.perf_counter() - started) / repeat * 1000
+            started = time.perf_counter()
+            for _ in range(repeat):
+                cache.get_many(grid, use_redis=use_redis)
+            many_ms = (time.perf_counter() - started) / repeat * 1000
+            results[backend] = {
+                'keys': keys,
+                'get_each_ms': round(single_ms, 3),
+                'get_many_ms': round(many_ms, 3),
+                'speedup': round(single_ms / many_ms, 1) if many_ms else None,
+            }
+        finally:
+            cache.delete_many(grid, use_redis=use_redis)
+    return results
+
+
+def run(sample=200, repeat=20, keys=50, serializer=None):
+    """Run the benchmark and return its result as a dict."""
+    samples = payloads(sample)
+    saved = cache.serializer
+    if serializer:
+        cache.serializer = get_serializer(serializer)
+    try:
+        round_trips = round_trip_results(samples['listing_cards'], keys, repeat)
+    finally:
+        cache.serializer = saved
+    return {
+        'sample': {kind: len(items) for kind, items in samples.items()},
+        'serializers': serializer_results(samples, repeat),
+        'round_trips': {'serializer': serializer or saved.name, **round_trips},
+    }
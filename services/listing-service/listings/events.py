@@ -0,0 +1,49 @@
+from shared.event_bus import event_bus
+
+SOURCE = 'dbay.listing-service'
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _price(value):
+    return str(value) if value is not None else None
+
+
+def listing_detail(listing):
+    """Event payload; a superset of the search index document plus the fields auction-service needs."""
+    return {
+        'id': str(listing.id),
+        'seller_id': str(listing.seller_id),
+        'title': listing.title,
+        'description': listing.description or '',
+        'category_id': str(listing.category_id),
+        'listing_type': listing.listing_type,
+        'starting_price': _price(listing.starting_price),
+        'current_price': _price(listing.current_price),
+        'status': listing.status,
+        'start_time': _iso(listing.start_time),
+        'end_time': _iso(listing.end_time),
+        'created_at': _iso(listing.created_at),
+        'images': [
+            {
+                'url_thumb': img.url_thumb,
+                'url_medium': img.url_medium,
+                'url_large': img.url_large,
+            }
+            for img in listing.images.all().order_by('sort_order')
+        ],
+    }
+
+
+def publish_listing_created(listing):
+    return event_bus.publish(SOURCE, 'listing.created', listing_detail(listing))
+
+
+def publish_listing_updated(listing):
+    return event_bus.publish(SOURCE, 'listing.updated', listing_detail(listing))
+
+
+def publish_listing_deleted(listing_id):
+    return event_bus.publish(SOURCE, 'listing.deleted', {'id': str(listing_id)})
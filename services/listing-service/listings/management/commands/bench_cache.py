@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from listings import cache_benchmark
+from shared.cache import SERIALIZERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cache serializers on sampled listings and categories, and get vs get_many "
+        "against Memcached and Redis. Prints JSON results."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sample", type=int, default=200, help="Listings to sample")
+        parser.add_argument("--repeat", type=int, default=20, help="Passes over the sample per measurement")
+        parser.add_argument("--keys", type=int, default=50, help="Keys per bulk read (one listing grid)")
+        parser.add_argument("--serializer", choices=list(SERIALIZERS),
+                            help="Serializer for the round-trip test (default: CACHE_SERIALIZER)")
+        parser.add_argument("--output", help="Also write the JSON result to this file")
+
+    def handle(self, *args, **options):
+        result = cache_benchmark.run(
+            sample=options["sample"],
+            repeat=options["repeat"],
+            keys=options["keys"],
+            serializer=options["serializer"],
+        )
+        output = json.dumps(result, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
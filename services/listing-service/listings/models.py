@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from categories.models import Category
+from shared.outbox import OutboxEventBase
 
 class Listing(models.Model):
     CONDITION_CHOICES = [
@@ -90,3 +91,6 @@ class Watchlist(models.Model):
 
     class Meta:
         unique_together = ('user_id', 'listing')
+
+class OutboxEvent(OutboxEventBase):
+    """Events waiting for relay_outbox (see shared/outbox.py)."""
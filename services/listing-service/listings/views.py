@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from .models import Listing, ListingImage, Watchlist
 from .serializers import ListingSerializer, ListingImageSerializer, WatchlistSerializer
+from . import events
 import boto3
 import os
 import uuid
@@ -16,7 +17,17 @@ class ListingViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def perform_create(self, serializer):
-        serializer.save(seller_id=self.request.user.id)
+        listing = serializer.save(seller_id=self.request.user.id)
+        events.publish_listing_created(listing)
+
+    def perform_update(self, serializer):
+        listing = serializer.save()
+        events.publish_listing_updated(listing)
+
+    def perform_destroy(self, instance):
+        listing_id = instance.id
+        instance.delete()
+        events.publish_listing_deleted(listing_id)
 
     @action(detail=True, methods=['post'], url_path='images/presigned-url')
     def get_presigned_url(self, request, pk=None):
@@ -0,0 +1,204 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '1'))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '5'))
+# Total time one call may take, retries and backoff included
+TIMEOUT_BUDGET = float(os.environ.get('HTTP_TIMEOUT_BUDGET', '10'))
+RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+BACKOFF = float(os.environ.get('HTTP_BACKOFF', '0.05'))
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '20'))
+BREAKER_THRESHOLD = int(os.environ.get('HTTP_BREAKER_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = float(os.environ.get('HTTP_BREAKER_RESET', '10'))
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+LATENCY_WINDOW = 1024
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without calling the target while its breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures (connection errors, timeouts, 5xx) and
+    fails fast for `reset_seconds`; then lets one trial call through (half-open), which
+    closes it again on success or re-opens it on failure.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ServiceClient:
+    """
+    Client for one target service: a pooled keep-alive Session, a default timeout,
+    retries with full jitter for idempotent calls and a circuit breaker.
+
+    POSTs are only retried when the caller passes idempotent=True (e.g. calls that
+    carry an operation id the target deduplicates on).
+    """
+
+    def __init__(self, name, base_url, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 budget=TIMEOUT_BUDGET, retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE,
+                 breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.budget = budget
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {'ok': 0, 'errors': 0, 'server_errors': 0, 'retries': 0, 'short_circuited': 0}
+
+    def _count(self, key, latency=None):
+        with self._stats_lock:
+            self._counts[key] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def request(self, method, path, idempotent=None, timeout=None, budget=None, **kwargs):
+        """
+        Send a request to `path` on this service and return the Response (any status).
+        Raises CircuitOpenError while the breaker is open, or the last
+        requests.RequestException once retries or the timeout budget are exhausted.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = 1 + self.retries
+        connect_timeout, read_timeout = timeout or self.timeout
+        deadline = time.monotonic() + (budget or self.budget)
+        url = f"{self.base_url}/{path.lstrip('/')}" if path else self.base_url
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._count('short_circuited')
+                raise CircuitOpenError(f"{self.name}: circuit open, not calling {method} {path}")
+            remaining = deadline - time.monotonic()
+            started = time.monotonic()
+            try:
+                response = self.session.request(
+                    method, url, timeout=(connect_timeout, max(0.1, min(read_timeout, remaining))), **kwargs
+                )
+            except requests.RequestException as e:
+                self._count('errors', time.monotonic() - started)
+                self.breaker.record_failure()
+                # A connect timeout means the request was never sent, so any call may retry it
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not (retryable and self._retry(attempt, attempts, deadline)):
+                    logger.error(f"{self.name}: {method} {path} failed: {e}")
+                    raise
+                continue
+
+            if response.status_code >= 500:
+                self._count('server_errors', time.monotonic() - started)
+                self.breaker.record_failure()
+                if idempotent and response.status_code in RETRY_STATUSES and self._retry(attempt, attempts, deadline):
+                    continue
+            else:
+                self._count('ok', time.monotonic() - started)
+                self.breaker.record_success()
+            return response
+
+    def _retry(self, attempt, attempts, deadline):
+        if attempt + 1 >= attempts:
+            return False
+        # Full jitter, so callers that failed together do not retry together
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return False
+        self._count('retries')
+        time.sleep(delay)
+        return True
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def metrics(self):
+        with self._stats_lock:
+            counts = dict(self._counts)
+            ordered = sorted(self._latencies)
+        latency = None
+        if ordered:
+            latency = {
+                f'p{p}': round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000, 2)
+                for p in (50, 95, 99)
+            }
+            latency['max'] = round(ordered[-1] * 1000, 2)
+        return {'base_url': self.base_url, 'breaker': self.breaker.state, **counts, 'latency_ms': latency}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def service_client(name, base_url, **options):
+    """The process-wide client for a target service, created on first use."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = ServiceClient(name, base_url, **options)
+        return _clients[name]
+
+
+def metrics():
+    """Counters, breaker state and latency percentiles (last LATENCY_WINDOW calls) per target."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.metrics() for client in clients}
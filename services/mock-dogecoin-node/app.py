@@ -7,7 +7,48 @@ app = Flask(__name__)
 
 # Mocked transactions (sendtoaddress and listtransactions)
 transactions = []
-blocks = []
+# Mocked chain for listsinceblock: {"hash", "height", "txids"}. Each sendtoaddress mines its own
+# block unless MOCK_AUTOMINE=false, in which case it waits in the mempool until `generate`.
+GENESIS_HASH = "0" * 64
+blocks = [{"hash": GENESIS_HASH, "height": 0, "txids": []}]
+mempool = []
+AUTOMINE = os.environ.get('MOCK_AUTOMINE', 'true').lower() != 'false'
+
+
+def _mine(count=1):
+    for _ in range(count):
+        blocks.append({"hash": uuid.uuid4().hex * 2, "height": len(blocks), "txids": list(mempool)})
+        mempool.clear()
+    return [block["hash"] for block in blocks[-count:]] if count else []
+
+
+def _receive_entry(t, block=None):
+    entry = {
+        "txid": t["txid"],
+        "address": t["address"],
+        "amount": t["amount"],
+        "category": "receive",
+        "confirmations": len(blocks) - block["height"] if block else 0,
+    }
+    if block:
+        entry["blockhash"] = block["hash"]
+    return entry
+
+
+def _list_since_block(blockhash, target_confirmations):
+    # Txs in blocks after blockhash, plus the mempool; lastblock trails the tip by target_confirmations - 1
+    start = 0
+    for block in blocks:
+        if block["hash"] == blockhash:
+            start = block["height"] + 1
+            break
+    by_txid = {t["txid"]: t for t in transactions if t.get("address")}
+    out = []
+    for block in blocks[start:]:
+        out.extend(_receive_entry(by_txid[txid], block) for txid in block["txids"] if txid in by_txid)
+    out.extend(_receive_entry(by_txid[txid]) for txid in mempool if txid in by_txid)
+    last = blocks[max(0, len(blocks) - max(1, target_confirmations))]
+    return {"transactions": out, "removed": [], "lastblock": last["hash"]}
 
 
 @app.route('/', methods=['POST'])
@@ -22,8 +63,32 @@ def rpc():
     if method == 'sendtoaddress':
         txid = uuid.uuid4().hex
         transactions.append({"txid": txid, "amount": params[1], "address": params[0]})
+        mempool.append(txid)
+        if AUTOMINE:
+            _mine()
         return jsonify({"result": txid, "error": None, "id": data.get('id')})
 
+    if method == 'listsinceblock':
+        # [blockhash, target_confirmations]. MOCK_LISTTRANSACTIONS_JSON, if set, is returned as the transactions.
+        raw = os.environ.get('MOCK_LISTTRANSACTIONS_JSON')
+        if raw:
+            try:
+                result = {"transactions": json.loads(raw), "removed": [], "lastblock": blocks[-1]["hash"]}
+                return jsonify({"result": result, "error": None, "id": data.get('id')})
+            except json.JSONDecodeError:
+                pass
+        blockhash = params[0] if params else ""
+        target_confirmations = int(params[1]) if len(params) > 1 else 1
+        return jsonify({"result": _list_since_block(blockhash, target_confirmations), "error": None, "id": data.get('id')})
+
+    if method == 'getbestblockhash':
+        return jsonify({"result": blocks[-1]["hash"], "error": None, "id": data.get('id')})
+
+    if method in ('generate', 'generatetoaddress'):
+        # Mine the mempool into the first block, then empty blocks
+        count = int(params[0]) if params else 1
+        return jsonify({"result": _mine(count), "error": None, "id": data.get('id')})
+
     if method == 'listtransactions':
         # Return receives for deposit watcher. Optional: MOCK_LISTTRANSACTIONS_JSON env for fixed list.
         raw = os.environ.get('MOCK_LISTTRANSACTIONS_JSON')
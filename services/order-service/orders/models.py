@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from shared.outbox import OutboxEventBase
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -56,3 +57,6 @@ class Dispute(models.Model):
     resolution_notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+class OutboxEvent(OutboxEventBase):
+    """Events waiting for relay_outbox (see shared/outbox.py)."""
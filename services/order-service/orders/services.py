@@ -1,10 +1,10 @@
 import logging
 import os
-import requests
 from decimal import Decimal
 from django.utils import timezone
 from django.db import transaction
 from shared.event_bus import event_bus
+from shared.http import service_client
 from .models import Order, Dispute
 
 logger = logging.getLogger(__name__)
@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 WALLET_SERVICE_URL = os.environ.get('WALLET_SERVICE_URL', 'http://wallet-service:8003')
 LISTING_SERVICE_URL = os.environ.get('LISTING_SERVICE_URL', 'http://listing-service:8001')
 
+wallet_client = service_client('wallet-service', WALLET_SERVICE_URL)
+listing_client = service_client('listing-service', LISTING_SERVICE_URL)
+
 class OrderService:
     def create_order(self, listing_id, buyer_id, seller_id, order_type, amount, fee_amount=0):
         # Calculate shipping? Assume passed or calculated from listing
@@ -87,7 +90,8 @@ class OrderService:
     def release_escrow(self, order_id):
         # Call Wallet Service
         try:
-            response = requests.post(f"{WALLET_SERVICE_URL}/api/v1/wallet/internal/release-escrow", json={
+            # Releasing an already released escrow is a no-op, so this may be retried
+            response = wallet_client.post("/api/v1/wallet/internal/release-escrow", idempotent=True, json={
                 "order_id": str(order_id)
             })
             if response.status_code != 200:
@@ -98,7 +102,7 @@ class OrderService:
 
     def purchase_listing(self, listing_id, buyer_id):
         # 1. Get Listing
-        resp = requests.get(f"{LISTING_SERVICE_URL}/api/v1/listings/{listing_id}/")
+        resp = listing_client.get(f"/api/v1/listings/{listing_id}/")
         listing = resp.json()
         
         if listing['status'] != 'ACTIVE':
@@ -128,7 +132,7 @@ class OrderService:
              # Let's just use `wallet-service` endpoint `pay_order` which does:
              # Debit Buyer Available -> Credit Escrow (Locked)
              
-             response = requests.post(f"{WALLET_SERVICE_URL}/api/v1/wallet/internal/pay-order", json={
+             response = wallet_client.post("/api/v1/wallet/internal/pay-order", json={
                  "buyer_id": str(buyer_id),
                  "seller_id": str(seller_id),
                  "amount": str(amount),
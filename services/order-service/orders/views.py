@@ -1,6 +1,8 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from shared import http
+from shared.cache import cache
 from .models import Order, Dispute
 from .serializers import OrderSerializer, DisputeSerializer
 from .services import order_service
@@ -81,3 +83,13 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response(OrderSerializer(order).data)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'], url_path='internal/http-client-stats')
+    def http_client_stats(self, request):
+        # Per-target latency, errors and breaker state of outgoing service calls
+        return Response(http.metrics())
+
+    @action(detail=False, methods=['get'], url_path='internal/cache-stats')
+    def cache_stats(self, request):
+        # Tiered cache hit ratio and Redis/Memcached pool saturation
+        return Response({'lookups': cache.stats(), 'pools': cache.pool_stats()})
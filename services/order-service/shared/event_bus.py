@@ -1,39 +1,165 @@
+import atexit
 import boto3
 import json
 import os
 import logging
+import queue
+import threading
+from contextlib import contextmanager
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
+# PutEvents accepts at most 10 entries per call
+MAX_ENTRIES_PER_CALL = 10
+
 class EventBus:
     def __init__(self):
-        self.client = boto3.client('events', 
+        self.client = boto3.client('events',
             endpoint_url=os.environ.get('AWS_ENDPOINT_URL'),
             region_name=os.environ.get('AWS_REGION', 'us-east-1')
         )
         self.bus_name = os.environ.get('EVENT_BUS_NAME', 'dbay-events')
+        # Hand batches to a background sender instead of sending on the publishing thread
+        self.background = os.environ.get('EVENT_BUS_BACKGROUND_FLUSH', 'false').lower() == 'true'
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._sender = None
+        self._sender_lock = threading.Lock()
+        self._outbox = None
 
     def publish(self, source, detail_type, detail):
         """
-        Publish an event to EventBridge
+        Publish an event to EventBridge.
+
+        With an outbox configured (settings.OUTBOX_MODEL, see shared/outbox.py) the event
+        is written to it in the current transaction and sent later by the relay.
+        Otherwise, inside a transaction the event is held until it commits and dropped if
+        it rolls back, and inside a batch() scope (every request, via EventBusMiddleware)
+        it is sent with the scope's other events when the scope ends, up to 10 per
+        PutEvents call. Returns True once the event is queued (outbox, transaction, batch
+        scope or background sender) or sent; False if sending it right away failed.
         """
-        try:
-            response = self.client.put_events(
-                Entries=[
-                    {
-                        'Source': source,
-                        'DetailType': detail_type,
-                        'Detail': json.dumps(detail),
-                        'EventBusName': self.bus_name
-                    }
-                ]
+        outbox = self.outbox_model()
+        if outbox is not None:
+            outbox.objects.create(source=source, detail_type=detail_type, detail=json.dumps(detail))
+            return True
+        entry = self.entry(source, detail_type, json.dumps(detail))
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._add(entry))
+            return True
+        return self._add(entry)
+
+    def publish_many(self, source, detail_type, details):
+        """publish() for many events of one type; with an outbox, one bulk INSERT. False if any send failed."""
+        outbox = self.outbox_model()
+        if outbox is not None:
+            outbox.objects.bulk_create(
+                [outbox(source=source, detail_type=detail_type, detail=json.dumps(detail)) for detail in details],
+                batch_size=1000,
             )
-            if response['FailedEntryCount'] > 0:
-                logger.error(f"Failed to publish event: {response}")
-                return False
             return True
-        except Exception as e:
-            logger.error(f"Error publishing event: {e}")
-            return False
+        entries = [self.entry(source, detail_type, json.dumps(detail)) for detail in details]
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: [self._add(entry) for entry in entries])
+            return True
+        return all([self._add(entry) for entry in entries])
+
+    def entry(self, source, detail_type, detail_json):
+        return {
+            'Source': source,
+            'DetailType': detail_type,
+            'Detail': detail_json,
+            'EventBusName': self.bus_name
+        }
+
+    def outbox_model(self):
+        if self._outbox is None and getattr(settings, 'OUTBOX_MODEL', None):
+            self._outbox = apps.get_model(settings.OUTBOX_MODEL)
+        return self._outbox
+
+    @contextmanager
+    def batch(self):
+        """Collect the events published (and committed) in this block and send them together at its end."""
+        outermost = getattr(self._local, 'buffer', None) is None
+        if outermost:
+            self._local.buffer = []
+        try:
+            yield
+        finally:
+            if outermost:
+                entries, self._local.buffer = self._local.buffer, None
+                self._dispatch(entries)
+
+    def flush(self):
+        """Wait until the background sender has sent everything queued so far."""
+        if self._sender is not None:
+            self._queue.join()
+
+    def _add(self, entry):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            buffer.append(entry)
+            return True
+        return self._dispatch([entry])
+
+    def _dispatch(self, entries):
+        """Send entries now, or queue them for the background sender; False if sending them failed."""
+        if not entries:
+            return True
+        if not self.background:
+            try:
+                return not any(self.send(entries))
+            except Exception as e:
+                logger.error(f"Error publishing {len(entries)} event(s): {e}")
+                return False
+        with self._sender_lock:
+            if self._sender is None:
+                self._sender = threading.Thread(target=self._run_sender, name='event-bus-sender', daemon=True)
+                self._sender.start()
+                atexit.register(self._drain)
+        self._queue.put(entries)
+        return True
+
+    def _run_sender(self):
+        while True:
+            entries = self._queue.get()
+            try:
+                self.send(entries)
+            finally:
+                self._queue.task_done()
+
+    def _drain(self):
+        # Process exit: send what the daemon sender has not picked up yet
+        while True:
+            try:
+                entries = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self.send(entries)
+            self._queue.task_done()
+
+    def send(self, entries):
+        """PutEvents in calls of up to 10 entries; returns each entry's error, None once accepted."""
+        errors = []
+        for start in range(0, len(entries), MAX_ENTRIES_PER_CALL):
+            chunk = entries[start:start + MAX_ENTRIES_PER_CALL]
+            try:
+                response = self.client.put_events(Entries=chunk)
+            except Exception as e:
+                logger.error(f"Error publishing {len(chunk)} event(s): {e}")
+                errors.extend([str(e)] * len(chunk))
+                continue
+            results = [
+                f"{result['ErrorCode']}: {result.get('ErrorMessage', '')}" if result.get('ErrorCode') else None
+                for result in response['Entries']
+            ]
+            if response['FailedEntryCount'] > 0:
+                failed = [(entry['DetailType'], error) for entry, error in zip(chunk, results) if error]
+                logger.error(f"Failed to publish {len(failed)} event(s): {failed}")
+            errors.extend(results)
+        return errors
 
 event_bus = EventBus()
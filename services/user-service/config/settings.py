@@ -31,6 +31,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'shared.middleware.RequestIDMiddleware',
     'shared.middleware.LoggingMiddleware',
+    'shared.middleware.EventBusMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -7,9 +7,21 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
+from shared.cache import cache
 from .models import User, UserAddress
 from .serializers import UserSerializer, UserAddressSerializer, PublicUserSerializer
 
+PUBLIC_PROFILE_TTL = 300
+
+
+def profile_tag(user_id):
+    return f"user:{user_id}"
+
+
+def invalidate_profile(user):
+    """Call after any change to a field PublicUserSerializer exposes."""
+    cache.invalidate_tags(profile_tag(user.id))
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -135,10 +147,34 @@ class UserViewSet(viewsets.ModelViewSet):
         return UserSerializer
 
     def get_permissions(self):
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'cache_stats'):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    def retrieve(self, request, *args, **kwargs):
+        # Public profiles are read on every listing and bid history; serve them from the tiered cache
+        user_id = kwargs[self.lookup_field]
+        data = cache.get_or_compute(
+            f"user:public:{user_id}",
+            lambda: dict(PublicUserSerializer(self.get_object()).data),
+            ttl=PUBLIC_PROFILE_TTL,
+            tags=[profile_tag(user_id)],
+        )
+        return Response(data)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_profile(serializer.instance)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_profile(instance)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        # Internal: tiered cache hit ratio and Redis/Memcached pool saturation
+        return Response({'lookups': cache.stats(), 'pools': cache.pool_stats()})
+
     @action(detail=False, methods=['get', 'put', 'patch'], url_path='me')
     def me(self, request):
         user = self._get_me_user(request)
@@ -153,6 +189,7 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(user, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            invalidate_profile(user)
             return Response(serializer.data)
 
     def _get_me_user(self, request):
@@ -201,6 +238,7 @@ class UserViewSet(viewsets.ModelViewSet):
         base = request.build_absolute_uri("/").rstrip("/")
         user.avatar_url = f"{base}/api/v1/user/avatar/{user.id}/"
         user.save(update_fields=["avatar_s3_key", "avatar_url"])
+        invalidate_profile(user)
         return Response({"avatar_url": user.avatar_url})
 
 class UserAddressViewSet(viewsets.ModelViewSet):
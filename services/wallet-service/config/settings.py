@@ -30,6 +30,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'shared.middleware.RequestIDMiddleware',
     'shared.middleware.LoggingMiddleware',
+    'shared.middleware.EventBusMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -69,3 +70,7 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
+
+# Transactional outbox (shared/outbox.py): events are written with the change that
+# raised them and sent by `manage.py relay_outbox`, which must then be running
+OUTBOX_MODEL = 'wallet.OutboxEvent' if os.environ.get('EVENT_OUTBOX', 'false').lower() == 'true' else None
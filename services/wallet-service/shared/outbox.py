@@ -0,0 +1,102 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from shared.event_bus import event_bus
+
+logger = logging.getLogger(__name__)
+
+# Failed events are retried after 2**attempts seconds, capped
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+class OutboxEventBase(models.Model):
+    """
+    Transactional outbox. Each service's app defines `OutboxEvent(OutboxEventBase)` and
+    points settings.OUTBOX_MODEL at it; event_bus.publish then inserts the event in the
+    same transaction as the change it describes, so it exists exactly when that change
+    committed. `manage.py relay_outbox` sends rows with batched PutEvents and deletes
+    them; failed rows are retried with backoff instead of being lost.
+    """
+    id = models.BigAutoField(primary_key=True)
+    source = models.CharField(max_length=100)
+    detail_type = models.CharField(max_length=100)
+    detail = models.TextField()  # JSON, as sent
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        abstract = True
+
+
+def relay_batch(batch_size=500):
+    """
+    Send up to batch_size due events and delete the accepted ones. Rows are claimed with
+    FOR UPDATE SKIP LOCKED, so several relays drain the same outbox without overlap.
+    Returns (sent, failed).
+    """
+    model = event_bus.outbox_model()
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=timezone.now())
+            .order_by('id')[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        errors = event_bus.send([event_bus.entry(row.source, row.detail_type, row.detail) for row in rows])
+
+        sent = [row.id for row, error in zip(rows, errors) if error is None]
+        model.objects.filter(id__in=sent).delete()
+        failed = [(row, error) for row, error in zip(rows, errors) if error is not None]
+        now = timezone.now()
+        for row, error in failed:
+            delay = min(2 ** row.attempts, MAX_RETRY_DELAY_SECONDS)
+            model.objects.filter(id=row.id).update(
+                attempts=F('attempts') + 1,
+                available_at=now + timedelta(seconds=delay),
+                last_error=error[:1000],
+            )
+    return len(sent), len(failed)
+
+
+def stats():
+    """Relay lag: pending events, how long the oldest has waited, and rows being retried."""
+    model = event_bus.outbox_model()
+    pending = model.objects.aggregate(count=models.Count('id'), oldest=models.Min('created_at'))
+    oldest = pending['oldest']
+    return {
+        'pending': pending['count'],
+        'oldest_age_seconds': round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0,
+        'retrying': model.objects.filter(attempts__gt=0).count(),
+    }
+
+
+def run_relay(batch_size=500, poll_interval=0.5, stats_interval=60, once=False):
+    """Drain the outbox; loops until stopped unless once=True. Returns the number of events sent."""
+    total = 0
+    next_stats = time.monotonic()
+    while True:
+        try:
+            sent, failed = relay_batch(batch_size)
+        except Exception as e:
+            logger.error(f"Outbox relay batch failed: {e}")
+            sent, failed = 0, 0
+            if once:
+                raise
+            time.sleep(poll_interval)
+        total += sent
+        if time.monotonic() >= next_stats:
+            logger.info(f"Outbox relay: sent {total} event(s), lag {stats()}")
+            next_stats = time.monotonic() + stats_interval
+        if sent + failed >= batch_size:
+            continue
+        if once:
+            return total
+        time.sleep(poll_interval)
@@ -0,0 +1,138 @@
+"""
+Membership index of our deposit addresses: a Bloom filter kept as a Redis bitmap.
+
+Every derived address goes in (the free pool included), before its row is inserted, so
+the filter never misses an address a user can have been given; a hit may still be a
+false positive (ERROR_RATE at CAPACITY addresses). The deposit watcher downloads it from
+`internal/address-filter` and drops outputs to foreign addresses before publishing
+anything.
+
+The metadata carries a random `build` id set by every rebuild, so a filter rebuilt after
+META_KEY was lost never repeats an earlier (build, version) pair and pollers keyed on it
+always see the change. A filter whose bitmap is missing reads as no filter at all, never
+as an empty one.
+
+Bit positions use double hashing over SHA-256 of the address, and bit i of the filter
+is bit (7 - i % 8) of byte i // 8, as Redis SETBIT numbers them. The deposit watcher
+Lambda repeats this scheme; change both together.
+"""
+import hashlib
+import logging
+import math
+import os
+import secrets
+
+from shared.cache import cache
+from .models import DepositAddress
+
+logger = logging.getLogger(__name__)
+
+KEY = 'wallet:address-index'
+META_KEY = 'wallet:address-index:meta'
+CAPACITY = int(os.environ.get('ADDRESS_INDEX_CAPACITY', '1000000'))
+ERROR_RATE = 0.0001
+REBUILD_BATCH = 5000
+
+
+def parameters(capacity, error_rate=ERROR_RATE):
+    """(bits, hashes) of a filter holding `capacity` addresses at `error_rate` false positives."""
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+def positions(address, bits, hashes):
+    digest = hashlib.sha256(address.encode()).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:16], 'big') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+def _meta():
+    meta = cache.redis.hgetall(META_KEY)
+    if not meta:
+        return None
+    return {name: int(value) for name, value in meta.items()}
+
+
+def add(addresses):
+    """
+    Add addresses to the filter; rebuilds it first if it does not exist or is over capacity.
+    Call under the address pool lock (WalletService.fill_address_pool), before inserting the rows.
+    """
+    if not addresses:
+        return
+    meta = _meta()
+    if meta is None or not cache.redis.exists(KEY) or meta['count'] + len(addresses) > meta['capacity']:
+        rebuild(extra=addresses)
+        return
+    pipe = cache.redis.pipeline(transaction=True)
+    for address in addresses:
+        for position in positions(address, meta['bits'], meta['hashes']):
+            pipe.setbit(KEY, position, 1)
+    pipe.hincrby(META_KEY, 'count', len(addresses))
+    pipe.hincrby(META_KEY, 'version', 1)
+    pipe.execute()
+
+
+def rebuild(capacity=None, extra=()):
+    """
+    Build the filter from every DepositAddress row (plus `extra`) and swap it in. Sized
+    for at least twice the current count. Call under the address pool lock.
+    """
+    count = DepositAddress.objects.count() + len(extra)
+    capacity = max(capacity or CAPACITY, 2 * count)
+    bits, hashes = parameters(capacity)
+    filter_bytes = bytearray((bits + 7) // 8)
+
+    def set_bits(address):
+        for position in positions(address, bits, hashes):
+            filter_bytes[position >> 3] |= 0x80 >> (position & 7)
+
+    for address in DepositAddress.objects.values_list('address', flat=True).iterator(chunk_size=REBUILD_BATCH):
+        set_bits(address)
+    for address in extra:
+        set_bits(address)
+
+    previous = _meta()
+    version = (previous['version'] if previous else 0) + 1
+    staging = f"{KEY}:staging"
+    cache.redis_binary.set(staging, bytes(filter_bytes))
+    pipe = cache.redis.pipeline(transaction=True)
+    pipe.rename(staging, KEY)
+    pipe.delete(META_KEY)
+    pipe.hset(META_KEY, mapping={'bits': bits, 'hashes': hashes, 'count': count,
+                                 'capacity': capacity, 'version': version,
+                                 'build': secrets.randbits(63)})
+    pipe.execute()
+    logger.info(f"Rebuilt deposit address index: {count} addresses, {bits} bits, {hashes} hashes")
+    return _meta()
+
+
+def snapshot():
+    """(meta, filter bytes), or None if the filter or its bitmap is missing."""
+    pipe = cache.redis_binary.pipeline(transaction=True)
+    pipe.hgetall(META_KEY)
+    pipe.get(KEY)
+    raw_meta, data = pipe.execute()
+    if not raw_meta or data is None or b'build' not in raw_meta:
+        # An evicted bitmap padded with zeros would reject every address
+        return None
+    meta = {name.decode(): int(value) for name, value in raw_meta.items()}
+    # Redis stores the bitmap only up to its highest set bit
+    data = data.ljust((meta['bits'] + 7) // 8, b'\0')
+    return meta, data
+
+
+def contains(address):
+    """False only if the address is certainly not ours; None if there is no filter."""
+    meta = _meta()
+    if meta is None:
+        return None
+    pipe = cache.redis.pipeline(transaction=False)
+    pipe.exists(KEY)
+    for position in positions(address, meta['bits'], meta['hashes']):
+        pipe.getbit(KEY, position)
+    exists, *found = pipe.execute()
+    if not exists:
+        return None
+    return all(found)
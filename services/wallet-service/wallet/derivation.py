@@ -0,0 +1,195 @@
+"""
+Deposit address derivation: BIP32 public derivation of m/0/i from the account xpub.
+
+hdwallet parses the xpub and walks m -> 0 -> i for every address, and each step is a
+pure-Python EC multiplication (~85ms). ChangeNode parses the xpub and derives the change
+node m/0 once, so an address costs one step: libsecp256k1 (coincurve) when installed,
+hdwallet's own step otherwise. Each node checks its first addresses against hdwallet
+before it is used. derive_range spreads large contiguous index ranges over a process pool
+that lives as long as the calling process, so each pool worker builds its node once and
+keeps it for every later range.
+"""
+import copy
+import hashlib
+import hmac
+import logging
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from hdwallet import HDWallet
+from hdwallet.derivations import Derivation
+from hdwallet.libs.base58 import check_encode
+from hdwallet.libs.ripemd160 import ripemd160 as _ripemd160
+from hdwallet.symbols import DOGE
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+logger = logging.getLogger(__name__)
+
+# Ranges smaller than this are derived in-process; forking workers costs more than it saves
+PARALLEL_MIN_COUNT = 200
+CHUNK_SIZE = 500
+WORKERS = int(os.environ.get('DERIVATION_WORKERS', '0')) or os.cpu_count() or 1
+# Non-hardened child indexes only
+MAX_INDEX = 2 ** 31 - 1
+SELF_CHECK_INDEXES = (0, 1)
+
+
+def _hash160(data):
+    digest = hashlib.sha256(data).digest()
+    try:
+        return hashlib.new('ripemd160', digest).digest()
+    except ValueError:
+        # OpenSSL 3 builds without the legacy provider
+        return _ripemd160(digest)
+
+
+def reference_address(xpub, index):
+    """The address hdwallet derives for m/0/index, the slow way; used to check ChangeNode."""
+    hd = (
+        HDWallet(symbol=DOGE)
+        .from_xpublic_key(xpublic_key=xpub)
+        .from_path(path=Derivation(path=f"m/0/{index}", semantic="p2pkh"))
+    )
+    return hd.p2pkh_address()
+
+
+class ChangeNode:
+    """The external (change=0) node of one account xpub; derives its child addresses."""
+
+    def __init__(self, xpub, fast=None):
+        self.xpub = xpub
+        change = HDWallet(symbol=DOGE).from_xpublic_key(xpublic_key=xpub)
+        change.from_index(0)
+        self._hd = change
+        self._public_key = bytes.fromhex(change.compressed())
+        self._chain_code = bytes.fromhex(change.chain_code())
+        version = change._cryptocurrency.PUBLIC_KEY_ADDRESS
+        self._version = version.to_bytes(max(1, (version.bit_length() + 7) // 8), 'big')
+        self.fast = coincurve is not None if fast is None else fast
+        if self.fast:
+            self._point = coincurve.PublicKey(self._public_key)
+            for index in SELF_CHECK_INDEXES:
+                if self._fast_address(index) != reference_address(xpub, index):
+                    logger.error("libsecp256k1 derivation disagrees with hdwallet; using hdwallet")
+                    self.fast = False
+                    break
+
+    def address(self, index):
+        if not 0 <= index <= MAX_INDEX:
+            raise ValueError(f"Derivation index {index} out of range")
+        return self._fast_address(index) if self.fast else self._slow_address(index)
+
+    def addresses(self, start, count):
+        """[(index, address)] for start .. start+count-1."""
+        return [(index, self.address(index)) for index in range(start, start + count)]
+
+    def _fast_address(self, index):
+        # CKDpub: child = parent + IL*G, IL = HMAC-SHA512(chain code, parent || index)[:32]
+        tweak = hmac.new(self._chain_code, self._public_key + struct.pack('>L', index), hashlib.sha512).digest()[:32]
+        child = self._point.add(tweak).format(compressed=True)
+        return check_encode(self._version + _hash160(child))
+
+    def _slow_address(self, index):
+        child = copy.copy(self._hd)
+        child.from_index(index)
+        return child.p2pkh_address()
+
+
+_nodes = {}
+
+
+def change_node(xpub):
+    """The process-wide ChangeNode for xpub, built on first use."""
+    node = _nodes.get(xpub)
+    if node is None:
+        node = _nodes[xpub] = ChangeNode(xpub)
+    return node
+
+
+def _derive_chunk(args):
+    xpub, start, count = args
+    return change_node(xpub).addresses(start, count)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+
+def _pool(workers):
+    """The process-wide executor with `workers` processes, created on first use (after any fork)."""
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Inherited from a parent through fork: those pools belong to the parent
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return pool
+
+
+def _discard_pool(workers, pool):
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def derive_range(xpub, start, count, workers=None):
+    """
+    [(index, address)] for the contiguous range start .. start+count-1, in order. Ranges of
+    PARALLEL_MIN_COUNT or more are split into CHUNK_SIZE chunks over `workers` processes
+    (default DERIVATION_WORKERS, else one per CPU).
+    """
+    workers = workers or WORKERS
+    if count < PARALLEL_MIN_COUNT or workers == 1:
+        return change_node(xpub).addresses(start, count)
+    chunks = [(xpub, chunk_start, min(CHUNK_SIZE, start + count - chunk_start))
+              for chunk_start in range(start, start + count, CHUNK_SIZE)]
+    pool = _pool(workers)
+    derived = []
+    try:
+        for chunk in pool.map(_derive_chunk, chunks):
+            derived.extend(chunk)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); the next call starts a fresh pool
+        _discard_pool(workers, pool)
+        raise
+    return derived
+
+
+def benchmark(xpub, count=2000, workers=None, start=0):
+    """Throughput of derive_range, in-process and over the pool, as a dict."""
+    workers = workers or WORKERS
+    node = change_node(xpub)
+    results = {'engine': 'libsecp256k1' if node.fast else 'hdwallet', 'count': count, 'workers': workers}
+
+    # The per-address cost the old code paid: parse the xpub and walk m/0/i every time
+    sample = max(1, min(5, count))
+    started = time.perf_counter()
+    for index in range(start, start + sample):
+        reference_address(xpub, index)
+    results['reference_per_s'] = round(sample / (time.perf_counter() - started), 1)
+
+    started = time.perf_counter()
+    node.addresses(start, count)
+    single = count / (time.perf_counter() - started)
+    results['single_process_per_s'] = round(single, 1)
+
+    if workers > 1:
+        started = time.perf_counter()
+        derive_range(xpub, start, count, workers)
+        parallel = count / (time.perf_counter() - started)
+        results['pool_per_s'] = round(parallel, 1)
+        results['pool_per_s_per_core'] = round(parallel / min(workers, os.cpu_count() or 1), 1)
+    return results
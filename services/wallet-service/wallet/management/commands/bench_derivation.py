@@ -0,0 +1,24 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from wallet import derivation
+
+
+class Command(BaseCommand):
+    help = "Measure deposit address derivation throughput (addresses per second, per core)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=2000, help="Addresses to derive per measurement")
+        parser.add_argument("--workers", type=int, help="Processes for the pooled run (default: DERIVATION_WORKERS or one per CPU)")
+        parser.add_argument("--start", type=int, default=0, help="First derivation index")
+        parser.add_argument("--xpub", help="Account xpub (default: WALLET_MASTER_XPUB)")
+
+    def handle(self, *args, **options):
+        xpub = options["xpub"] or (os.environ.get("WALLET_MASTER_XPUB") or "").strip()
+        if not xpub:
+            self.stderr.write(self.style.ERROR("Set WALLET_MASTER_XPUB or pass --xpub."))
+            return
+        result = derivation.benchmark(xpub, options["count"], options["workers"], options["start"])
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,33 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from wallet.services import ADDRESS_POOL_TARGET, WalletService
+
+
+class Command(BaseCommand):
+    help = "Keep a pool of pre-derived, unassigned deposit addresses for new wallets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", type=int, default=ADDRESS_POOL_TARGET,
+                            help="Unassigned addresses to keep (default: ADDRESS_POOL_TARGET)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Addresses derived per index range")
+        parser.add_argument("--interval", type=float, default=30.0, help="Seconds between pool checks")
+        parser.add_argument("--once", action="store_true", help="Fill the pool once and exit")
+        parser.add_argument("--stats", action="store_true", help="Print the pool size as JSON and exit")
+
+    def handle(self, *args, **options):
+        service = WalletService()
+        if options["stats"]:
+            self.stdout.write(json.dumps(service.address_pool_stats()))
+            return
+
+        while True:
+            added = service.fill_address_pool(options["target"], options["batch_size"])
+            if added:
+                self.stdout.write(f"Derived {added} deposit address(es).")
+            if options["once"]:
+                self.stdout.write(self.style.SUCCESS(json.dumps(service.address_pool_stats())))
+                return
+            time.sleep(options["interval"])
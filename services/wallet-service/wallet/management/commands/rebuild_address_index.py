@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from wallet.services import WalletService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Bloom filter of deposit addresses the deposit watcher filters on."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--capacity", type=int,
+                            help="Addresses to size the filter for (default: ADDRESS_INDEX_CAPACITY)")
+
+    def handle(self, *args, **options):
+        meta = WalletService().rebuild_address_index(options["capacity"])
+        self.stdout.write(self.style.SUCCESS(json.dumps(meta)))
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from shared import outbox
+from shared.event_bus import event_bus
+
+
+class Command(BaseCommand):
+    help = "Send events from the transactional outbox to EventBridge (EVENT_OUTBOX=true)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Events claimed per transaction")
+        parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds to sleep when the outbox is empty")
+        parser.add_argument("--once", action="store_true", help="Drain the outbox once and exit")
+        parser.add_argument("--stats", action="store_true", help="Print the relay lag as JSON and exit")
+
+    def handle(self, *args, **options):
+        if event_bus.outbox_model() is None:
+            self.stderr.write(self.style.ERROR("The outbox is disabled; set EVENT_OUTBOX=true."))
+            return
+        if options["stats"]:
+            self.stdout.write(json.dumps(outbox.stats()))
+            return
+
+        sent = outbox.run_relay(options["batch_size"], options["poll_interval"], once=options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Relayed {sent} event(s)."))
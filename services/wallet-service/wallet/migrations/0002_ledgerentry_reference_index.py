@@ -0,0 +1,17 @@
+# Generated by Django for wallet app
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ledgerentry",
+            index=models.Index(fields=["reference_type", "reference_id", "user_id"], name="wallet_ledger_reference_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django for wallet app
+
+from django.db import migrations, models
+
+
+def backfill_derivation_index(apps, schema_editor):
+    DepositAddress = apps.get_model("wallet", "DepositAddress")
+    seen = set()
+    for row in DepositAddress.objects.order_by("created_at").only("id", "derivation_path"):
+        try:
+            index = int(row.derivation_path.rsplit("/", 1)[-1])
+        except ValueError:
+            continue
+        # Concurrent signups under the old count()+1 scheme could share an index; keep the first
+        if index in seen:
+            continue
+        seen.add(index)
+        DepositAddress.objects.filter(id=row.id).update(derivation_index=index, assigned_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0003_outboxevent"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="depositaddress",
+            name="user_id",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="depositaddress",
+            name="derivation_index",
+            field=models.IntegerField(null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="depositaddress",
+            name="assigned_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_derivation_index, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="depositaddress",
+            index=models.Index(fields=["user_id"], name="wallet_deposit_user_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="depositaddress",
+            index=models.Index(
+                condition=models.Q(("user_id__isnull", True)),
+                fields=["derivation_index"],
+                name="wallet_deposit_free_idx",
+            ),
+        ),
+    ]
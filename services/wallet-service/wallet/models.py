@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.db.models import F, Sum
 from django.db import transaction
+from shared.outbox import OutboxEventBase
 
 class WalletBalance(models.Model):
     user_id = models.UUIDField(primary_key=True)
@@ -19,11 +20,22 @@ class WalletBalance(models.Model):
         ]
 
 class DepositAddress(models.Model):
+    # Addresses are derived ahead of time (fill_address_pool); user_id is null until one is claimed
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user_id = models.UUIDField()
+    user_id = models.UUIDField(null=True, blank=True)
     address = models.CharField(max_length=100, unique=True)
     derivation_path = models.CharField(max_length=100)
+    derivation_index = models.IntegerField(unique=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id'], name='wallet_deposit_user_idx'),
+            # The free pool, in claim order
+            models.Index(fields=['derivation_index'], condition=models.Q(user_id__isnull=True),
+                         name='wallet_deposit_free_idx'),
+        ]
 
 class LedgerEntry(models.Model):
     ENTRY_TYPES = [
@@ -55,6 +67,12 @@ class LedgerEntry(models.Model):
     idempotency_key = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Holds per auction (reconciliation) and per order
+            models.Index(fields=['reference_type', 'reference_id', 'user_id'], name='wallet_ledger_reference_idx'),
+        ]
+
 class DepositTransaction(models.Model):
     STATUS_CHOICES = [
         ('DETECTED', 'Detected'),
@@ -113,3 +131,6 @@ class Escrow(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='LOCKED')
     locked_at = models.DateTimeField(auto_now_add=True)
     released_at = models.DateTimeField(null=True, blank=True)
+
+class OutboxEvent(OutboxEventBase):
+    """Events waiting for relay_outbox (see shared/outbox.py)."""
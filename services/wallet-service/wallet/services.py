@@ -1,28 +1,37 @@
 import logging
 import os
-import requests
 import uuid
 from decimal import Decimal
 from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Max, Q, Sum
 from django.utils import timezone
 from .models import WalletBalance, LedgerEntry, DepositAddress, WithdrawalRequest, Escrow
-from hdwallet import HDWallet
-from hdwallet.symbols import DOGE
-from hdwallet.derivations import Derivation
+from . import address_index, derivation
+from shared.cache import cache
 from shared.event_bus import event_bus
+from shared.http import service_client
 
 logger = logging.getLogger(__name__)
 
+# Ledger entry types that place / release a hold (lock_funds/unlock_funds and swap_lock)
+HOLD_LOCK_TYPES = ('LOCKED', 'BID_LOCK')
+HOLD_UNLOCK_TYPES = ('UNLOCKED', 'BID_UNLOCK')
+
+# Deposit address pool: fill_address_pool keeps ADDRESS_POOL_TARGET unassigned addresses
+# derived ahead; a signup that finds the pool empty derives this many itself
+ADDRESS_POOL_TARGET = int(os.environ.get('ADDRESS_POOL_TARGET', '1000'))
+ADDRESS_POOL_EMERGENCY_BATCH = 10
+ADDRESS_POOL_LOCK = 'lock:wallet:address-pool'
+
+# credit_deposits: most deposits accepted per call, and rows per bulk INSERT/UPDATE statement
+DEPOSIT_BATCH_MAX = 5000
+DEPOSIT_BATCH_WRITE_SIZE = 1000
+
+
+def _derive_range(master_xpub: str, start: int, count: int):
+    """P2PKH (index, address) pairs for m/0/start .. m/0/start+count-1 of the account xpub (BIP44 change=0)."""
+    return derivation.derive_range(master_xpub, start, count)
 
-def _derive_deposit_address(master_xpub: str, path_index: int) -> str:
-    """Derive P2PKH address from account-level xpub at path m/0/path_index (BIP44 change=0, address=path_index)."""
-    hd = (
-        HDWallet(symbol=DOGE)
-        .from_xpublic_key(xpublic_key=master_xpub)
-        .from_path(path=Derivation(path=f"m/0/{path_index}", semantic="p2pkh"))
-    )
-    return hd.p2pkh_address()
 
 class WalletService:
     def __init__(self):
@@ -36,29 +45,179 @@ class WalletService:
         return wallet
 
     def generate_deposit_address(self, user_id):
+        """Assign the next pre-derived address to user_id; derives a few inline if the pool ran dry."""
+        address = self._claim_pooled_address(user_id)
+        while address is None:
+            self.fill_address_pool(target=ADDRESS_POOL_EMERGENCY_BATCH)
+            address = self._claim_pooled_address(user_id)
+        return address
+
+    def _claim_pooled_address(self, user_id):
+        # SKIP LOCKED: concurrent signups each take a different free row instead of queueing on one
         with transaction.atomic():
-            path_index = DepositAddress.objects.select_for_update().count() + 1
-            derivation_path = f"m/44'/3'/0'/0/{path_index}"
-            if self.master_xpub:
-                address = _derive_deposit_address(self.master_xpub, path_index)
-            else:
-                address = f"D{uuid.uuid4().hex[:33]}"
-            DepositAddress.objects.create(
-                user_id=user_id,
-                address=address,
-                derivation_path=derivation_path,
+            row = (
+                DepositAddress.objects.select_for_update(skip_locked=True)
+                .filter(user_id__isnull=True)
+                .order_by('derivation_index')
+                .first()
             )
-        return address
+            if row is None:
+                return None
+            row.user_id = user_id
+            row.assigned_at = timezone.now()
+            row.save(update_fields=['user_id', 'assigned_at'])
+        return row.address
+
+    def fill_address_pool(self, target=ADDRESS_POOL_TARGET, batch_size=500):
+        """
+        Derive addresses until at least `target` are unassigned, in index ranges of
+        batch_size. One filler at a time (Redis lock), so ranges never overlap.
+        Returns the number of addresses added.
+        """
+        added = 0
+        with cache.redis.lock(ADDRESS_POOL_LOCK, timeout=300, blocking_timeout=60):
+            needed = target - DepositAddress.objects.filter(user_id__isnull=True).count()
+            while needed > 0:
+                count = min(needed, batch_size)
+                start = (DepositAddress.objects.aggregate(last=Max('derivation_index'))['last'] or 0) + 1
+                if self.master_xpub:
+                    derived = _derive_range(self.master_xpub, start, count)
+                else:
+                    derived = [(index, f"D{uuid.uuid4().hex[:33]}") for index in range(start, start + count)]
+                # Index first: the deposit watcher must never drop a deposit to an address that exists
+                address_index.add([address for _, address in derived])
+                DepositAddress.objects.bulk_create([
+                    DepositAddress(address=address, derivation_index=index, derivation_path=f"m/44'/3'/0'/0/{index}")
+                    for index, address in derived
+                ])
+                added += count
+                needed -= count
+        return added
+
+    def address_pool_stats(self):
+        free = DepositAddress.objects.filter(user_id__isnull=True).count()
+        return {
+            'free': free,
+            'assigned': DepositAddress.objects.filter(user_id__isnull=False).count(),
+            'last_index': DepositAddress.objects.aggregate(last=Max('derivation_index'))['last'],
+            'target': ADDRESS_POOL_TARGET,
+        }
+
+    def rebuild_address_index(self, capacity=None):
+        """Rebuild the deposit address Bloom filter from the table; returns its metadata."""
+        with cache.redis.lock(ADDRESS_POOL_LOCK, timeout=300, blocking_timeout=60):
+            return address_index.rebuild(capacity)
+
+    def address_index_snapshot(self):
+        """
+        (metadata, filter bytes) of the deposit address index, rebuilding it if it or its
+        bitmap is missing; None if it is still unavailable.
+        """
+        snapshot = address_index.snapshot()
+        if snapshot is None:
+            with cache.redis.lock(ADDRESS_POOL_LOCK, timeout=300, blocking_timeout=60):
+                snapshot = address_index.snapshot()
+                if snapshot is None:
+                    address_index.rebuild()
+                    snapshot = address_index.snapshot()
+        return snapshot
 
     def credit_deposit_by_address(self, address: str, amount, txid: str) -> bool:
-        """Resolve user_id from deposit address and credit. Returns True if credited, False if unknown address (caller may treat as 404)."""
+        """Resolve user_id from deposit address and credit. Returns True if credited, False if unknown or unassigned address (caller may treat as 404)."""
         try:
-            rec = DepositAddress.objects.get(address=address)
+            rec = DepositAddress.objects.get(address=address, user_id__isnull=False)
         except DepositAddress.DoesNotExist:
             return False
         self.process_deposit(rec.user_id, amount, txid, address)
         return True
 
+    def credit_deposits(self, deposits):
+        """
+        Credit a batch of {address, amount, txid} deposits in one transaction, with set-based
+        statements rather than a round trip per deposit: resolve addresses, drop idempotency
+        keys already in the ledger, lock the wallets (in user_id order), bulk insert the
+        ledger entries, bulk update the balances, and queue the deposit.credited events.
+        Returns one {txid, address, status} per deposit, in order; status is credited,
+        duplicate (already credited, or repeated in the batch), unknown_address (unknown or
+        unassigned) or invalid (missing field or amount not positive).
+        """
+        results = []
+        pending = {}
+        for deposit in deposits:
+            address, txid = deposit.get('address'), deposit.get('txid')
+            result = {'txid': txid, 'address': address, 'status': 'invalid'}
+            results.append(result)
+            try:
+                amount = Decimal(int(round(float(deposit.get('amount')))))
+            except (TypeError, ValueError, OverflowError):
+                # OverflowError: "inf" / "1e999"; one bad entry must not fail the batch
+                continue
+            if not address or not txid or amount <= 0:
+                continue
+            key = f"deposit:{txid}:{address}"
+            if key in pending:
+                result['status'] = 'duplicate'
+                continue
+            pending[key] = (result, address, amount, txid)
+        if not pending:
+            return results
+
+        owners = dict(
+            DepositAddress.objects.filter(
+                address__in={address for _, address, _, _ in pending.values()}, user_id__isnull=False
+            ).values_list('address', 'user_id')
+        )
+        for key, (result, address, _, _) in list(pending.items()):
+            if address not in owners:
+                result['status'] = 'unknown_address'
+                del pending[key]
+        if not pending:
+            return results
+
+        with transaction.atomic():
+            user_ids = {owners[address] for _, address, _, _ in pending.values()}
+            # A wallet is normally created with its address; make sure every owner has one to lock
+            WalletBalance.objects.bulk_create([WalletBalance(user_id=user_id) for user_id in user_ids],
+                                              ignore_conflicts=True)
+            wallets = {
+                wallet.user_id: wallet
+                for wallet in WalletBalance.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+            }
+            # Checked under the wallet locks, as process_deposit does, so a concurrent credit cannot slip in
+            credited = set(LedgerEntry.objects.filter(idempotency_key__in=list(pending)).values_list('idempotency_key', flat=True))
+
+            entries = []
+            events = []
+            for key, (result, address, amount, txid) in pending.items():
+                if key in credited:
+                    result['status'] = 'duplicate'
+                    continue
+                user_id = owners[address]
+                wallet = wallets[user_id]
+                wallet.available += amount
+                entries.append(LedgerEntry(
+                    user_id=user_id,
+                    entry_type='DEPOSIT',
+                    credit=amount,
+                    balance_after=wallet.available,
+                    reference_type='tx',
+                    reference_id=txid,
+                    description=f"Deposit from {address}",
+                    idempotency_key=key,
+                ))
+                events.append({'user_id': str(user_id), 'amount': str(amount), 'txid': txid})
+                result['status'] = 'credited'
+
+            if entries:
+                now = timezone.now()
+                touched = [wallets[user_id] for user_id in {entry.user_id for entry in entries}]
+                for wallet in touched:
+                    wallet.updated_at = now
+                LedgerEntry.objects.bulk_create(entries, batch_size=DEPOSIT_BATCH_WRITE_SIZE)
+                WalletBalance.objects.bulk_update(touched, ['available', 'updated_at'], batch_size=DEPOSIT_BATCH_WRITE_SIZE)
+                event_bus.publish_many('dbay.wallet-service', 'deposit.credited', events)
+        return results
+
     @transaction.atomic
     def process_deposit(self, user_id, amount, txid, address):
         amount = Decimal(int(round(float(amount))))
@@ -141,9 +300,10 @@ class WalletService:
         if not url:
             return None
         try:
-            # Mock node expects POST with method, params, id
+            # Mock node expects POST with method, params, id. Sending is not idempotent, so
+            # only a connect timeout (request never sent) is retried.
             payload = {"method": "sendtoaddress", "params": [address, float(amount_doge)], "id": 1}
-            resp = requests.post(url, json=payload, timeout=10)
+            resp = service_client('dogecoin-node', url, read_timeout=10).post('', json=payload)
             resp.raise_for_status()
             data = resp.json()
             return data.get('result') or None
@@ -202,9 +362,17 @@ class WalletService:
         self.process_deposit(user_id, amount, txid, addr.address)
 
     @transaction.atomic
-    def lock_funds(self, user_id, amount, reference_type, reference_id):
+    def lock_funds(self, user_id, amount, reference_type, reference_id, operation_id=None):
         wallet = WalletBalance.objects.select_for_update().get(user_id=user_id)
         amount = Decimal(int(round(float(amount))))
+
+        # operation_id distinguishes repeated locks against the same reference (e.g. one per bid);
+        # replaying the same operation_id (a retried call) is a no-op
+        idempotency_key = f"lock:{reference_type}:{reference_id}"
+        if operation_id:
+            idempotency_key = f"{idempotency_key}:{operation_id}"
+            if LedgerEntry.objects.filter(idempotency_key=idempotency_key).exists():
+                return
         
         if wallet.available < amount:
             raise ValueError("Insufficient funds")
@@ -213,8 +381,6 @@ class WalletService:
         wallet.locked = F('locked') + amount
         wallet.save()
         
-        idempotency_key = f"lock:{reference_type}:{reference_id}"
-        
         LedgerEntry.objects.create(
             user_id=user_id,
             entry_type='LOCKED',
@@ -227,16 +393,21 @@ class WalletService:
         )
 
     @transaction.atomic
-    def unlock_funds(self, user_id, amount, reference_type, reference_id):
+    def unlock_funds(self, user_id, amount, reference_type, reference_id, operation_id=None):
         wallet = WalletBalance.objects.select_for_update().get(user_id=user_id)
         amount = Decimal(int(round(float(amount))))
+
+        idempotency_key = f"unlock:{reference_type}:{reference_id}"
+        if operation_id:
+            idempotency_key = f"{idempotency_key}:{operation_id}"
+            if LedgerEntry.objects.filter(idempotency_key=idempotency_key).exists():
+                return
+
         balance_after = wallet.available + amount
         wallet.locked = F('locked') - amount
         wallet.available = F('available') + amount
         wallet.save()
         
-        idempotency_key = f"unlock:{reference_type}:{reference_id}"
-        
         LedgerEntry.objects.create(
             user_id=user_id,
             entry_type='UNLOCKED',
@@ -248,6 +419,95 @@ class WalletService:
             idempotency_key=idempotency_key
         )
 
+    @transaction.atomic
+    def swap_lock(self, user_id, amount, previous_user_id, previous_amount, reference_type, reference_id, operation_id):
+        """
+        Lock funds for the new holder and release the previous holder's lock in one transaction
+        (outbid transition). Wallet rows are locked in user_id order so concurrent swaps between
+        the same users cannot deadlock. Replaying the same operation_id is a no-op.
+        """
+        lock_key = f"lock:{reference_type}:{reference_id}:{operation_id}"
+        unlock_key = f"unlock:{reference_type}:{reference_id}:{operation_id}"
+        if LedgerEntry.objects.filter(idempotency_key=lock_key).exists():
+            return
+
+        amount = Decimal(int(round(float(amount))))
+        previous_amount = Decimal(int(round(float(previous_amount or 0))))
+        user_id = str(user_id)
+        previous_user_id = str(previous_user_id) if previous_user_id else None
+
+        user_ids = sorted({user_id, previous_user_id} - {None})
+        wallets = {
+            str(w.user_id): w
+            for w in WalletBalance.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')
+        }
+        if user_id not in wallets or (previous_user_id and previous_user_id not in wallets):
+            raise ValueError("Wallet not found")
+
+        # Running available balances, so a same-user swap (ceiling raise) nets out correctly
+        available = {uid: wallets[uid].available for uid in user_ids}
+        deltas = {uid: Decimal('0') for uid in user_ids}
+        entries = []
+
+        if previous_user_id and previous_amount:
+            available[previous_user_id] += previous_amount
+            deltas[previous_user_id] += previous_amount
+            entries.append(LedgerEntry(
+                user_id=previous_user_id,
+                entry_type='BID_UNLOCK',
+                credit=previous_amount,
+                balance_after=available[previous_user_id],
+                reference_type=reference_type,
+                reference_id=reference_id,
+                description=f"Unlocked funds for {reference_type} {reference_id} (outbid)",
+                idempotency_key=unlock_key
+            ))
+
+        if available[user_id] < amount:
+            raise ValueError("Insufficient funds")
+        available[user_id] -= amount
+        deltas[user_id] -= amount
+        entries.append(LedgerEntry(
+            user_id=user_id,
+            entry_type='BID_LOCK',
+            debit=amount,
+            balance_after=available[user_id],
+            reference_type=reference_type,
+            reference_id=reference_id,
+            description=f"Locked funds for {reference_type} {reference_id}",
+            idempotency_key=lock_key
+        ))
+
+        for uid in user_ids:
+            if deltas[uid]:
+                WalletBalance.objects.filter(user_id=uid).update(
+                    available=F('available') + deltas[uid],
+                    locked=F('locked') - deltas[uid],
+                    updated_at=timezone.now()
+                )
+        LedgerEntry.objects.bulk_create(entries)
+
+    def reference_holds(self, reference_type, reference_ids):
+        """
+        Net amount each user still has locked against each reference, from the ledger:
+        {reference_id: {user_id: amount}}, zero holds omitted.
+        """
+        rows = (
+            LedgerEntry.objects
+            .filter(reference_type=reference_type, reference_id__in=[str(r) for r in reference_ids])
+            .values('reference_id', 'user_id')
+            .annotate(
+                locked=Sum('debit', filter=Q(entry_type__in=HOLD_LOCK_TYPES)),
+                unlocked=Sum('credit', filter=Q(entry_type__in=HOLD_UNLOCK_TYPES)),
+            )
+        )
+        holds = {}
+        for row in rows:
+            net = (row['locked'] or Decimal('0')) - (row['unlocked'] or Decimal('0'))
+            if net:
+                holds.setdefault(row['reference_id'], {})[str(row['user_id'])] = net
+        return holds
+
     @transaction.atomic
     def pay_order(self, buyer_id, seller_id, amount, order_id, fee):
         wallet = WalletBalance.objects.select_for_update().get(user_id=buyer_id)
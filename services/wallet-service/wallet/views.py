@@ -1,12 +1,15 @@
 import os
 import uuid
 import logging
+from django.http import HttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from shared import http
+from shared.cache import cache
 from .models import WalletBalance, LedgerEntry, DepositAddress, WithdrawalRequest
 from .serializers import WalletBalanceSerializer, LedgerEntrySerializer, DepositAddressSerializer, WithdrawalRequestSerializer
-from .services import wallet_service
+from .services import DEPOSIT_BATCH_MAX, wallet_service
 
 logger = logging.getLogger(__name__)
 
@@ -92,9 +95,10 @@ class WalletViewSet(viewsets.ViewSet):
         amount = request.data.get('amount')
         reference_type = request.data.get('reference_type')
         reference_id = request.data.get('reference_id')
+        operation_id = request.data.get('operation_id')
         
         try:
-            wallet_service.lock_funds(user_id, amount, reference_type, reference_id)
+            wallet_service.lock_funds(user_id, amount, reference_type, reference_id, operation_id)
             return Response({'status': 'locked'})
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -105,13 +109,58 @@ class WalletViewSet(viewsets.ViewSet):
         amount = request.data.get('amount')
         reference_type = request.data.get('reference_type')
         reference_id = request.data.get('reference_id')
+        operation_id = request.data.get('operation_id')
         
         try:
-            wallet_service.unlock_funds(user_id, amount, reference_type, reference_id)
+            wallet_service.unlock_funds(user_id, amount, reference_type, reference_id, operation_id)
             return Response({'status': 'unlocked'})
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='internal/swap-lock')
+    def internal_swap_lock(self, request):
+        """Internal: lock the new high bidder's funds and release the previous one's in one transaction."""
+        user_id = request.data.get('user_id')
+        amount = request.data.get('amount')
+        previous_user_id = request.data.get('previous_user_id')
+        previous_amount = request.data.get('previous_amount')
+        reference_type = request.data.get('reference_type')
+        reference_id = request.data.get('reference_id')
+        operation_id = request.data.get('operation_id')
+        if not user_id or amount is None or not reference_id or not operation_id:
+            return Response(
+                {'error': 'user_id, amount, reference_id and operation_id required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            wallet_service.swap_lock(
+                user_id, amount, previous_user_id, previous_amount,
+                reference_type or 'auction', reference_id, operation_id
+            )
+            return Response({'status': 'swapped'})
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error swapping lock: {e}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='internal/reference-holds')
+    def internal_reference_holds(self, request):
+        """Internal: net locked amount per user for each reference (auction reconciliation)."""
+        reference_type = request.data.get('reference_type') or 'auction'
+        reference_ids = request.data.get('reference_ids') or []
+        if not isinstance(reference_ids, list) or len(reference_ids) > 1000:
+            return Response(
+                {'error': 'reference_ids must be a list of at most 1000 ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        holds = wallet_service.reference_holds(reference_type, reference_ids)
+        return Response({
+            reference_id: {user_id: str(amount) for user_id, amount in users.items()}
+            for reference_id, users in holds.items()
+        })
+
     @action(detail=False, methods=['post'], url_path='internal/convert-to-escrow')
     def internal_convert_to_escrow(self, request):
         user_id = request.data.get('user_id')
@@ -172,6 +221,55 @@ class WalletViewSet(viewsets.ViewSet):
             logger.error(f"Error crediting deposit: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='internal/credit-deposits')
+    def internal_credit_deposits(self, request):
+        """
+        Internal: credit many deposits in one transaction (CreditUser Lambda batches, sweeps).
+        Body: {"deposits": [{address, amount, txid}, ...]}. Returns a status per deposit.
+        """
+        deposits = request.data.get('deposits')
+        if not isinstance(deposits, list) or not deposits:
+            return Response({'error': 'deposits list required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(deposits) > DEPOSIT_BATCH_MAX:
+            return Response(
+                {'error': f'at most {DEPOSIT_BATCH_MAX} deposits per call'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(deposit, dict) for deposit in deposits):
+            return Response({'error': 'each deposit must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = wallet_service.credit_deposits(deposits)
+        except Exception as e:
+            logger.error(f"Error crediting deposit batch: {e}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'credited': sum(1 for result in results if result['status'] == 'credited'),
+            'results': results,
+        })
+
+    @action(detail=False, methods=['get'], url_path='internal/address-filter')
+    def internal_address_filter(self, request):
+        """
+        Internal: Bloom filter of every deposit address (used by DepositWatcher Lambda). Raw
+        bitmap; sizing in X-Bloom-* headers. ETag is the filter's build id, version and size,
+        so pollers send If-None-Match and get 304 until an address is added or it is rebuilt.
+        503 if there is no filter; the watcher then publishes everything.
+        """
+        snapshot = wallet_service.address_index_snapshot()
+        if snapshot is None:
+            return Response({'error': 'Address filter unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        meta, data = snapshot
+        etag = f'"{meta["build"]:x}-{meta["version"]}-{meta["bits"]}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(data, content_type='application/octet-stream')
+        response['ETag'] = etag
+        response['X-Bloom-Bits'] = str(meta['bits'])
+        response['X-Bloom-Hashes'] = str(meta['hashes'])
+        response['X-Bloom-Count'] = str(meta['count'])
+        return response
+
     @action(detail=False, methods=['post'], url_path='internal/finalize-withdrawal')
     def internal_finalize_withdrawal(self, request):
         """Internal: set withdrawal CONFIRMED and decrement pending (used by FinalizeLedger Lambda)."""
@@ -189,6 +287,16 @@ class WalletViewSet(viewsets.ViewSet):
             logger.error(f"Error finalizing withdrawal: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'], url_path='internal/http-client-stats')
+    def http_client_stats(self, request):
+        # Per-target latency, errors and breaker state of outgoing service calls
+        return Response(http.metrics())
+
+    @action(detail=False, methods=['get'], url_path='internal/cache-stats')
+    def cache_stats(self, request):
+        # Tiered cache hit ratio and Redis/Memcached pool saturation
+        return Response({'lookups': cache.stats(), 'pools': cache.pool_stats()})
+
     @action(detail=False, methods=['get'])
     def history(self, request):
         user_id = _user_id_from_request(request)